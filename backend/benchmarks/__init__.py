@@ -0,0 +1 @@
+# Standalone performance benchmarks (not run by the API)
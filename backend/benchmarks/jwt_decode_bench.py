@@ -0,0 +1,53 @@
+"""
+JWT Verification Benchmark
+Compares per-request token verification cost: a full python-jose decode on
+every request versus the cached decode_access_token fast path
+
+Usage (from backend/):
+    python -m benchmarks.jwt_decode_bench --requests 100000 --tokens 100
+"""
+import argparse
+import statistics
+import time
+
+from jose import jwt
+
+import core.auth as auth
+
+def time_per_call(func, tokens, requests: int) -> float:
+    """Average microseconds per call, cycling through the tokens"""
+    start = time.perf_counter()
+    for i in range(requests):
+        func(tokens[i % len(tokens)])
+    return (time.perf_counter() - start) / requests * 1e6
+
+def full_decode(token: str) -> dict:
+    """Pre-cache behaviour: verify the signature on every request"""
+    return jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--tokens", type=int, default=100, help="distinct active tokens (users)")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    tokens = [auth.create_access_token({"id": f"user-{i}"}) for i in range(args.tokens)]
+    if auth.ACTIVE_KID != "default":
+        print("⚠️ Benchmark assumes the default signing key (SECRET_KEY)")
+
+    full, cached = [], []
+    for _ in range(args.rounds):
+        auth._token_cache.clear()
+        full.append(time_per_call(full_decode, tokens, args.requests))
+        cached.append(time_per_call(auth.decode_access_token, tokens, args.requests))
+
+    full_us = statistics.median(full)
+    cached_us = statistics.median(cached)
+    print(f"{args.requests} requests over {args.tokens} tokens (median of {args.rounds} rounds)")
+    print(f"  jwt.decode every request:   {full_us:8.2f} us/request")
+    print(f"  cached decode_access_token: {cached_us:8.2f} us/request")
+    print(f"  speedup: {full_us / cached_us:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Similarity Recommender Benchmark
+Builds the task recommender on synthetic histories and times model builds
+and per-user lookups
+
+Usage (from backend/):
+    python -m benchmarks.similarity_recommender_bench --users 100000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from services.ai_engine.similarity_recommender import (
+    CATEGORIES,
+    HOURS,
+    UserHistory,
+    build_feature_matrix,
+    build_model,
+    normalize_title,
+    recommend_titles,
+    top_neighbors,
+    RECOMMENDER_BLOCK_SIZE,
+    RECOMMENDER_NEIGHBORS
+)
+import services.ai_engine.similarity_recommender as similarity_recommender
+
+TITLE_POOL = [
+    "Morning run", "Read one chapter", "10-minute meditation", "Plan tomorrow",
+    "Review goals", "Drink 2L water", "Stretch for 15 minutes", "Journal",
+    "Clean the kitchen", "Practice guitar", "Learn 20 words", "Call family",
+    "Weekly review", "Meal prep", "Budget check", "Deep work block",
+    "Evening walk", "Inbox zero", "Study algorithms", "Gym session"
+]
+
+def synthetic_histories(n_users: int, seed: int = 42) -> dict:
+    """Generate random but clustered user histories"""
+    rng = random.Random(seed)
+    histories = {}
+    for i in range(n_users):
+        # Users fall into a few habit clusters so neighbours are meaningful
+        cluster = i % 5
+        history = UserHistory()
+        for _ in range(rng.randint(3, 8)):
+            title = TITLE_POOL[(cluster * 4 + rng.randint(0, 7)) % len(TITLE_POOL)]
+            completed = rng.randint(0, 20)
+            skipped = rng.randint(0, 6)
+            history.titles[normalize_title(title)] = (title, completed, skipped)
+            history.category_counts[rng.randrange(len(CATEGORIES))] += completed + skipped
+            history.hour_counts[(cluster * 4 + rng.randint(0, 3)) % HOURS] += completed
+        histories[f"user{i}"] = history
+    return histories
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    args = parser.parse_args()
+
+    histories = synthetic_histories(args.users)
+    user_ids = list(histories.keys())
+
+    start = time.perf_counter()
+    features = build_feature_matrix(user_ids, histories)
+    feature_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    top_neighbors(features, RECOMMENDER_NEIGHBORS, RECOMMENDER_BLOCK_SIZE)
+    neighbor_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model = build_model(histories)
+    build_seconds = time.perf_counter() - start
+
+    similarity_recommender._model = model
+    rng = random.Random(7)
+    latencies = []
+    for _ in range(args.lookups):
+        user_id = user_ids[rng.randrange(len(user_ids))]
+        start = time.perf_counter()
+        recommend_titles(user_id)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    print(f"users:               {args.users}")
+    print(f"feature matrix:      {features.shape} ({features.nbytes / 1e6:.1f} MB) in {feature_seconds:.2f}s")
+    print(f"neighbour search:    {neighbor_seconds:.2f}s")
+    print(f"full model build:    {build_seconds:.2f}s ({len(model.recommendations)} users with recommendations)")
+    print(f"lookup p50 / p99:    {statistics.median(latencies) * 1e6:.2f}us / {latencies[int(len(latencies) * 0.99)] * 1e6:.2f}us")
+
+if __name__ == "__main__":
+    main()
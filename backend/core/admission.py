@@ -0,0 +1,239 @@
+"""
+Admission Control
+Per-user rate limits, per-route concurrency limits and a global in-flight cap
+
+Every request passes three gates, cheapest first:
+
+    rate limit    token bucket per user (per client IP before login);
+                  an empty bucket is rejected at once with 429
+    route limit   expensive routes (group leaderboards, long analytics
+                  ranges, ...) get their own concurrency limit, so a burst
+                  on them queues there instead of taking every Mongo
+                  connection
+    global cap    total requests in flight in this worker
+
+A request that waits longer than ADMISSION_QUEUE_TIMEOUT_SECONDS for a route
+or global slot is shed with 503. Both rejections carry Retry-After; shed
+counts are exposed through get_admission_metrics() (GET /health/admission).
+
+Written as a plain ASGI middleware so streaming responses pass through
+untouched. Server-Sent Event streams are rate limited but hold no slot.
+"""
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from decouple import config
+from jose import JWTError
+
+from core.auth import decode_access_token
+from core.deadline import remaining
+from utils.helpers import match_route, parse_route_settings
+
+ADMISSION_ENABLED = config("ADMISSION_ENABLED", default=True, cast=bool)
+# Sustained requests per second per user, and the burst allowed on top
+RATE_LIMIT_PER_SECOND = config("RATE_LIMIT_PER_SECOND", default=10.0, cast=float)
+RATE_LIMIT_BURST = config("RATE_LIMIT_BURST", default=40, cast=int)
+# Token buckets kept in memory (least recently used are dropped first)
+RATE_LIMIT_MAX_KEYS = config("RATE_LIMIT_MAX_KEYS", default=50000, cast=int)
+# Requests in flight per worker
+ADMISSION_MAX_IN_FLIGHT = config("ADMISSION_MAX_IN_FLIGHT", default=200, cast=int)
+# Longest a request may wait for a route or global slot before it is shed
+ADMISSION_QUEUE_TIMEOUT_SECONDS = config("ADMISSION_QUEUE_TIMEOUT_SECONDS", default=2.0, cast=float)
+# Concurrency limit per path prefix, e.g. "/leaderboard/groups=8,/analytics=16"
+ADMISSION_ROUTE_LIMITS = config(
+    "ADMISSION_ROUTE_LIMITS",
+    default="/leaderboard/groups=8,/leaderboard/global=8,/leaderboard/all-time=8,/analytics=16,/dashboard=32,/ai=8"
+)
+
+# Never limited: load balancer probes must keep answering under overload
+EXEMPT_PATHS = ("/health",)
+
+class TokenBucket:
+    """Refills at rate tokens per second up to burst"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated_at")
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Take one token
+
+        Returns:
+            0 if a token was taken, else seconds until one is available
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+_route_limits = parse_route_settings(ADMISSION_ROUTE_LIMITS)
+# Created lazily so they bind to the running event loop
+_route_semaphores: Dict[str, asyncio.Semaphore] = {}
+_global_semaphore: Optional[asyncio.Semaphore] = None
+
+_metrics = {
+    "admitted": 0,
+    "shed_rate_limited": 0,
+    "shed_route_queue": 0,
+    "shed_global_queue": 0,
+    "in_flight": 0
+}
+_shed_by_route: Dict[str, int] = {}
+
+def _client_key(scope) -> str:
+    """Rate limit key: user id from a valid bearer token, else client IP"""
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    user_id = decode_access_token(token).get("id")
+                except JWTError:
+                    user_id = None
+                if user_id:
+                    return f"user:{user_id}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+def _take_token(key: str) -> float:
+    """Take a token from key's bucket; returns seconds to wait if empty"""
+    bucket = _buckets.get(key)
+    if bucket is None:
+        if len(_buckets) >= RATE_LIMIT_MAX_KEYS:
+            _buckets.popitem(last=False)
+        bucket = _buckets[key] = TokenBucket(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+    else:
+        _buckets.move_to_end(key)
+    return bucket.take()
+
+def _route_prefix(path: str) -> Optional[str]:
+    """The configured prefix limiting this path, if any"""
+    return match_route(path, _route_limits)
+
+def _route_semaphore(prefix: str) -> asyncio.Semaphore:
+    semaphore = _route_semaphores.get(prefix)
+    if semaphore is None:
+        semaphore = _route_semaphores[prefix] = asyncio.Semaphore(dict(_route_limits)[prefix])
+    return semaphore
+
+def _get_global_semaphore() -> asyncio.Semaphore:
+    global _global_semaphore
+    if _global_semaphore is None:
+        _global_semaphore = asyncio.Semaphore(ADMISSION_MAX_IN_FLIGHT)
+    return _global_semaphore
+
+async def _acquire(semaphore: asyncio.Semaphore, timeout: float) -> bool:
+    """Wait up to timeout seconds for a slot"""
+    if timeout <= 0:
+        return False
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+def _record_shed(reason: str, path: str):
+    _metrics[reason] += 1
+    route = _route_prefix(path) or path
+    _shed_by_route[route] = _shed_by_route.get(route, 0) + 1
+
+async def _reject(send, status_code: int, detail: str, retry_after: float):
+    """Send a JSON error with Retry-After"""
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode())
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class AdmissionControlMiddleware:
+    """ASGI middleware applying the rate limit, route limits and global cap"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if (
+            not ADMISSION_ENABLED
+            or scope["type"] != "http"
+            or scope.get("method") == "OPTIONS"
+            or path.startswith(EXEMPT_PATHS)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        wait = _take_token(_client_key(scope))
+        if wait > 0:
+            _record_shed("shed_rate_limited", path)
+            await _reject(send, 429, "Too many requests", wait)
+            return
+
+        # Long-lived streams would pin a slot for their whole lifetime
+        if path.endswith("/stream"):
+            _metrics["admitted"] += 1
+            await self.app(scope, receive, send)
+            return
+
+        # Queueing spends the request's own deadline too
+        queue_budget = ADMISSION_QUEUE_TIMEOUT_SECONDS
+        time_left = remaining()
+        if time_left is not None:
+            queue_budget = min(queue_budget, time_left)
+        deadline = time.monotonic() + queue_budget
+        route_semaphore = None
+        prefix = _route_prefix(path)
+        if prefix is not None:
+            route_semaphore = _route_semaphore(prefix)
+            if not await _acquire(route_semaphore, deadline - time.monotonic()):
+                _record_shed("shed_route_queue", path)
+                await _reject(send, 503, "Server busy, retry later", ADMISSION_QUEUE_TIMEOUT_SECONDS)
+                return
+
+        global_semaphore = _get_global_semaphore()
+        try:
+            if not await _acquire(global_semaphore, deadline - time.monotonic()):
+                _record_shed("shed_global_queue", path)
+                await _reject(send, 503, "Server busy, retry later", ADMISSION_QUEUE_TIMEOUT_SECONDS)
+                return
+            _metrics["admitted"] += 1
+            _metrics["in_flight"] += 1
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _metrics["in_flight"] -= 1
+                global_semaphore.release()
+        finally:
+            if route_semaphore is not None:
+                route_semaphore.release()
+
+def get_admission_metrics() -> Dict:
+    """
+    Admission counters for this worker
+
+    Returns:
+        Admitted and shed counts, requests in flight, and sheds per route
+    """
+    return {
+        **_metrics,
+        "rate_limited_keys": len(_buckets),
+        "shed_by_route": dict(_shed_by_route)
+    }
@@ -1,11 +1,13 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import JWTError, jwt
 import bcrypt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from bson import ObjectId
 import hashlib
+import hmac
+import time
 
 from decouple import config
 
@@ -17,9 +19,40 @@ from schemas.token_schema import TokenData
 SECRET_KEY = config("SECRET_KEY", default="your-secret-key-change-in-production-minimum-32-characters")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Rotating signing keys as "kid:secret,kid:secret"; tokens carry the kid in their header.
+# Add the new key, switch ACTIVE_KID, and drop the old key once its tokens have expired.
+# Tokens without a kid (issued before rotation) are checked against SECRET_KEY only
+# while SIGNING_KEYS is unset; once it is set they are rejected and clients refresh.
+SIGNING_KEYS = config("SIGNING_KEYS", default="")
+ACTIVE_KID = config("ACTIVE_KID", default="default")
+# Verified tokens are cached (by SHA-256 of the token) until they expire
+TOKEN_CACHE_MAX_ENTRIES = config("TOKEN_CACHE_MAX_ENTRIES", default=10000, cast=int)
+# Shared secret for internal service-to-service endpoints (disabled when empty)
+INTERNAL_API_KEY = config("INTERNAL_API_KEY", default="")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+def parse_signing_keys(raw: str) -> Dict[str, str]:
+    """
+    Parse SIGNING_KEYS into a kid -> secret mapping
+    Falls back to SECRET_KEY under the "default" kid when none are configured
+    """
+    keys = {}
+    for entry in raw.split(","):
+        if ":" in entry:
+            kid, secret = entry.split(":", 1)
+            keys[kid.strip()] = secret.strip()
+    if not keys:
+        keys["default"] = SECRET_KEY
+    return keys
+
+_signing_keys = parse_signing_keys(SIGNING_KEYS)
+if ACTIVE_KID not in _signing_keys:
+    raise RuntimeError(f"ACTIVE_KID '{ACTIVE_KID}' is not in SIGNING_KEYS")
+
+# sha256(token) -> (claims, exp as a unix timestamp)
+_token_cache: Dict[bytes, Tuple[dict, float]] = {}
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     try:
@@ -59,9 +92,60 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(
+        to_encode,
+        _signing_keys[ACTIVE_KID],
+        algorithm=ALGORITHM,
+        headers={"kid": ACTIVE_KID}
+    )
     return encoded_jwt
 
+def _verify_token(token: str) -> dict:
+    """Full signature and expiry check, using the key named by the token's kid"""
+    kid = jwt.get_unverified_header(token).get("kid")
+    if kid is None:
+        # Pre-rotation tokens; SECRET_KEY stops being trusted once SIGNING_KEYS is set
+        if SIGNING_KEYS:
+            raise JWTError("Token has no signing key ID")
+        secret = SECRET_KEY
+    else:
+        secret = _signing_keys.get(kid)
+    if secret is None:
+        raise JWTError("Unknown signing key")
+    return jwt.decode(token, secret, algorithms=[ALGORITHM])
+
+def decode_access_token(token: str) -> dict:
+    """
+    Get a token's verified claims
+    
+    A token that already passed verification is served from the in-process
+    cache until its exp, skipping the signature check on repeat requests.
+    
+    Args:
+        token: Encoded JWT
+    
+    Returns:
+        The token's claims
+    
+    Raises:
+        JWTError: If the token is invalid, expired or signed with an unknown key
+    """
+    cache_key = hashlib.sha256(token.encode()).digest()
+    cached = _token_cache.get(cache_key)
+    if cached is not None:
+        if time.time() < cached[1]:
+            return cached[0]
+        del _token_cache[cache_key]
+    
+    payload = _verify_token(token)
+    exp = payload.get("exp")
+    if exp is not None:
+        if len(_token_cache) >= TOKEN_CACHE_MAX_ENTRIES:
+            # Evict the oldest entry (dicts keep insertion order)
+            _token_cache.pop(next(iter(_token_cache)))
+        _token_cache[cache_key] = (payload, float(exp))
+    return payload
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
     """Get the current authenticated user from JWT token"""
     credentials_exception = HTTPException(
@@ -70,7 +154,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         user_id: str = payload.get("id")
         if user_id is None:
             raise credentials_exception
@@ -78,8 +162,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
     except JWTError:
         raise credentials_exception
     
+    # Identity fields only: counters live in user_stats and are loaded where needed
     users_collection = get_collection("users")
-    user_doc = await users_collection.find_one({"_id": ObjectId(token_data.id)})
+    user_doc = await users_collection.find_one(
+        {"_id": ObjectId(token_data.id)},
+        {"email": 1, "username": 1, "hashed_password": 1, "group_ids": 1, "timezone": 1}
+    )
     
     if user_doc is None:
         raise credentials_exception
@@ -89,3 +177,10 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
     del user_doc["_id"]
     return UserInDB(**user_doc)
 
+async def require_internal_key(x_internal_key: Optional[str] = Header(default=None)):
+    """Allow a request only if it carries the configured internal API key"""
+    if not INTERNAL_API_KEY or x_internal_key is None or not hmac.compare_digest(x_internal_key, INTERNAL_API_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Internal API key required"
+        )
@@ -0,0 +1,176 @@
+"""
+Change Feed - MongoDB Async
+Tails MongoDB change streams and fans changes out to in-process handlers
+
+Change streams need a replica set (or sharded cluster). On a standalone
+server, or a test stand-in without watch(), each collection falls back to
+polling a watermark field instead:
+
+    user_stats       stats_updated_at   (set by points / streak updates)
+    tasks            updated_at
+    task_tombstones  deleted_at
+    groups           snapshot_refreshed_at
+
+Polling only sees inserts and updates that move the watermark; deletes are
+only delivered through change streams (task deletes are also visible in
+both modes as task_tombstones inserts).
+
+Handlers receive a normalized change dict:
+
+    {"collection", "operation", "document_id", "document", "updated_fields"}
+
+and must not block (push to a queue or drop a cache entry and return).
+"""
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+from decouple import config
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+from core.database import get_collection
+
+CHANGE_FEED_ENABLED = config("CHANGE_FEED_ENABLED", default=True, cast=bool)
+# "auto" tries change streams and falls back to polling; "poll" forces polling
+CHANGE_FEED_MODE = config("CHANGE_FEED_MODE", default="auto")
+CHANGE_FEED_POLL_SECONDS = config("CHANGE_FEED_POLL_SECONDS", default=2.0, cast=float)
+CHANGE_FEED_POLL_BATCH = 500
+
+WATCHED_COLLECTIONS = {
+    "user_stats": "stats_updated_at",
+    "tasks": "updated_at",
+    "task_tombstones": "deleted_at",
+    "groups": "snapshot_refreshed_at"
+}
+# Fields handlers need from user_stats documents (keeps change events small)
+STATS_FIELDS = ["total_points", "current_streak"]
+
+ChangeHandler = Callable[[Dict], Awaitable[None]]
+
+_handlers: Dict[str, List[ChangeHandler]] = {}
+# Latest resume token per collection, so a dropped stream resumes in place
+_resume_tokens: Dict[str, dict] = {}
+
+def register_change_handler(collection_name: str, handler: ChangeHandler):
+    """
+    Subscribe a handler to changes on a watched collection
+
+    Args:
+        collection_name: One of WATCHED_COLLECTIONS
+        handler: Async callable receiving the normalized change dict
+    """
+    _handlers.setdefault(collection_name, []).append(handler)
+
+async def dispatch_change(change: Dict):
+    """Run every handler registered for the change's collection"""
+    for handler in _handlers.get(change["collection"], []):
+        try:
+            await handler(change)
+        except Exception as e:
+            print(f"[{datetime.utcnow()}] ⚠️ Change handler failed on {change['collection']}: {e}")
+
+def _projection(collection_name: str) -> Optional[Dict]:
+    """Fields loaded for a collection's changed documents"""
+    if collection_name == "user_stats":
+        return {field: 1 for field in STATS_FIELDS + [WATCHED_COLLECTIONS["user_stats"]]}
+    return None
+
+def normalize_change_event(collection_name: str, event: dict) -> Dict:
+    """Turn a raw change stream event into the handler format"""
+    document = event.get("fullDocument")
+    projection = _projection(collection_name)
+    if document is not None and projection is not None:
+        document = {key: value for key, value in document.items() if key == "_id" or key in projection}
+
+    update_description = event.get("updateDescription") or {}
+    return {
+        "collection": collection_name,
+        "operation": event.get("operationType"),
+        "document_id": (event.get("documentKey") or {}).get("_id"),
+        "document": document,
+        "updated_fields": list((update_description.get("updatedFields") or {}).keys())
+    }
+
+async def watch_collection(collection_name: str):
+    """
+    Tail one collection's change stream until it fails
+    Raises OperationFailure / NotImplementedError when streams are unsupported
+    """
+    collection = get_collection(collection_name)
+    try:
+        stream = collection.watch(
+            full_document="updateLookup",
+            resume_after=_resume_tokens.get(collection_name)
+        )
+    except (AttributeError, TypeError) as e:
+        # Driver stand-ins without watch()
+        raise NotImplementedError(str(e))
+    async with stream:
+        async for event in stream:
+            _resume_tokens[collection_name] = stream.resume_token
+            await dispatch_change(normalize_change_event(collection_name, event))
+
+async def poll_collection(collection_name: str):
+    """
+    Polling fallback: emit documents whose watermark moved since the last poll
+    """
+    collection = get_collection(collection_name)
+    watermark_field = WATCHED_COLLECTIONS[collection_name]
+    watermark = datetime.utcnow()
+
+    while True:
+        cursor = collection.find(
+            {watermark_field: {"$gt": watermark}},
+            _projection(collection_name)
+        ).sort(watermark_field, ASCENDING).limit(CHANGE_FEED_POLL_BATCH)
+        async for document in cursor:
+            watermark = max(watermark, document[watermark_field])
+            await dispatch_change({
+                "collection": collection_name,
+                "operation": "update",
+                "document_id": document["_id"],
+                "document": document,
+                "updated_fields": []
+            })
+        await asyncio.sleep(CHANGE_FEED_POLL_SECONDS)
+
+async def run_collection_feed(collection_name: str):
+    """
+    Keep one collection's feed running: change stream first, polling if unsupported
+    """
+    use_streams = CHANGE_FEED_MODE != "poll"
+    while True:
+        try:
+            if use_streams:
+                await watch_collection(collection_name)
+            else:
+                await poll_collection(collection_name)
+        except NotImplementedError as e:
+            print(f"[{datetime.utcnow()}] ℹ️ Change streams unavailable for {collection_name}, polling instead ({e})")
+            use_streams = False
+            continue
+        except OperationFailure as e:
+            # 40573: change streams require a replica set
+            if e.code == 40573 or "replica set" in str(e):
+                print(f"[{datetime.utcnow()}] ℹ️ Change streams unavailable for {collection_name}, polling instead")
+                use_streams = False
+                continue
+            print(f"[{datetime.utcnow()}] ⚠️ Change feed error on {collection_name}: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[{datetime.utcnow()}] ⚠️ Change feed error on {collection_name}: {e}")
+        # Back off before reconnecting (resumes from the last token)
+        await asyncio.sleep(CHANGE_FEED_POLL_SECONDS)
+
+def start_change_feed() -> List[asyncio.Task]:
+    """
+    Start one feed task per watched collection
+    Call this from main.py on startup, after handlers are registered
+
+    Returns:
+        The feed tasks
+    """
+    if not CHANGE_FEED_ENABLED:
+        return []
+    return [asyncio.create_task(run_collection_feed(name)) for name in WATCHED_COLLECTIONS]
@@ -1,9 +1,57 @@
+"""
+MongoDB connection, collections, transactions and read routing
+
+Read routing: staleness-tolerant workloads (analytics, leaderboards) can be
+sent to secondaries with READ_PREFERENCES, e.g.
+
+    READ_PREFERENCES=analytics=secondaryPreferred,leaderboard=secondaryPreferred
+    READ_MAX_STALENESS_SECONDS=90
+
+and ask for them with get_collection(name, workload="analytics"). Workloads
+not listed read from the primary.
+
+Read-your-writes: record_causal_fence(user_id) runs after a user's writes and
+stores the cluster time they reached in the causal_fences collection, shared
+by every worker; get_causal_fence(user_id) reads it back (one primary point
+read) and causal_read_session(fence) hands back a causally consistent
+session advanced to that time, so a secondary read waits until it has those
+writes. Nothing is recorded or looked up unless READ_PREFERENCES routes some
+workload to secondaries (off by default). Fences expire
+after READ_MAX_STALENESS_SECONDS (by then every eligible secondary has caught
+up) and a TTL index removes them.
+
+To try it locally, run a single-host replica set:
+
+    mongod --replSet rs0 --dbpath ./data
+    mongosh --eval "rs.initiate()"
+    MONGODB_URL=mongodb://localhost:27017/?replicaSet=rs0
+"""
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
 from decouple import config
 from certifi import where
+from pymongo.read_preferences import Nearest, PrimaryPreferred, Secondary, SecondaryPreferred
+
+from utils.helpers import parse_route_settings
 
 MONGODB_URL = config("MONGODB_URL", default="mongodb://localhost:27017")
 DATABASE_NAME = config("DATABASE_NAME", default="ankiplan")
+# Multi-document transactions need a replica set or sharded cluster
+MONGODB_TRANSACTIONS = config("MONGODB_TRANSACTIONS", default=False, cast=bool)
+# Read preference per workload, e.g. "analytics=secondaryPreferred" (unlisted: primary)
+READ_PREFERENCES = config("READ_PREFERENCES", default="")
+# Skip secondaries lagging more than this (MongoDB requires at least 90)
+READ_MAX_STALENESS_SECONDS = config("READ_MAX_STALENESS_SECONDS", default=90, cast=int)
+
+_READ_PREFERENCE_MODES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest
+}
 
 class Database:
     client: AsyncIOMotorClient = None
@@ -30,7 +78,115 @@ class Database:
         """Get database instance"""
         return cls.client[DATABASE_NAME]
 
+def _parse_read_preferences(raw: str) -> Dict[str, object]:
+    """
+    Build the read preference of each configured workload
+
+    Args:
+        raw: Comma-separated workload=mode pairs
+
+    Returns:
+        workload -> read preference (primary workloads are left out)
+    """
+    read_preferences = {}
+    for workload, mode in parse_route_settings(raw, cast=str.strip):
+        if mode == "primary":
+            continue
+        if mode not in _READ_PREFERENCE_MODES:
+            raise ValueError(f"Unknown read preference for {workload}: {mode}")
+        read_preferences[workload] = _READ_PREFERENCE_MODES[mode](max_staleness=READ_MAX_STALENESS_SECONDS)
+    return read_preferences
+
+_workload_read_preferences = _parse_read_preferences(READ_PREFERENCES)
+
 # Helper function to get collections
-def get_collection(collection_name: str):
+def get_collection(collection_name: str, workload: Optional[str] = None):
+    """
+    Get a collection, routed by the workload's read preference if one is configured
+
+    Args:
+        collection_name: Collection name
+        workload: Read workload (e.g. "analytics", "leaderboard"); None reads from the primary
+    """
     db = Database.get_database()
-    return db[collection_name]
+    read_preference = _workload_read_preferences.get(workload)
+    if read_preference is None:
+        return db[collection_name]
+    return db.get_collection(collection_name, read_preference=read_preference)
+
+def routes_to_secondaries() -> bool:
+    """Whether any workload may read from a secondary"""
+    return bool(_workload_read_preferences)
+
+async def record_causal_fence(user_id: str):
+    """
+    Remember the cluster time reached by a user's writes so far
+    
+    Reads the user's document from the primary in a causally consistent
+    session; the read's operation time covers every write acknowledged
+    before it. No-op when all reads go to the primary.
+    
+    Args:
+        user_id: User whose writes later reads should see
+    """
+    if not routes_to_secondaries():
+        return
+    async with await Database.client.start_session(causal_consistency=True) as session:
+        await get_collection("users").find_one({"_id": ObjectId(user_id)}, {"_id": 1}, session=session)
+        if session.operation_time is None:
+            # Standalone servers don't report cluster times
+            return
+        await get_collection("causal_fences").replace_one(
+            {"_id": user_id},
+            {
+                "cluster_time": session.cluster_time,
+                "operation_time": session.operation_time,
+                "expires_at": datetime.utcnow() + timedelta(seconds=READ_MAX_STALENESS_SECONDS)
+            },
+            upsert=True
+        )
+
+async def get_causal_fence(user_id: str) -> Optional[dict]:
+    """
+    The user's recorded write fence, if it hasn't expired yet
+    
+    Args:
+        user_id: User whose writes reads should see
+    
+    Returns:
+        Fence document, or None (always None when all reads go to the primary)
+    """
+    if not routes_to_secondaries():
+        return None
+    return await get_collection("causal_fences").find_one(
+        {"_id": user_id, "expires_at": {"$gt": datetime.utcnow()}}
+    )
+
+@asynccontextmanager
+async def causal_read_session(fence: Optional[dict]):
+    """
+    Session for reads that must see the writes covered by a fence
+    Yields a causally consistent session, or None when there is no fence
+    """
+    if fence is None:
+        yield None
+        return
+    
+    async with await Database.client.start_session(causal_consistency=True) as session:
+        session.advance_cluster_time(fence["cluster_time"])
+        session.advance_operation_time(fence["operation_time"])
+        yield session
+
+@asynccontextmanager
+async def start_transaction():
+    """
+    Run a block inside a multi-document transaction when enabled
+    Yields the session to pass to each operation, or None when transactions are off
+    """
+    if not MONGODB_TRANSACTIONS:
+        yield None
+        return
+    
+    async with await Database.client.start_session() as session:
+        async with session.start_transaction():
+            yield session
@@ -0,0 +1,142 @@
+"""
+Request Deadlines
+Gives each request a time budget and enforces it on every MongoDB call
+
+The budget comes from REQUEST_DEADLINE_SECONDS, a per-route override in
+REQUEST_DEADLINE_ROUTES, or the client's X-Request-Timeout header (seconds,
+capped at REQUEST_DEADLINE_MAX_SECONDS). It is applied with pymongo.timeout(),
+which Motor carries into its worker threads: each operation is sent with
+maxTimeMS set to the time left, so the server abandons work nobody will
+read, and operations that run out of time raise a timeout error that the
+app turns into 504 (as are waits bounded by remaining(), which raise
+asyncio.TimeoutError).
+
+Background jobs use deadline_scope() directly to give each batch a budget.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+import pymongo
+from decouple import config
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from pymongo.errors import PyMongoError
+
+from utils.helpers import match_route, parse_route_settings
+
+REQUEST_DEADLINE_ENABLED = config("REQUEST_DEADLINE_ENABLED", default=True, cast=bool)
+REQUEST_DEADLINE_SECONDS = config("REQUEST_DEADLINE_SECONDS", default=10.0, cast=float)
+# Upper bound for X-Request-Timeout
+REQUEST_DEADLINE_MAX_SECONDS = config("REQUEST_DEADLINE_MAX_SECONDS", default=30.0, cast=float)
+# Budget per path prefix, e.g. "/analytics=5,/leaderboard=3"
+REQUEST_DEADLINE_ROUTES = config(
+    "REQUEST_DEADLINE_ROUTES",
+    default="/analytics=5,/leaderboard=3,/groups=3,/dashboard=5"
+)
+DEADLINE_HEADER = b"x-request-timeout"
+
+_route_deadlines = parse_route_settings(REQUEST_DEADLINE_ROUTES, cast=float)
+# Monotonic time at which the current request's budget runs out
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+def remaining() -> Optional[float]:
+    """
+    Seconds left in the current deadline
+
+    Returns:
+        Seconds (may be negative), or None outside a deadline scope
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """
+    Run a block under a deadline (nested scopes can only shorten it)
+
+    Args:
+        seconds: Budget for the block
+    """
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+    token = _deadline.set(deadline)
+    try:
+        with pymongo.timeout(seconds):
+            yield
+    finally:
+        _deadline.reset(token)
+
+def is_timeout_error(error: BaseException) -> bool:
+    """Whether a driver error means the operation ran out of time"""
+    return isinstance(error, PyMongoError) and error.timeout
+
+def request_deadline_seconds(scope) -> float:
+    """
+    Budget for one request: the client's header, else the route's, else the default
+
+    Args:
+        scope: ASGI scope
+
+    Returns:
+        Seconds
+    """
+    for name, value in scope.get("headers", []):
+        if name == DEADLINE_HEADER:
+            try:
+                requested = float(value)
+            except ValueError:
+                break
+            if requested > 0:
+                return min(requested, REQUEST_DEADLINE_MAX_SECONDS)
+            break
+    prefix = match_route(scope.get("path", ""), _route_deadlines)
+    if prefix is not None:
+        return dict(_route_deadlines)[prefix]
+    return REQUEST_DEADLINE_SECONDS
+
+class DeadlineMiddleware:
+    """ASGI middleware running each request inside its deadline scope"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # Server-Sent Event streams stay open by design
+        if (
+            not REQUEST_DEADLINE_ENABLED
+            or scope["type"] != "http"
+            or scope.get("path", "").endswith("/stream")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        with deadline_scope(request_deadline_seconds(scope)):
+            await self.app(scope, receive, send)
+
+async def deadline_exceeded_handler(request: Request, exc: PyMongoError):
+    """
+    Answer database timeouts with 504; other driver errors stay 500s
+    Registered on the app for PyMongoError
+    """
+    if not is_timeout_error(exc):
+        raise exc
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": "Request deadline exceeded"}
+    )
+
+async def wait_timeout_handler(request: Request, exc: asyncio.TimeoutError):
+    """
+    Answer requests that ran out of time waiting (e.g. on a shared query) with 504
+    Registered on the app for asyncio.TimeoutError
+    """
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": "Request deadline exceeded"}
+    )
@@ -0,0 +1,100 @@
+"""
+MongoDB Index Definitions
+Creates the indexes the service layer relies on (idempotent, run on startup)
+"""
+from decouple import config
+from pymongo import ASCENDING, DESCENDING
+
+from core.database import get_collection
+
+# Processed outbox events are kept this long for debugging, then expire
+EVENT_RETENTION_SECONDS = config("EVENT_RETENTION_SECONDS", default=604800, cast=int)
+# Deleted tasks are remembered this long; older sync tokens need a full refetch
+TASK_TOMBSTONE_RETENTION_DAYS = config("TASK_TOMBSTONE_RETENTION_DAYS", default=30, cast=int)
+
+async def ensure_indexes():
+    """
+    Create all required indexes if they don't exist yet
+    Called once from the application lifespan after connecting
+    """
+    stats_collection = get_collection("user_stats")
+
+    # Nightly streak decay runs one update_many per timezone bucket
+    await stats_collection.create_index([("timezone", ASCENDING), ("last_active_date", ASCENDING)])
+    # Global leaderboard
+    await stats_collection.create_index([("total_points", DESCENDING)])
+    # Recommendation precompute walks the most recently active users first
+    await stats_collection.create_index([("last_active_date", DESCENDING)])
+    # Change feed watermark polling
+    await stats_collection.create_index([("stats_updated_at", ASCENDING)])
+
+    groups_collection = get_collection("groups")
+
+    # Snapshot sync looks up every group containing a member
+    await groups_collection.create_index([("members", ASCENDING)])
+    # Change feed watermark polling
+    await groups_collection.create_index([("snapshot_refreshed_at", ASCENDING)])
+
+    memberships_collection = get_collection("group_memberships")
+
+    # One membership per (group, user); also rejects concurrent duplicate joins
+    await memberships_collection.create_index(
+        [("group_id", ASCENDING), ("user_id", ASCENDING)],
+        unique=True
+    )
+    # Paged member listing / group leaderboard, highest points first
+    await memberships_collection.create_index([("group_id", ASCENDING), ("total_points", DESCENDING)])
+    # Leave and stats sync look up every membership of a user
+    await memberships_collection.create_index([("user_id", ASCENDING)])
+
+    task_logs_collection = get_collection("task_logs")
+
+    # Analytics windows and profile rebuilds scan a user's logs by time
+    await task_logs_collection.create_index([("user_id", ASCENDING), ("timestamp", DESCENDING)])
+
+    events_collection = get_collection("task_events")
+
+    # Outbox consumers claim the oldest pending / lease-expired events
+    await events_collection.create_index([("status", ASCENDING), ("created_at", ASCENDING)])
+    # Processed events expire automatically (pending ones have no processed_at)
+    await events_collection.create_index(
+        [("processed_at", ASCENDING)],
+        expireAfterSeconds=EVENT_RETENTION_SECONDS
+    )
+
+    refresh_tokens_collection = get_collection("refresh_tokens")
+
+    # Refresh lookups by token hash (unique: hashes of random tokens never collide)
+    await refresh_tokens_collection.create_index([("token_hash", ASCENDING)], unique=True)
+    # Family revocation on reuse / logout
+    await refresh_tokens_collection.create_index([("family_id", ASCENDING)])
+    # Expired tokens are removed by MongoDB
+    await refresh_tokens_collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+    tasks_collection = get_collection("tasks")
+
+    # /tasks/changes reads a user's tasks in (updated_at, _id) order from a sync token
+    await tasks_collection.create_index([("user_id", ASCENDING), ("updated_at", ASCENDING), ("_id", ASCENDING)])
+    # Task lists sort by (priority, rank); new tasks look up the last rank in their priority
+    await tasks_collection.create_index([("user_id", ASCENDING), ("priority", ASCENDING), ("rank", ASCENDING)])
+    # Change feed watermark polling (across all users, so the index above doesn't serve it)
+    await tasks_collection.create_index([("updated_at", ASCENDING)])
+
+    tombstones_collection = get_collection("task_tombstones")
+
+    # Deleted task IDs per user since a sync token, expired after the retention window
+    await tombstones_collection.create_index([("user_id", ASCENDING), ("deleted_at", ASCENDING)])
+    await tombstones_collection.create_index(
+        [("deleted_at", ASCENDING)],
+        expireAfterSeconds=TASK_TOMBSTONE_RETENTION_DAYS * 86400
+    )
+
+    title_recommendations_collection = get_collection("task_title_recommendations")
+
+    # Workers load one build at a time; the leader prunes older builds
+    await title_recommendations_collection.create_index([("built_at", ASCENDING)])
+
+    causal_fences_collection = get_collection("causal_fences")
+
+    # Read-your-writes fences are only needed until secondaries catch up
+    await causal_fences_collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
@@ -0,0 +1,88 @@
+"""
+Leader Election (single host)
+Makes sure process-wide singletons run in exactly one worker process
+
+serve.py starts several uvicorn workers, each running the lifespan. Jobs that
+must only run once per deployment (the task reset scheduler, the nightly
+recommendation precompute, the similarity recommender build) are started by
+whichever worker holds an exclusive lock on LEADER_LOCK_FILE. Workers that
+don't hold it keep retrying so a recycled or crashed leader is replaced. The
+OS releases the lock when the holder exits.
+
+The lock is a local file, so this coordinates the workers of one host. Run
+singletons on one host only (or set LEADER_ELECTION=false on the others and
+disable them there).
+"""
+import asyncio
+import os
+import tempfile
+from datetime import datetime
+from typing import Callable, List, Optional
+from decouple import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+LEADER_ELECTION = config("LEADER_ELECTION", default=True, cast=bool)
+LEADER_LOCK_FILE = config("LEADER_LOCK_FILE", default=os.path.join(tempfile.gettempdir(), "ankiplan-leader.lock"))
+LEADER_RETRY_SECONDS = config("LEADER_RETRY_SECONDS", default=30, cast=int)
+
+_lock_fd: Optional[int] = None
+
+def try_acquire_leadership() -> bool:
+    """
+    Try to become the leader without blocking
+
+    Returns:
+        True if this process holds (or already held) the leader lock
+    """
+    global _lock_fd
+    if _lock_fd is not None:
+        return True
+    if not LEADER_ELECTION or fcntl is None:
+        _lock_fd = -1
+        return True
+
+    fd = os.open(LEADER_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    _lock_fd = fd
+    return True
+
+def is_leader() -> bool:
+    """Whether this process currently holds the leader lock"""
+    return _lock_fd is not None
+
+def release_leadership():
+    """Release the leader lock (called on shutdown)"""
+    global _lock_fd
+    if _lock_fd is not None and _lock_fd >= 0:
+        fcntl.flock(_lock_fd, fcntl.LOCK_UN)
+        os.close(_lock_fd)
+    _lock_fd = None
+
+async def run_when_leader(start_singletons: Callable[[], List[asyncio.Task]]):
+    """
+    Start the singleton jobs once this process becomes the leader
+
+    Args:
+        start_singletons: Starts the jobs and returns their tasks
+    """
+    while not try_acquire_leadership():
+        await asyncio.sleep(LEADER_RETRY_SECONDS)
+    print(f"[{datetime.utcnow()}] ✅ Worker {os.getpid()} is the scheduler leader")
+
+    tasks = start_singletons()
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
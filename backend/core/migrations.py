@@ -0,0 +1,82 @@
+"""
+Data Migrations
+Idempotent, in-place data migrations run on startup after indexes are created
+"""
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from core.database import get_collection
+from services.ranking import backfill_missing_ranks
+from services.stats_service import STATS_DEFAULTS
+
+# Fields that moved from users documents into user_stats
+MOVED_USER_FIELDS = list(STATS_DEFAULTS) + ["tasks_version", "recent_event_ids", "stats_updated_at"]
+USER_STATS_BATCH_SIZE = 500
+
+async def backfill_group_member_count():
+    """
+    Give groups created before member_count existed their current member count
+    Later joins and leaves maintain it with $inc
+    """
+    groups_collection = get_collection("groups")
+    await groups_collection.update_many(
+        {"member_count": {"$exists": False}},
+        [{"$set": {"member_count": {"$size": {"$ifNull": ["$members", []]}}}}]
+    )
+
+async def backfill_task_version():
+    """
+    Give tasks created before optimistic concurrency the initial version 1
+    Every write increments it from there
+    """
+    tasks_collection = get_collection("tasks")
+    await tasks_collection.update_many(
+        {"version": {"$exists": False}},
+        {"$set": {"version": 1}}
+    )
+
+async def backfill_user_stats():
+    """
+    Move counters stored on users documents into user_stats
+    Existing stats documents win, so a migration interrupted between the two
+    steps can simply run again
+    """
+    users_collection = get_collection("users")
+    stats_collection = get_collection("user_stats")
+
+    projection = {field: 1 for field in MOVED_USER_FIELDS + ["timezone"]}
+    cursor = users_collection.find({"total_points": {"$exists": True}}, projection)
+    while True:
+        batch = await cursor.to_list(length=USER_STATS_BATCH_SIZE)
+        if not batch:
+            break
+
+        operations = []
+        for user_doc in batch:
+            stats = {field: user_doc.get(field, default) for field, default in STATS_DEFAULTS.items()}
+            stats.update({
+                "timezone": user_doc.get("timezone") or "UTC",
+                "tasks_version": user_doc.get("tasks_version", 0),
+                "recent_event_ids": user_doc.get("recent_event_ids", []),
+                "stats_updated_at": user_doc.get("stats_updated_at") or datetime.utcnow()
+            })
+            operations.append(UpdateOne({"_id": str(user_doc["_id"])}, {"$setOnInsert": stats}, upsert=True))
+        await stats_collection.bulk_write(operations, ordered=False)
+
+        await users_collection.update_many(
+            {"_id": {"$in": [ObjectId(user_doc["_id"]) for user_doc in batch]}},
+            {"$unset": {field: "" for field in MOVED_USER_FIELDS}}
+        )
+
+async def run_migrations():
+    """
+    Run all data migrations in order
+    Each migration only touches documents that still need it
+    """
+    await backfill_group_member_count()
+    await backfill_task_version()
+    # Tasks created before rank keys: ranked in their old (priority, created_at) order
+    await backfill_missing_ranks()
+    # Users created before user_stats: counters move out of the identity document
+    await backfill_user_stats()
@@ -3,13 +3,22 @@ Background Task Scheduler for Automatic Task Resets
 Runs periodic checks to reset recurring tasks based on their category
 """
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
+from decouple import config
 from core.task_reset import reset_all_due_tasks
+from services.ranking import rebalance_long_ranks
+from services.streak_manager import decay_broken_streaks
+
+# UTC hour at which the nightly recommendation precomputation runs
+RECOMMENDATION_RUN_HOUR = config("RECOMMENDATION_RUN_HOUR", default=2, cast=int)
+# The first recommender build waits this long so NumPy loads after startup
+RECOMMENDER_STARTUP_DELAY_SECONDS = config("RECOMMENDER_STARTUP_DELAY_SECONDS", default=60, cast=int)
 
 async def run_task_reset_scheduler():
     """
     Background scheduler that checks for tasks needing reset
     Runs every hour to check for daily/weekly/weekend/monthly resets
+    and to decay broken streaks
     """
     while True:
         try:
@@ -18,6 +27,16 @@ async def run_task_reset_scheduler():
             if reset_count > 0:
                 print(f"[{datetime.utcnow()}] ✅ Reset {reset_count} tasks")
             
+            # Zero streaks broken by a missed local day (timezones roll over hourly)
+            decayed_count = await decay_broken_streaks()
+            if decayed_count > 0:
+                print(f"[{datetime.utcnow()}] ✅ Reset {decayed_count} broken streaks")
+            
+            # Re-space rank keys that grew long from repeated inserts at one spot
+            rebalanced_count = await rebalance_long_ranks()
+            if rebalanced_count > 0:
+                print(f"[{datetime.utcnow()}] ✅ Rebalanced task ranks for {rebalanced_count} users")
+            
             # Sleep for 1 hour before next check
             await asyncio.sleep(3600)  # 3600 seconds = 1 hour
             
@@ -31,6 +50,76 @@ async def run_task_reset_scheduler():
             # Sleep for shorter time on error to retry sooner
             await asyncio.sleep(300)  # Retry in 5 minutes on error
 
+def seconds_until_hour(hour: int, current_time: datetime = None) -> float:
+    """Seconds from now until the next occurrence of the given UTC hour"""
+    if current_time is None:
+        current_time = datetime.utcnow()
+    next_run = current_time.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if next_run <= current_time:
+        next_run += timedelta(days=1)
+    return (next_run - current_time).total_seconds()
+
+async def run_recommendation_scheduler():
+    """
+    Background scheduler that precomputes AI recommendations once a night
+    Runs at RECOMMENDATION_RUN_HOUR (UTC) for all recently active users
+    """
+    while True:
+        await asyncio.sleep(seconds_until_hour(RECOMMENDATION_RUN_HOUR))
+        # Imported on first run so the AI engine stays out of cold start
+        from services.ai_engine.recommendation_service import precompute_all_recommendations
+        try:
+            refreshed = await precompute_all_recommendations()
+            print(f"[{datetime.utcnow()}] ✅ Precomputed recommendations for {refreshed} users")
+        except Exception as e:
+            # Log error but keep the nightly schedule (non-critical background task)
+            print(f"[{datetime.utcnow()}] ⚠️ Error in recommendation scheduler: {e}")
+
+async def run_recommender_rebuild_scheduler():
+    """
+    Background scheduler that rebuilds the similarity recommender model
+    Runs in the leader worker: builds shortly after startup unless the
+    persisted build is still current, then every RECOMMENDER_REBUILD_SECONDS
+    """
+    await asyncio.sleep(RECOMMENDER_STARTUP_DELAY_SECONDS)
+    # Imported here so NumPy loads after the server is already serving
+    from services.ai_engine.similarity_recommender import RECOMMENDER_REBUILD_SECONDS, get_persisted_build, rebuild_model
+    
+    try:
+        # A restarted leader doesn't rebuild a model that is still current
+        build = await get_persisted_build()
+        if build is not None:
+            age = (datetime.utcnow() - build["built_at"]).total_seconds()
+            await asyncio.sleep(max(0.0, RECOMMENDER_REBUILD_SECONDS - age))
+    except Exception as e:
+        print(f"[{datetime.utcnow()}] ⚠️ Error reading the task recommender build: {e}")
+    
+    while True:
+        try:
+            model = await rebuild_model()
+            print(f"[{datetime.utcnow()}] ✅ Rebuilt task recommender for {model.user_count} users")
+        except Exception as e:
+            # Keep serving the previous model (non-critical background task)
+            print(f"[{datetime.utcnow()}] ⚠️ Error rebuilding task recommender: {e}")
+        await asyncio.sleep(RECOMMENDER_REBUILD_SECONDS)
+
+async def run_recommender_sync_scheduler():
+    """
+    Background scheduler that loads the leader's recommender builds
+    Runs in every worker; only reads the persisted recommendations when a
+    newer build exists
+    """
+    await asyncio.sleep(RECOMMENDER_STARTUP_DELAY_SECONDS)
+    from services.ai_engine.similarity_recommender import RECOMMENDER_SYNC_SECONDS, load_persisted_model
+    
+    while True:
+        try:
+            await load_persisted_model()
+        except Exception as e:
+            # Keep serving the previous model (non-critical background task)
+            print(f"[{datetime.utcnow()}] ⚠️ Error loading task recommender: {e}")
+        await asyncio.sleep(RECOMMENDER_SYNC_SECONDS)
+
 def start_scheduler():
     """
     Start the background scheduler in a separate task
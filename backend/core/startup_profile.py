@@ -0,0 +1,96 @@
+"""
+Startup Profiling
+Measures where cold-start time goes when STARTUP_PROFILE is enabled
+
+    import time    every module imported after install(), with cumulative
+                   (including nested imports) and self time
+    lifespan       duration of each named startup step
+
+main.py installs the import timer before importing anything else and prints
+the report once the lifespan has finished starting up.
+"""
+import importlib.abc
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from decouple import config
+
+STARTUP_PROFILE = config("STARTUP_PROFILE", default=False, cast=bool)
+# Number of slowest modules listed in the report
+STARTUP_PROFILE_TOP_MODULES = config("STARTUP_PROFILE_TOP_MODULES", default=25, cast=int)
+
+_process_start = time.perf_counter()
+# module name -> (cumulative seconds, self seconds)
+_import_times: Dict[str, Tuple[float, float]] = {}
+_step_times: List[Tuple[str, float]] = []
+# Stack of child-import time accumulated by the modules being executed
+_child_time_stack: List[float] = []
+
+class _TimedLoader(importlib.abc.Loader):
+    """Wraps a module loader and records how long exec_module takes"""
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        _child_time_stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            child_time = _child_time_stack.pop()
+            if _child_time_stack:
+                _child_time_stack[-1] += elapsed
+            _import_times[module.__name__] = (elapsed, elapsed - child_time)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+class _TimedFinder(importlib.abc.MetaPathFinder):
+    """Meta path hook that wraps the loader found by the remaining finders"""
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader)
+                return spec
+        return None
+
+def install():
+    """Start timing imports (no-op unless STARTUP_PROFILE is enabled)"""
+    if STARTUP_PROFILE and not any(isinstance(finder, _TimedFinder) for finder in sys.meta_path):
+        sys.meta_path.insert(0, _TimedFinder())
+
+@contextmanager
+def step(name: str):
+    """Time one named startup step"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _step_times.append((name, time.perf_counter() - start))
+
+def report():
+    """Print the import and lifespan timing report (no-op unless enabled)"""
+    if not STARTUP_PROFILE:
+        return
+
+    print(f"⏱️ Startup profile (ready {time.perf_counter() - _process_start:.3f}s after process start)")
+    print(f"  {'cumulative':>10}  {'self':>8}  module")
+    slowest = sorted(_import_times.items(), key=lambda item: item[1][0], reverse=True)
+    for name, (cumulative, own) in slowest[:STARTUP_PROFILE_TOP_MODULES]:
+        print(f"  {cumulative * 1000:>8.1f}ms  {own * 1000:>6.1f}ms  {name}")
+    print(f"  ({len(_import_times)} modules imported)")
+
+    print("  lifespan steps:")
+    for name, elapsed in _step_times:
+        print(f"  {elapsed * 1000:>8.1f}ms  {name}")
@@ -5,9 +5,17 @@ Handles automatic reset of tasks based on their category (daily, weekly, weekend
 from datetime import datetime, timedelta
 from typing import Optional
 from bson import ObjectId
+from decouple import config
+from pymongo.errors import PyMongoError
 
 from core.database import get_collection
+from core.deadline import deadline_scope, is_timeout_error
 from schemas.task_schema import TaskStatus
+from services.stats_service import bump_tasks_version
+
+# Due tasks reset per batch, and the time each batch may spend in MongoDB
+RESET_BATCH_SIZE = config("RESET_BATCH_SIZE", default=500, cast=int)
+RESET_BATCH_BUDGET_SECONDS = config("RESET_BATCH_BUDGET_SECONDS", default=10.0, cast=float)
 
 def calculate_next_reset(category: str, current_time: Optional[datetime] = None) -> datetime:
     """
@@ -61,35 +69,67 @@ async def reset_tasks_for_category(category: str):
     """
     Reset all tasks of a specific category that have passed their next_reset time
     
+    Due tasks are reset in batches of RESET_BATCH_SIZE, each with a
+    RESET_BATCH_BUDGET_SECONDS deadline. A batch that runs out of time stops
+    this run; the remaining tasks are still due and the next run resets them.
+    Task list versions are bumped after every batch, timed out or not.
+    
     Args:
         category: Task category to reset
     """
     tasks_collection = get_collection("tasks")
     current_time = datetime.utcnow()
+    next_reset = calculate_next_reset(category, current_time)
     
-    # Find tasks that need reset (only completed tasks get reset)
+    # Find tasks that need reset (closed tasks: completed or skipped)
     query = {
         "category": category,
         "next_reset": {"$lte": current_time},
-        "status": TaskStatus.COMPLETED.value
+        "status": {"$in": [TaskStatus.COMPLETED.value, TaskStatus.SKIPPED.value]}
     }
     
-    # Reset tasks: set status to pending and update next_reset
     tasks_to_reset = []
-    async for task in tasks_collection.find(query):
-        next_reset = calculate_next_reset(category, current_time)
+    while True:
+        batch = []
+        timed_out = False
+        try:
+            with deadline_scope(RESET_BATCH_BUDGET_SECONDS):
+                batch = await tasks_collection.find(
+                    query,
+                    {"user_id": 1}
+                ).limit(RESET_BATCH_SIZE).to_list(length=RESET_BATCH_SIZE)
+                if not batch:
+                    break
+                
+                # Reset tasks: set status to pending and update next_reset
+                await tasks_collection.update_many(
+                    {"_id": {"$in": [task["_id"] for task in batch]}, **query},
+                    {
+                        "$set": {
+                            "status": TaskStatus.PENDING.value,
+                            "next_reset": next_reset,
+                            "updated_at": current_time
+                        },
+                        "$inc": {"version": 1}
+                    }
+                )
+        except PyMongoError as e:
+            if not is_timeout_error(e):
+                raise
+            timed_out = True
+        
+        # Invalidate the task list ETags of every affected user in one write.
+        # Outside the batch budget: a timed-out update_many may still have reset
+        # some tasks, and the next run won't see them again
+        if batch:
+            await bump_tasks_version(list({task["user_id"] for task in batch}))
+        if timed_out:
+            print(f"[{datetime.utcnow()}] ⚠️ {category} task reset batch ran out of time; the rest is left for the next run")
+            break
         
-        await tasks_collection.update_one(
-            {"_id": task["_id"]},
-            {
-                "$set": {
-                    "status": TaskStatus.PENDING.value,
-                    "next_reset": next_reset,
-                    "updated_at": current_time
-                }
-            }
-        )
-        tasks_to_reset.append(str(task["_id"]))
+        tasks_to_reset.extend(str(task["_id"]) for task in batch)
+        if len(batch) < RESET_BATCH_SIZE:
+            break
     
     return tasks_to_reset
 
@@ -1,25 +1,84 @@
+# Installed first so STARTUP_PROFILE can time every import below
+from core import startup_profile
+startup_profile.install()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from pymongo.errors import PyMongoError
 from contextlib import asynccontextmanager
 import os
+import sys
 import asyncio
 
+from core.admission import AdmissionControlMiddleware, get_admission_metrics
+from core.change_feed import register_change_handler, start_change_feed
 from core.database import Database
-from core.scheduler import run_task_reset_scheduler
-from routers import auth, tasks, groups, leaderboard, ai_assistant, analytics, users
+from core.deadline import DeadlineMiddleware, deadline_exceeded_handler, wait_timeout_handler
+from core.indexes import ensure_indexes
+from core.leader import release_leadership, run_when_leader
+from core.migrations import run_migrations
+from core.scheduler import (
+    run_recommendation_scheduler,
+    run_recommender_rebuild_scheduler,
+    run_recommender_sync_scheduler,
+    run_task_reset_scheduler
+)
+from services.ai_engine.performance_profile import handle_task_change
+from services.event_outbox import get_outbox_metrics, start_event_consumers
+from services.leaderboard_stream import handle_group_change, handle_stats_change
+from services.task_stream import handle_task_stream_change, handle_tombstone_change
+from utils.single_flight import get_single_flight_metrics
+from routers import auth, tasks, groups, leaderboard, ai_assistant, analytics, users, dashboard
+
+def start_singleton_jobs():
+    """Start the jobs that must run in only one worker"""
+    # Start background task reset scheduler
+    reset_scheduler = asyncio.create_task(run_task_reset_scheduler())
+    print("✅ Task reset scheduler started")
+    # Start nightly AI recommendation precomputation
+    recommendation_scheduler = asyncio.create_task(run_recommendation_scheduler())
+    # Build the similarity task recommender (other workers load the persisted build)
+    recommender_rebuild = asyncio.create_task(run_recommender_rebuild_scheduler())
+    return [reset_scheduler, recommendation_scheduler, recommender_rebuild]
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    await Database.connect()
+    with startup_profile.step("connect"):
+        await Database.connect()
+    with startup_profile.step("ensure_indexes"):
+        await ensure_indexes()
+    with startup_profile.step("run_migrations"):
+        await run_migrations()
     # Ensure uploads directory exists
     os.makedirs("uploads", exist_ok=True)
-    # Start background task reset scheduler
-    asyncio.create_task(run_task_reset_scheduler())
-    print("✅ Task reset scheduler started")
+    with startup_profile.step("background_tasks"):
+        # Once-per-deployment jobs run only in the leader worker
+        leader_task = asyncio.create_task(run_when_leader(start_singleton_jobs))
+        # Keep this worker's similarity recommender in step with the leader's builds
+        recommender_sync = asyncio.create_task(run_recommender_sync_scheduler())
+        # Start the task event outbox consumers
+        event_consumers = start_event_consumers()
+        if event_consumers:
+            print(f"✅ {len(event_consumers)} task event consumers started")
+        # Tail user_stats/tasks/groups changes for cache invalidation, live leaderboards and task streams
+        register_change_handler("user_stats", handle_stats_change)
+        register_change_handler("groups", handle_group_change)
+        register_change_handler("tasks", handle_task_change)
+        register_change_handler("tasks", handle_task_stream_change)
+        register_change_handler("task_tombstones", handle_tombstone_change)
+        change_feeds = start_change_feed()
+    startup_profile.report()
     yield
     # Shutdown
+    for background_task in [leader_task, recommender_sync] + event_consumers + change_feeds:
+        background_task.cancel()
+    release_leadership()
+    # Only loaded if a recommender rebuild ran (it pulls in NumPy)
+    similarity_recommender = sys.modules.get("services.ai_engine.similarity_recommender")
+    if similarity_recommender is not None:
+        similarity_recommender.shutdown_process_pool()
     await Database.close()
 
 app = FastAPI(
@@ -28,6 +87,13 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Admission control (inside CORS, so rejections still carry CORS headers)
+app.add_middleware(AdmissionControlMiddleware)
+# Request deadlines (outside admission control, so queueing counts against them)
+app.add_middleware(DeadlineMiddleware)
+app.add_exception_handler(PyMongoError, deadline_exceeded_handler)
+app.add_exception_handler(asyncio.TimeoutError, wait_timeout_handler)
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -38,7 +104,8 @@ app.add_middleware(
 )
 
 # Static file serving for uploads
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# (the directory is created in the lifespan, before the first request)
+app.mount("/uploads", StaticFiles(directory="uploads", check_dir=False), name="uploads")
 
 # Include routers
 app.include_router(auth.router)
@@ -48,6 +115,7 @@ app.include_router(leaderboard.router)
 app.include_router(ai_assistant.router)
 app.include_router(analytics.router)
 app.include_router(users.router)
+app.include_router(dashboard.router)
 
 @app.get("/")
 async def root():
@@ -61,6 +129,22 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/outbox")
+async def outbox_health():
+    """Task event outbox depth and consumer lag"""
+    return await get_outbox_metrics()
+
+@app.get("/health/admission")
+async def admission_health():
+    """Requests admitted, in flight and shed by admission control (this worker)"""
+    return get_admission_metrics()
+
+@app.get("/health/coalescing")
+async def coalescing_health():
+    """Single-flight calls, executions and coalesced calls per read (this worker)"""
+    return get_single_flight_metrics()
+
 if __name__ == "__main__":
+    # Development server (production: python serve.py)
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -2,13 +2,22 @@
 AI Assistant Router - MongoDB Async
 Endpoints for AI-powered motivation and task suggestions
 """
-from fastapi import APIRouter, Depends
-from core.auth import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel, Field
+from typing import List
+from core.auth import get_current_user, require_internal_key
 from schemas.user_schema import UserOut
-from services.ai_engine import motivation_engine, task_suggester
 
 router = APIRouter(prefix="/ai", tags=["AI Assistant"])
 
+def _recommendation_service():
+    """Import the AI engine on first use, keeping it (and NumPy) out of cold start"""
+    from services.ai_engine import recommendation_service
+    return recommendation_service
+
+class RecommendationBatchRequest(BaseModel):
+    user_ids: List[str] = Field(..., min_length=1, max_length=1000)
+
 @router.get("/motivate")
 async def motivate_user(
     current_user: UserOut = Depends(get_current_user)
@@ -17,7 +26,8 @@ async def motivate_user(
     Gets a dynamic motivational message for the current user.
     Uses their performance data to generate personalized encouragement.
     """
-    return motivation_engine.generate_motivational_message(current_user)
+    recommendations = await _recommendation_service().get_recommendations(current_user)
+    return recommendations["motivation"]
 
 @router.get("/suggest")
 async def suggest_task_for_user(
@@ -27,7 +37,8 @@ async def suggest_task_for_user(
     Suggests a new task for the current user based on their performance.
     Considers their completion ratio, streak, and points to provide relevant suggestions.
     """
-    return task_suggester.suggest_new_task(current_user)
+    recommendations = await _recommendation_service().get_recommendations(current_user)
+    return recommendations["suggestion"]
 
 @router.get("/motivate/{user_id}")
 async def motivate_user_by_id(
@@ -41,13 +52,13 @@ async def motivate_user_by_id(
     # For now, only allow users to get their own motivation
     # Can be extended to allow admins to view other users
     if user_id != current_user.id:
-        from fastapi import HTTPException, status
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only view your own motivation messages"
         )
     
-    return motivation_engine.generate_motivational_message(current_user)
+    recommendations = await _recommendation_service().get_recommendations(current_user)
+    return recommendations["motivation"]
 
 @router.get("/suggest/{user_id}")
 async def suggest_task_for_user_by_id(
@@ -60,11 +71,28 @@ async def suggest_task_for_user_by_id(
     """
     # For now, only allow users to get their own suggestions
     if user_id != current_user.id:
-        from fastapi import HTTPException, status
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only view your own task suggestions"
         )
     
-    return task_suggester.suggest_new_task(current_user)
+    recommendations = await _recommendation_service().get_recommendations(current_user)
+    return recommendations["suggestion"]
 
+@router.get("/recommendations")
+async def get_my_recommendations(
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Gets the motivation message and task suggestion for the current user in one call.
+    Served from the precomputed store when fresh (see computed_at).
+    """
+    return await _recommendation_service().get_recommendations(current_user)
+
+@router.post("/recommendations/batch", dependencies=[Depends(require_internal_key)])
+async def get_recommendations_for_users(request: RecommendationBatchRequest):
+    """
+    Gets recommendations for many users at once (internal use, e.g. the nightly email digest).
+    Requires the X-Internal-Key header. Unknown user IDs are omitted from the result.
+    """
+    return {"recommendations": await _recommendation_service().get_recommendations_batch(request.user_ids)}
@@ -2,7 +2,7 @@
 Analytics Router - MongoDB Async
 Endpoints for user progress tracking and analytics
 """
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from typing import Optional
 
 from core.auth import get_current_user
@@ -43,7 +43,6 @@ async def get_analytics_for_user(
     """
     # For now, only allow users to get their own analytics
     if user_id != current_user.id:
-        from fastapi import HTTPException, status
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only view your own analytics"
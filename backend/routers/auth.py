@@ -3,7 +3,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from bson import ObjectId
 from datetime import timedelta
 
-from core.database import get_collection
+from core.database import get_collection, start_transaction
 from core.auth import (
     verify_password,
     get_password_hash,
@@ -11,10 +11,21 @@ from core.auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from schemas.user_schema import UserCreate, UserOut
-from schemas.token_schema import Token
+from schemas.token_schema import RefreshRequest, Token
+from services.refresh_token_service import issue_refresh_token, revoke_refresh_token, rotate_refresh_token
+from services.stats_service import create_user_stats
+from utils.helpers import validate_timezone
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+def _access_token_for(user_id: str, email: str) -> str:
+    """Create a standard-lifetime access token"""
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    return create_access_token(
+        data={"id": user_id, "email": email},
+        expires_delta=access_token_expires
+    )
+
 @router.post("/signup", response_model=Token, status_code=status.HTTP_201_CREATED)
 async def signup(user: UserCreate):
     """Create a new user account and return access token"""
@@ -36,31 +47,32 @@ async def signup(user: UserCreate):
             detail="Username already taken"
         )
     
-    # Create new user with gamification fields initialized
+    try:
+        validate_timezone(user.timezone)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    # Create the identity document; gamification counters live in user_stats
     hashed_password = get_password_hash(user.password)
     user_doc = {
         "email": user.email,
         "username": user.username,
         "hashed_password": hashed_password,
-        "total_points": 0,
-        "current_streak": 0,
-        "last_active_date": None,
-        "completed_tasks": 0,
-        "failed_tasks": 0,
-        "group_ids": []
+        "group_ids": [],
+        "timezone": user.timezone
     }
     
-    result = await users_collection.insert_one(user_doc)
-    user_id = str(result.inserted_id)
+    # Both documents together when transactions are on; counter writes upsert otherwise
+    async with start_transaction() as session:
+        result = await users_collection.insert_one(user_doc, session=session)
+        user_id = str(result.inserted_id)
+        await create_user_stats(user_id, user.timezone, session=session)
     
-    # Create access token for new user (auto-login)
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"id": user_id, "email": user.email},
-        expires_delta=access_token_expires
-    )
+    # Create access and refresh tokens for new user (auto-login)
+    access_token = _access_token_for(user_id, user.email)
+    refresh_token = await issue_refresh_token(user_id)
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
 
 @router.post("/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
@@ -77,12 +89,35 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Create access token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"id": str(user["_id"]), "email": user["email"]},
-        expires_delta=access_token_expires
-    )
+    # Create access token, plus a refresh token so the client doesn't log in again
+    access_token = _access_token_for(str(user["_id"]), user["email"])
+    refresh_token = await issue_refresh_token(str(user["_id"]))
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/refresh", response_model=Token)
+async def refresh(request: RefreshRequest):
+    """
+    Exchange a refresh token for a new access token (no password check)
+    The refresh token is rotated: use the one returned from now on
+    """
+    users_collection = get_collection("users")
+    
+    user_id, refresh_token = await rotate_refresh_token(request.refresh_token)
+    
+    user = await users_collection.find_one({"_id": ObjectId(user_id)}, {"email": 1})
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    access_token = _access_token_for(user_id, user["email"])
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(request: RefreshRequest):
+    """Revoke a refresh token (and every token rotated from it)"""
+    await revoke_refresh_token(request.refresh_token)
 
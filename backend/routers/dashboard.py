@@ -0,0 +1,25 @@
+"""
+Dashboard Router - MongoDB Async
+One-call page bootstrap replacing /users/me, /tasks/, /tasks/priority_queue,
+/analytics/me, /ai/motivate and /ai/suggest
+"""
+from fastapi import APIRouter, Depends, Query
+
+from core.auth import get_current_user
+from schemas.user_schema import UserOut
+from services.dashboard_service import DASHBOARD_SECTIONS, build_dashboard, parse_sections
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+@router.get("")
+async def get_dashboard(
+    sections: str = Query(default="", description=f"Comma-separated subset of: {', '.join(DASHBOARD_SECTIONS)}"),
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Get everything the dashboard page needs in one response
+    
+    Query params:
+    - sections: Only include these sections (default: all)
+    """
+    return await build_dashboard(current_user, parse_sections(sections))
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from bson import ObjectId
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from typing import List, Optional
+from decouple import config
 from pydantic import BaseModel
 
 from core.database import get_collection
 from core.auth import get_current_user
 from schemas.user_schema import UserOut
+from services.group_service import get_group_members_page
+from services.group_snapshot import get_group_with_snapshot
+from services.leaderboard_service import get_group_rankings, get_top_users
+from services.leaderboard_stream import GLOBAL_CHANNEL, subscribe, unsubscribe
+from services.stats_service import get_user_stats
+from utils.sse import sse_response, stream_queue
 
 router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
 
+# Idle seconds between SSE heartbeat comments
+LEADERBOARD_STREAM_HEARTBEAT_SECONDS = config("LEADERBOARD_STREAM_HEARTBEAT_SECONDS", default=15, cast=int)
+
 class LeaderboardEntry(BaseModel):
     user_id: str
     username: str
@@ -30,49 +39,65 @@ class GroupBoardEntry(BaseModel):
     group_name: str
     total_points: int
 
+@router.get("/stream")
+async def stream_leaderboard(
+    request: Request,
+    group_id: Optional[str] = None,
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Live leaderboard updates as Server-Sent Events
+    
+    Fetch the board once, then apply the pushed deltas:
+    - points: {user_id, username, total_points, current_streak}
+    - group_changed: membership changed, refetch the group board
+    
+    Query params:
+    - group_id: Stream one group's board (member only); omit for the global board
+    """
+    if group_id is not None and group_id not in current_user.group_ids:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not a member of this group"
+        )
+    
+    channel = group_id or GLOBAL_CHANNEL
+    queue = subscribe(channel)
+    
+    async def events():
+        try:
+            async for message in stream_queue(request, queue, LEADERBOARD_STREAM_HEARTBEAT_SECONDS):
+                yield message
+        finally:
+            unsubscribe(channel, queue)
+    
+    return sse_response(events())
+
 @router.get("/{group_id}", response_model=LeaderboardResponse)
 async def get_leaderboard(
     group_id: str,
+    limit: int = Query(default=100, ge=1, le=500),
     current_user: UserOut = Depends(get_current_user)
 ):
-    """Get leaderboard for a specific group"""
-    groups_collection = get_collection("groups")
-    users_collection = get_collection("users")
-    
-    # Fetch the group
-    group = await groups_collection.find_one({"_id": ObjectId(group_id)})
+    """Get leaderboard for a specific group (top `limit` members)"""
+    # Fetch the group together with its member snapshot
+    group = await get_group_with_snapshot(group_id)
     if not group:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Group not found"
         )
     
-    # Get members list from group
-    members = group.get("members", [])
-    if not members:
-        return LeaderboardResponse(
-            group_id=group_id,
-            group_name=group.get("group_name", ""),
-            rankings=[]
+    # Members come back sorted by total_points descending
+    rankings = [
+        LeaderboardEntry(
+            user_id=member["user_id"],
+            username=member["username"],
+            email=member["email"],
+            total_points=member["total_points"]
         )
-    
-    # Convert string IDs to ObjectIds
-    member_object_ids = [ObjectId(member_id) for member_id in members]
-    
-    # Query users where _id is in members list
-    cursor = users_collection.find({"_id": {"$in": member_object_ids}})
-    
-    rankings = []
-    async for user_doc in cursor:
-        rankings.append(LeaderboardEntry(
-            user_id=str(user_doc["_id"]),
-            username=user_doc.get("username", ""),
-            email=user_doc.get("email", ""),
-            total_points=user_doc.get("total_points", 0)
-        ))
-    
-    # Sort by total_points descending
-    rankings.sort(key=lambda x: x.total_points, reverse=True)
+        for member in await get_group_members_page(group, page=1, page_size=limit)
+    ]
     
     return LeaderboardResponse(
         group_id=group_id,
@@ -91,21 +116,7 @@ async def get_all_time_leaderboard(
     Query params:
     - limit: Maximum number of users to return (default: 100)
     """
-    users_collection = get_collection("users")
-    
-    # Query users sorted by total_points descending
-    cursor = users_collection.find().sort("total_points", -1).limit(limit)
-    
-    rankings = []
-    async for user_doc in cursor:
-        rankings.append(LeaderboardEntry(
-            user_id=str(user_doc["_id"]),
-            username=user_doc.get("username", ""),
-            email=user_doc.get("email", ""),
-            total_points=user_doc.get("total_points", 0)
-        ))
-    
-    return rankings
+    return [LeaderboardEntry(**entry) for entry in await get_top_users(limit)]
 
 @router.get("/global", response_model=List[LeaderboardEntry])
 async def get_global_leaderboard(
@@ -115,20 +126,7 @@ async def get_global_leaderboard(
     """
     Global leaderboard sorted by total_points in descending order (alias of all-time)
     """
-    users_collection = get_collection("users")
-
-    cursor = users_collection.find().sort("total_points", -1).limit(limit)
-
-    rankings = []
-    async for user_doc in cursor:
-        rankings.append(LeaderboardEntry(
-            user_id=str(user_doc["_id"]),
-            username=user_doc.get("username", ""),
-            email=user_doc.get("email", ""),
-            total_points=user_doc.get("total_points", 0)
-        ))
-
-    return rankings
+    return [LeaderboardEntry(**entry) for entry in await get_top_users(limit)]
 
 @router.get("/groups", response_model=List[GroupBoardEntry])
 async def get_groups_leaderboard(
@@ -137,31 +135,7 @@ async def get_groups_leaderboard(
     """
     Returns all groups ranked by the total points of their members (descending).
     """
-    groups_collection = get_collection("groups")
-    users_collection = get_collection("users")
-
-    entries: List[GroupBoardEntry] = []
-
-    cursor = groups_collection.find()
-    async for group in cursor:
-        group_id = str(group["_id"])
-        members = group.get("members", [])
-        total_points = 0
-        if members:
-            member_object_ids = [ObjectId(m) for m in members]
-            users_cursor = users_collection.find({"_id": {"$in": member_object_ids}})
-            async for u in users_cursor:
-                total_points += int(u.get("total_points", 0))
-
-        entries.append(GroupBoardEntry(
-            group_id=group_id,
-            group_name=group.get("group_name", ""),
-            total_points=total_points
-        ))
-
-    # Sort descending by total_points
-    entries.sort(key=lambda e: e.total_points, reverse=True)
-    return entries
+    return [GroupBoardEntry(**entry) for entry in await get_group_rankings()]
 
 @router.get("/user/{user_id}", response_model=UserRankResponse)
 async def get_user_rank(
@@ -172,7 +146,7 @@ async def get_user_rank(
     Get a specific user's rank and stats in the global leaderboard.
     Uses dense ranking: users with the same total_points share the same rank.
     """
-    users_collection = get_collection("users")
+    stats_collection = get_collection("user_stats")
 
     # Self-only access for now (extendable to admin)
     if user_id != current_user.id:
@@ -181,22 +155,17 @@ async def get_user_rank(
             detail="You can only view your own leaderboard rank"
         )
 
-    # Fetch user
-    user_doc = await users_collection.find_one({"_id": ObjectId(user_id)})
-    if not user_doc:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
-    user_points = user_doc.get("total_points", 0)
+    user_points = (await get_user_stats(user_id))["total_points"]
 
     # Rank = count of users with strictly higher points + 1 (dense ranking)
-    higher_count = await users_collection.count_documents({"total_points": {"$gt": user_points}})
-    total_users = await users_collection.count_documents({})
+    higher_count = await stats_collection.count_documents({"total_points": {"$gt": user_points}})
+    total_users = await stats_collection.count_documents({})
     rank = higher_count + 1
 
     user_entry = LeaderboardEntry(
-        user_id=str(user_doc["_id"]),
-        username=user_doc.get("username", ""),
-        email=user_doc.get("email", ""),
+        user_id=current_user.id,
+        username=current_user.username,
+        email=current_user.email,
         total_points=user_points
     )
 
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, Form, UploadFile, File
+from fastapi import APIRouter, Depends, Form, Header, HTTPException, Request, Response, UploadFile, File, status
 from typing import List, Optional
-import os
+from decouple import config
 
 from core.auth import get_current_user
 from schemas.user_schema import UserOut
-from schemas.task_schema import TaskOut
+from schemas.task_schema import TaskChangesOut, TaskOut, TaskReorderRequest
 from services.priority_manager import get_sorted_tasks_from_db, get_priority_queue
 from services.task_service import (
     create_task,
@@ -12,20 +12,27 @@ from services.task_service import (
     complete_task,
     skip_task,
     delete_task,
+    get_task_changes,
+    reorder_tasks,
     upload_task_proof
 )
+from services.stats_service import get_tasks_version
+from services.task_stream import subscribe, unsubscribe
+from utils.etag import etag_matches, make_etag, not_modified, parse_version_etag, set_etag_headers
+from utils.sse import sse_response, stream_queue
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
-# Ensure uploads directory exists
-UPLOADS_DIR = "uploads"
-os.makedirs(UPLOADS_DIR, exist_ok=True)
+# Idle seconds between SSE heartbeat comments
+TASK_STREAM_HEARTBEAT_SECONDS = config("TASK_STREAM_HEARTBEAT_SECONDS", default=15, cast=int)
 
 @router.get("/", response_model=List[TaskOut])
 async def get_tasks(
+    response: Response,
     current_user: UserOut = Depends(get_current_user),
     completed_only: Optional[bool] = None,
-    category: Optional[str] = None
+    category: Optional[str] = None,
+    if_none_match: Optional[str] = Header(default=None)
 ):
     """
     Get all tasks for the current user, sorted by priority (lower = higher priority)
@@ -33,7 +40,16 @@ async def get_tasks(
     Query params:
     - completed_only: Filter by completion status (true/false)
     - category: Filter by category (daily/weekly/weekend/monthly)
+    
+    Supports If-None-Match: returns 304 without querying tasks if nothing changed
     """
+    # One point read of the task list version instead of the task query
+    tasks_version = await get_tasks_version(current_user.id)
+    etag = make_etag("tasks", current_user.id, tasks_version, completed_only, category)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag_headers(response, etag, query_skipped=False)
+    
     return await get_sorted_tasks_from_db(
         user_id=current_user.id,
         completed_only=completed_only,
@@ -42,13 +58,66 @@ async def get_tasks(
 
 @router.get("/priority_queue", response_model=List[TaskOut])
 async def get_priority_queue_endpoint(
-    current_user: UserOut = Depends(get_current_user)
+    response: Response,
+    current_user: UserOut = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(default=None)
 ):
     """
     Get priority queue - only incomplete tasks sorted by priority
+    Supports If-None-Match like GET /tasks/
     """
+    tasks_version = await get_tasks_version(current_user.id)
+    etag = make_etag("priority_queue", current_user.id, tasks_version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag_headers(response, etag, query_skipped=False)
+    
     return await get_priority_queue(current_user.id)
 
+@router.get("/changes", response_model=TaskChangesOut)
+async def get_task_changes_endpoint(
+    since: Optional[str] = None,
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Delta sync: tasks changed and deleted since a previous sync
+    
+    Query params:
+    - since: next_since from the previous response (omit for a full sync)
+    
+    Keep calling with the returned next_since while has_more is true.
+    A 410 means the token is too old; refetch GET /tasks/ and start over.
+    """
+    return await get_task_changes(current_user.id, since)
+
+@router.get("/stream")
+async def stream_tasks(
+    request: Request,
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Live task updates for the current user as Server-Sent Events
+    
+    Load GET /tasks/ once, then apply the pushed diffs:
+    - created / updated: the full task (completions, skips and resets included)
+    - deleted: {id}
+    """
+    queue = subscribe(current_user.id)
+    if queue is None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many open task streams"
+        )
+    
+    async def events():
+        try:
+            async for message in stream_queue(request, queue, TASK_STREAM_HEARTBEAT_SECONDS):
+                yield message
+        finally:
+            unsubscribe(current_user.id, queue)
+    
+    return sse_response(events())
+
 @router.post("/add", response_model=TaskOut, status_code=201)
 async def add_task(
     title: str = Form(...),
@@ -74,24 +143,57 @@ async def add_task(
         value=value
     )
 
+@router.post("/reorder", response_model=List[TaskOut])
+async def reorder_tasks_endpoint(
+    request: TaskReorderRequest,
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Move tasks in the priority list (drag and drop)
+    
+    Each move names the task and its new neighbours: before_id (the task
+    directly above) and/or after_id (directly below). Moving next to a task
+    of another priority takes that priority. Returns the moved tasks.
+    """
+    return await reorder_tasks(current_user.id, request.moves)
+
 @router.put("/{task_id}", response_model=TaskOut)
 async def update_task_endpoint(
     task_id: str,
+    response: Response,
     title: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
     category: Optional[str] = Form(None),
     priority: Optional[int] = Form(None),
+    if_match: Optional[str] = Header(default=None),
     current_user: UserOut = Depends(get_current_user)
 ):
-    """Update a task (only if it belongs to the current user)"""
-    return await update_task(
+    """
+    Update a task (only if it belongs to the current user)
+    
+    Send the task's version as If-Match (e.g. If-Match: "3") to update only
+    if nobody changed it since; a conflicting edit gets 409 instead of
+    overwriting. The response's ETag is the new version.
+    """
+    try:
+        expected_version = parse_version_etag(if_match)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="If-Match must be a task version, e.g. \"3\""
+        )
+    
+    updated_task = await update_task(
         task_id=task_id,
         user_id=current_user.id,
         title=title,
         description=description,
         category=category,
-        priority=priority
+        priority=priority,
+        expected_version=expected_version
     )
+    response.headers["ETag"] = f'"{updated_task.version}"'
+    return updated_task
 
 @router.post("/{task_id}/complete", response_model=TaskOut)
 async def complete_task_endpoint(
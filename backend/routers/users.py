@@ -1,18 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from bson import ObjectId
+from typing import Optional
 
 from core.database import get_collection
 from core.auth import get_current_user
-from schemas.user_schema import UserOut
+from schemas.user_schema import TimezoneUpdate, UserOut
+from services.stats_service import set_stats_timezone, with_stats
+from utils.etag import etag_matches, make_etag, not_modified, set_etag_headers
+from utils.helpers import validate_timezone
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/me", response_model=UserOut)
 async def get_current_user_profile(
+    response: Response,
+    current_user: UserOut = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(default=None)
+):
+    """
+    Get the current authenticated user's profile
+    Supports If-None-Match: returns 304 without a body if the profile is unchanged
+    """
+    # Versioned by the public profile fields themselves (identity plus counters)
+    profile = await with_stats(current_user)
+    etag = make_etag("user", profile.model_dump_json())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    # No query to skip here beyond auth and stats; the saving on a 304 is the response body
+    set_etag_headers(response, etag, query_skipped=False)
+    return profile
+
+@router.put("/me/timezone", response_model=UserOut)
+async def update_my_timezone(
+    update: TimezoneUpdate,
     current_user: UserOut = Depends(get_current_user)
 ):
-    """Get the current authenticated user's profile"""
-    return current_user
+    """Set the timezone used to decide when the current user's streak days roll over"""
+    try:
+        validate_timezone(update.timezone)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    users_collection = get_collection("users")
+    await users_collection.update_one(
+        {"_id": ObjectId(current_user.id)},
+        {"$set": {"timezone": update.timezone}}
+    )
+    await set_stats_timezone(current_user.id, update.timezone)
+    
+    current_user.timezone = update.timezone
+    return await with_stats(current_user)
 
 @router.get("/{user_id}", response_model=UserOut)
 async def get_user_profile(
@@ -25,5 +62,5 @@ async def get_user_profile(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only view your own profile"
         )
-    return current_user
+    return await with_stats(current_user)
 
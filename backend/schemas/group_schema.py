@@ -12,6 +12,7 @@ class GroupInDB(GroupBase):
     id: str
     admin_id: str
     members: List[str] = []
+    member_count: int = 0
     monthly_goal: str = ""
 
 class GroupOut(GroupInDB):
@@ -0,0 +1,21 @@
+"""
+Performance Profile Schema
+Cached per-user performance summary used by the AI engine
+"""
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Dict, Optional
+
+class UserPerformanceProfile(BaseModel):
+    """Rolling completion statistics derived from task_logs"""
+    user_id: str
+    completed_7d: int = 0
+    skipped_7d: int = 0
+    completion_rate_7d: float = 0.0
+    completed_30d: int = 0
+    skipped_30d: int = 0
+    completion_rate_30d: float = 0.0
+    category_rates: Dict[str, float] = {}
+    completions_by_hour: Dict[str, int] = {}
+    peak_hour: Optional[int] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
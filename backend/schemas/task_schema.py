@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 from enum import Enum
 
 class TaskCategory(str, Enum):
@@ -35,7 +35,25 @@ class TaskInDB(TaskBase):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     next_reset: Optional[datetime] = None
     proof_url: Optional[str] = None
+    # Incremented by every write; send it back in If-Match to update safely
+    version: int = 1
+    # Fractional ordering key within a priority (see services.ranking)
+    rank: Optional[str] = None
 
 class TaskOut(TaskInDB):
     pass
 
+class TaskChangesOut(BaseModel):
+    changed: List[TaskOut]
+    deleted: List[str]
+    next_since: str
+    has_more: bool
+
+class TaskMove(BaseModel):
+    task_id: str
+    # Neighbours after the move: the task directly above and directly below (omit at the ends)
+    before_id: Optional[str] = None
+    after_id: Optional[str] = None
+
+class TaskReorderRequest(BaseModel):
+    moves: List[TaskMove] = Field(..., min_length=1, max_length=200)
@@ -8,16 +8,17 @@ class UserBase(BaseModel):
 
 class UserCreate(UserBase):
     password: str
+    timezone: str = "UTC"
+
+class TimezoneUpdate(BaseModel):
+    timezone: str = Field(..., description="IANA timezone name, e.g. Europe/Berlin")
 
 class UserInDB(UserBase):
+    # Identity only; points and streaks live in user_stats (see services.stats_service)
     id: str = Field(..., alias="id")
     hashed_password: str = Field(..., alias="hashed_password")
-    total_points: int = 0
-    current_streak: int = 0
-    last_active_date: Optional[datetime] = None
-    completed_tasks: int = 0
-    failed_tasks: int = 0
     group_ids: List[str] = []
+    timezone: str = "UTC"
     
     class Config:
         populate_by_name = True
@@ -30,6 +31,7 @@ class UserOut(UserBase):
     completed_tasks: int = 0
     failed_tasks: int = 0
     group_ids: List[str] = []
+    timezone: str = "UTC"
     
     class Config:
         populate_by_name = True
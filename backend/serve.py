@@ -0,0 +1,79 @@
+"""
+Production Server Entry Point
+Runs the API under uvicorn with multiple worker processes
+
+    python serve.py
+
+main.py's __main__ block is the auto-reloading development server; this
+launcher is for deployments. Settings come from the environment / .env:
+
+    WEB_CONCURRENCY             worker processes (default: 2 x CPU cores + 1, capped)
+    MAX_WORKERS                 upper bound for the automatic worker count
+    HOST / PORT                 bind address
+    KEEP_ALIVE_SECONDS          idle keep-alive timeout (keep above the load balancer's)
+    BACKLOG                     listen socket backlog
+    GRACEFUL_SHUTDOWN_SECONDS   time in-flight requests get on shutdown
+    WORKER_MAX_REQUESTS         recycle a worker after this many requests (0 = never)
+
+uvloop and httptools are used when installed (uvicorn[standard]). Each
+worker runs the lifespan; core.leader keeps the schedulers in one of them.
+"""
+import importlib.util
+import os
+from decouple import config
+
+HOST = config("HOST", default="0.0.0.0")
+PORT = config("PORT", default=8000, cast=int)
+WEB_CONCURRENCY = config("WEB_CONCURRENCY", default=0, cast=int)
+MAX_WORKERS = config("MAX_WORKERS", default=8, cast=int)
+KEEP_ALIVE_SECONDS = config("KEEP_ALIVE_SECONDS", default=75, cast=int)
+BACKLOG = config("BACKLOG", default=2048, cast=int)
+GRACEFUL_SHUTDOWN_SECONDS = config("GRACEFUL_SHUTDOWN_SECONDS", default=30, cast=int)
+WORKER_MAX_REQUESTS = config("WORKER_MAX_REQUESTS", default=10000, cast=int)
+
+def default_worker_count() -> int:
+    """
+    Worker processes for this machine
+    I/O-bound async workers: 2 x cores + 1, capped at MAX_WORKERS
+
+    Returns:
+        Number of workers
+    """
+    if WEB_CONCURRENCY > 0:
+        return WEB_CONCURRENCY
+    # Respect CPU affinity / container limits where the OS exposes them
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    return max(1, min(2 * cores + 1, MAX_WORKERS))
+
+def _installed(module: str) -> bool:
+    """Whether an optional module is importable"""
+    return importlib.util.find_spec(module) is not None
+
+def main():
+    import uvicorn
+
+    workers = default_worker_count()
+    loop = "uvloop" if _installed("uvloop") else "asyncio"
+    http = "httptools" if _installed("httptools") else "h11"
+    print(f"🚀 Starting {workers} workers on {HOST}:{PORT} (loop={loop}, http={http})")
+
+    uvicorn.run(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_keep_alive=KEEP_ALIVE_SECONDS,
+        backlog=BACKLOG,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_SECONDS,
+        # Worker exits after this many requests and the supervisor starts a fresh one
+        limit_max_requests=WORKER_MAX_REQUESTS or None,
+        proxy_headers=True
+    )
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,19 @@
 # AI Engine services for motivation and task suggestions
-from . import motivation_engine, task_suggester, performance_analyzer
+# Submodules load on first access (PEP 562) so importing one of them, e.g.
+# performance_profile on the task completion path, doesn't pull in the rest
+# (similarity_recommender imports NumPy)
+import importlib
 
-__all__ = ["motivation_engine", "task_suggester", "performance_analyzer"]
+__all__ = [
+    "motivation_engine",
+    "task_suggester",
+    "performance_analyzer",
+    "performance_profile",
+    "recommendation_service",
+    "similarity_recommender"
+]
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,21 +2,28 @@
 Motivation Engine - MongoDB Async
 Generates context-aware motivational messages based on user performance
 """
-from typing import Dict, Union
+from typing import Dict, Optional, Union
+from schemas.performance_profile_schema import UserPerformanceProfile
 from schemas.user_schema import UserOut, UserInDB
 from services.ai_engine.performance_analyzer import analyze_performance
 
-def generate_motivational_message(user: Union[UserOut, UserInDB, dict]) -> Dict[str, str]:
+def generate_motivational_message(
+    user: Union[UserOut, UserInDB, dict],
+    profile: Optional[UserPerformanceProfile] = None
+) -> Dict[str, str]:
     """
     Generates a context-aware motivational message based on user performance.
     
     Args:
         user: UserOut, UserInDB, or dict with user data
+        profile: Optional precomputed performance profile with rolling stats
     
     Returns:
         Dictionary with motivational message
     """
-    stats = analyze_performance(user)
+    stats = analyze_performance(user, profile)
+    rate_7d = stats["completion_rate_7d"]
+    rate_30d = stats["completion_rate_30d"]
     message = ""
     
     # High streak achievement
@@ -32,6 +39,12 @@ def generate_motivational_message(user: Union[UserOut, UserInDB, dict]) -> Dict[
     # Low completion ratio
     elif stats["completion_ratio"] < 0.4 and stats["total_tasks"] > 5:
         message = f"🌟 Every comeback starts with a single step, {stats['name']}. Let's focus on completing one task today. You've got this!"
+    # Recent week clearly behind the monthly average
+    elif rate_7d is not None and rate_30d is not None and rate_7d < rate_30d - 0.2:
+        message = f"💪 This week has been tougher than usual, {stats['name']}. You finished {rate_30d:.0%} of your tasks this month - one completion today gets you back on track!"
+    # Recent week clearly ahead of the monthly average
+    elif rate_7d is not None and rate_30d is not None and rate_7d > rate_30d + 0.2:
+        message = f"📈 You're trending up, {stats['name']}! {rate_7d:.0%} of this week's tasks done versus {rate_30d:.0%} this month. Keep climbing!"
     # New user
     elif stats["total_points"] == 0 and stats["completed_tasks"] == 0:
         message = f"🌱 Every great journey starts with a single step. Add one new task today, {stats['name']}, and let's get started!"
@@ -3,15 +3,21 @@ Performance Analyzer - MongoDB Async
 Analyzes user performance metrics and returns statistics
 """
 from datetime import date, datetime, timedelta
-from typing import Dict, Union
+from typing import Dict, Optional, Union
+from schemas.performance_profile_schema import UserPerformanceProfile
 from schemas.user_schema import UserOut, UserInDB
+from services.streak_manager import get_local_today, to_local_time
 
-def analyze_performance(user: Union[UserOut, UserInDB, dict]) -> Dict:
+def analyze_performance(
+    user: Union[UserOut, UserInDB, dict],
+    profile: Optional[UserPerformanceProfile] = None
+) -> Dict:
     """
     Takes a User object (or dict) and returns a dictionary of key stats.
     
     Args:
         user: UserOut, UserInDB, or dict with user data
+        profile: Optional precomputed performance profile with rolling stats
     
     Returns:
         Dictionary with performance statistics
@@ -24,6 +30,7 @@ def analyze_performance(user: Union[UserOut, UserInDB, dict]) -> Dict:
         completed_tasks = user.get("completed_tasks", 0)
         failed_tasks = user.get("failed_tasks", 0)
         last_active_date = user.get("last_active_date")
+        timezone = user.get("timezone")
     else:
         # Handle Pydantic models
         name = user.username
@@ -32,6 +39,7 @@ def analyze_performance(user: Union[UserOut, UserInDB, dict]) -> Dict:
         completed_tasks = user.completed_tasks
         failed_tasks = user.failed_tasks
         last_active_date = user.last_active_date
+        timezone = getattr(user, "timezone", None)
     
     # Calculate completion ratio
     total_tasks = completed_tasks + failed_tasks
@@ -41,7 +49,7 @@ def analyze_performance(user: Union[UserOut, UserInDB, dict]) -> Dict:
     
     # Check streak status
     is_on_streak = False
-    today = date.today()
+    today = get_local_today(timezone)
     
     if last_active_date:
         # Convert datetime to date if needed
@@ -59,6 +67,24 @@ def analyze_performance(user: Union[UserOut, UserInDB, dict]) -> Dict:
         elif last_active == today:
             is_on_streak = current_streak > 0
     
+    # Rolling and per-category stats from the precomputed profile (if available)
+    completion_rate_7d = completion_rate_30d = None
+    weakest_category = strongest_category = None
+    peak_hour = None
+    if profile is not None:
+        completion_rate_7d = profile.completion_rate_7d if profile.completed_7d + profile.skipped_7d else None
+        completion_rate_30d = profile.completion_rate_30d if profile.completed_30d + profile.skipped_30d else None
+        if profile.category_rates:
+            weakest_category = min(profile.category_rates, key=profile.category_rates.get)
+            strongest_category = max(profile.category_rates, key=profile.category_rates.get)
+        peak_hour = profile.peak_hour
+    
+    # Profiles count completions by UTC hour; users read their own clock
+    peak_time = None
+    if peak_hour is not None:
+        utc_peak = datetime.combine(datetime.utcnow().date(), datetime.min.time()).replace(hour=peak_hour)
+        peak_time = to_local_time(utc_peak, timezone).strftime("%H:%M")
+    
     return {
         "name": name,
         "username": name,  # Alias for compatibility
@@ -68,6 +94,13 @@ def analyze_performance(user: Union[UserOut, UserInDB, dict]) -> Dict:
         "completed_tasks": completed_tasks,
         "failed_tasks": failed_tasks,
         "total_tasks": total_tasks,
-        "completion_ratio": completion_ratio
+        "completion_ratio": completion_ratio,
+        "completion_rate_7d": completion_rate_7d,
+        "completion_rate_30d": completion_rate_30d,
+        "category_rates": profile.category_rates if profile is not None else {},
+        "weakest_category": weakest_category,
+        "strongest_category": strongest_category,
+        "peak_hour": peak_hour,
+        "peak_time": peak_time
     }
 
@@ -0,0 +1,222 @@
+"""
+Performance Profile - MongoDB Async
+Maintains a precomputed per-user performance profile for the AI engine
+
+Raw counters live in the user_performance_profiles collection (one document
+per user, keyed by user_id) and are bumped with a single $inc per task event:
+
+    daily.<YYYY-MM-DD>.completed|skipped   rolling 7/30-day windows
+    categories.<category>.completed|skipped per-category completion rates
+    hours.<0-23>                            completions by hour of day
+
+Reads are one find_one (or an in-process cache hit) instead of re-scanning
+task_logs on every /ai/* request.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from decouple import config
+
+from core.database import get_collection
+from schemas.performance_profile_schema import UserPerformanceProfile
+from schemas.task_schema import TaskStatus
+
+# How long a profile is served from the in-process cache
+PROFILE_CACHE_TTL_SECONDS = config("PROFILE_CACHE_TTL_SECONDS", default=60, cast=int)
+PROFILE_CACHE_MAX_ENTRIES = config("PROFILE_CACHE_MAX_ENTRIES", default=10000, cast=int)
+# Daily buckets older than the longest rolling window are pruned
+PROFILE_WINDOW_DAYS = 30
+
+_profile_cache: Dict[str, Tuple[float, UserPerformanceProfile]] = {}
+
+def invalidate_cached_profile(user_id: str):
+    """Drop a user's profile from the in-process cache"""
+    _profile_cache.pop(user_id, None)
+
+async def handle_task_change(change: dict):
+    """Change feed handler for tasks: drop the owner's cached profile (possibly changed by another worker)"""
+    task = change.get("document")
+    if task and task.get("user_id"):
+        invalidate_cached_profile(task["user_id"])
+
+def _completion_rate(completed: int, skipped: int) -> float:
+    """Completed share of all completed/skipped actions (0.0 when there are none)"""
+    total = completed + skipped
+    return completed / total if total > 0 else 0.0
+
+def build_profile(user_id: str, profile_doc: dict, now: Optional[datetime] = None) -> UserPerformanceProfile:
+    """
+    Turn a raw counter document into a UserPerformanceProfile
+
+    Args:
+        user_id: User ID
+        profile_doc: Document from user_performance_profiles
+        now: Reference time for the rolling windows (defaults to now)
+
+    Returns:
+        UserPerformanceProfile
+    """
+    if now is None:
+        now = datetime.utcnow()
+
+    day_7 = (now - timedelta(days=6)).strftime("%Y-%m-%d")
+    day_30 = (now - timedelta(days=PROFILE_WINDOW_DAYS - 1)).strftime("%Y-%m-%d")
+
+    completed_7d = skipped_7d = completed_30d = skipped_30d = 0
+    for day, counts in (profile_doc.get("daily") or {}).items():
+        if day >= day_30:
+            completed_30d += counts.get("completed", 0)
+            skipped_30d += counts.get("skipped", 0)
+        if day >= day_7:
+            completed_7d += counts.get("completed", 0)
+            skipped_7d += counts.get("skipped", 0)
+
+    category_rates = {
+        category: _completion_rate(counts.get("completed", 0), counts.get("skipped", 0))
+        for category, counts in (profile_doc.get("categories") or {}).items()
+    }
+
+    completions_by_hour = {hour: count for hour, count in (profile_doc.get("hours") or {}).items() if count > 0}
+    peak_hour = None
+    if completions_by_hour:
+        peak_hour = int(max(completions_by_hour, key=completions_by_hour.get))
+
+    return UserPerformanceProfile(
+        user_id=user_id,
+        completed_7d=completed_7d,
+        skipped_7d=skipped_7d,
+        completion_rate_7d=_completion_rate(completed_7d, skipped_7d),
+        completed_30d=completed_30d,
+        skipped_30d=skipped_30d,
+        completion_rate_30d=_completion_rate(completed_30d, skipped_30d),
+        category_rates=category_rates,
+        completions_by_hour=completions_by_hour,
+        peak_hour=peak_hour,
+        updated_at=profile_doc.get("updated_at") or now
+    )
+
+async def record_task_event(user_id: str, status: str, category: str, timestamp: Optional[datetime] = None):
+    """
+    Incrementally fold a completed/skipped task into the user's profile
+
+    Args:
+        user_id: User ID
+        status: Task status of the event (completed or skipped)
+        category: Task category
+        timestamp: When the event happened (defaults to now)
+    """
+    if status not in (TaskStatus.COMPLETED.value, TaskStatus.SKIPPED.value):
+        return
+    if timestamp is None:
+        timestamp = datetime.utcnow()
+
+    profiles_collection = get_collection("user_performance_profiles")
+    day = timestamp.strftime("%Y-%m-%d")
+
+    increments = {
+        f"daily.{day}.{status}": 1,
+        f"categories.{category}.{status}": 1
+    }
+    if status == TaskStatus.COMPLETED.value:
+        increments[f"hours.{timestamp.hour}"] = 1
+
+    result = await profiles_collection.update_one(
+        {"_id": user_id},
+        {"$inc": increments, "$set": {"updated_at": timestamp}}
+    )
+    if result.matched_count == 0:
+        # First event for this user: seed the profile from their full log history
+        await rebuild_performance_profile(user_id)
+    invalidate_cached_profile(user_id)
+
+async def rebuild_performance_profile(user_id: str) -> dict:
+    """
+    Rebuild a user's raw profile counters from task_logs
+    Used once per user, when their first event arrives or their profile is first read
+
+    Args:
+        user_id: User ID
+
+    Returns:
+        The stored raw profile document
+    """
+    task_logs_collection = get_collection("task_logs")
+    profiles_collection = get_collection("user_performance_profiles")
+
+    now = datetime.utcnow()
+    window_start = now - timedelta(days=PROFILE_WINDOW_DAYS)
+    daily: Dict[str, Dict[str, int]] = {}
+    categories: Dict[str, Dict[str, int]] = {}
+    hours: Dict[str, int] = {}
+
+    cursor = task_logs_collection.find(
+        {"user_id": user_id},
+        {"status": 1, "category": 1, "timestamp": 1}
+    )
+    async for log in cursor:
+        status = log.get("status")
+        if status not in (TaskStatus.COMPLETED.value, TaskStatus.SKIPPED.value):
+            continue
+        category = log.get("category", "daily")
+        timestamp = log.get("timestamp")
+
+        category_counts = categories.setdefault(category, {})
+        category_counts[status] = category_counts.get(status, 0) + 1
+
+        if isinstance(timestamp, datetime):
+            if status == TaskStatus.COMPLETED.value:
+                hours[str(timestamp.hour)] = hours.get(str(timestamp.hour), 0) + 1
+            if timestamp >= window_start:
+                day_counts = daily.setdefault(timestamp.strftime("%Y-%m-%d"), {})
+                day_counts[status] = day_counts.get(status, 0) + 1
+
+    profile_doc = {"daily": daily, "categories": categories, "hours": hours, "updated_at": now}
+    await profiles_collection.update_one({"_id": user_id}, {"$set": profile_doc}, upsert=True)
+    return profile_doc
+
+async def prune_daily_buckets(user_id: str, profile_doc: dict, now: datetime):
+    """Unset daily buckets that have fallen out of the longest rolling window"""
+    cutoff = (now - timedelta(days=PROFILE_WINDOW_DAYS)).strftime("%Y-%m-%d")
+    expired = [day for day in (profile_doc.get("daily") or {}) if day < cutoff]
+    if not expired:
+        return
+
+    profiles_collection = get_collection("user_performance_profiles")
+    await profiles_collection.update_one(
+        {"_id": user_id},
+        {"$unset": {f"daily.{day}": "" for day in expired}}
+    )
+
+async def get_performance_profile(user_id: str) -> UserPerformanceProfile:
+    """
+    Get a user's performance profile
+
+    Served from the in-process cache when fresh, otherwise one find_one on
+    user_performance_profiles (falling back to a one-off rebuild from
+    task_logs for users without a profile yet).
+
+    Args:
+        user_id: User ID
+
+    Returns:
+        UserPerformanceProfile
+    """
+    cached = _profile_cache.get(user_id)
+    if cached and time.monotonic() - cached[0] < PROFILE_CACHE_TTL_SECONDS:
+        return cached[1]
+
+    profiles_collection = get_collection("user_performance_profiles")
+    now = datetime.utcnow()
+
+    profile_doc = await profiles_collection.find_one({"_id": user_id})
+    if profile_doc is None:
+        profile_doc = await rebuild_performance_profile(user_id)
+    else:
+        await prune_daily_buckets(user_id, profile_doc, now)
+
+    profile = build_profile(user_id, profile_doc, now)
+    if len(_profile_cache) >= PROFILE_CACHE_MAX_ENTRIES:
+        # Evict the oldest entry (dicts keep insertion order)
+        _profile_cache.pop(next(iter(_profile_cache)))
+    _profile_cache[user_id] = (time.monotonic(), profile)
+    return profile
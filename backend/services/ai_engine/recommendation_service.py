@@ -0,0 +1,240 @@
+"""
+Recommendation Service - MongoDB Async
+Precomputes and serves motivation messages and task suggestions
+
+Results are stored in the user_recommendations collection (one document per
+user, keyed by user_id) with a computed_at freshness timestamp. The /ai/*
+endpoints serve stored results when they are still fresh and only compute
+on demand otherwise; a nightly job refreshes all recently active users with
+a bounded-concurrency worker pool.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Union
+from bson import ObjectId
+from decouple import config
+from pymongo import ReplaceOne
+
+from core.database import get_collection
+from schemas.performance_profile_schema import UserPerformanceProfile
+from schemas.user_schema import UserOut, UserInDB
+from services.ai_engine.motivation_engine import generate_motivational_message
+from services.ai_engine.performance_profile import get_performance_profile
+from services.ai_engine.similarity_recommender import recommend_titles
+from services.ai_engine.task_suggester import suggest_new_task
+from services.stats_service import get_stats_for_users, get_user_stats, with_stats
+
+# Stored recommendations older than this are recomputed on read
+RECOMMENDATION_MAX_AGE_SECONDS = config("RECOMMENDATION_MAX_AGE_SECONDS", default=86400, cast=int)
+# Number of concurrent workers used by the precomputation job
+RECOMMENDATION_WORKERS = config("RECOMMENDATION_WORKERS", default=8, cast=int)
+# Users active within this many days are included in the nightly job
+RECOMMENDATION_ACTIVE_DAYS = config("RECOMMENDATION_ACTIVE_DAYS", default=30, cast=int)
+# Upserts are flushed to MongoDB in batches of this size
+RECOMMENDATION_WRITE_BATCH = 500
+
+def _user_id_of(user: Union[UserOut, UserInDB, dict]) -> str:
+    """Get the string user ID from a model or raw document"""
+    if isinstance(user, dict):
+        return str(user.get("_id", user.get("id")))
+    return user.id
+
+def compute_recommendations(
+    user: Union[UserOut, UserInDB, dict],
+    profile: Optional[UserPerformanceProfile] = None
+) -> Dict:
+    """
+    Compute a user's motivation message and task suggestion
+
+    Args:
+        user: UserOut, UserInDB, or dict with user data
+        profile: Optional precomputed performance profile
+
+    Returns:
+        Dictionary with motivation, suggestion and computed_at
+    """
+    return {
+        "motivation": generate_motivational_message(user, profile),
+        "suggestion": suggest_new_task(user, profile, recommend_titles(_user_id_of(user))),
+        "computed_at": datetime.utcnow()
+    }
+
+def is_fresh(recommendation: Optional[dict], profile: Optional[UserPerformanceProfile] = None) -> bool:
+    """
+    Check whether stored recommendations can be served as-is
+
+    Args:
+        recommendation: Stored user_recommendations document
+        profile: The user's current profile (results older than it are stale)
+
+    Returns:
+        True if the stored result is within max age and newer than the profile
+    """
+    if not recommendation or not recommendation.get("computed_at"):
+        return False
+    computed_at = recommendation["computed_at"]
+    if datetime.utcnow() - computed_at > timedelta(seconds=RECOMMENDATION_MAX_AGE_SECONDS):
+        return False
+    if profile is not None and profile.updated_at > computed_at:
+        return False
+    return True
+
+async def store_recommendations(user_id: str, recommendation: Dict):
+    """Upsert a single user's recommendations"""
+    recommendations_collection = get_collection("user_recommendations")
+    await recommendations_collection.replace_one({"_id": user_id}, recommendation, upsert=True)
+
+async def get_recommendations(user: Union[UserOut, UserInDB, dict]) -> Dict:
+    """
+    Get a user's recommendations, serving precomputed results when fresh
+
+    Args:
+        user: UserOut, UserInDB, or dict with user data
+
+    Returns:
+        Dictionary with motivation, suggestion and computed_at
+    """
+    user_id = _user_id_of(user)
+    recommendations_collection = get_collection("user_recommendations")
+
+    profile = await get_performance_profile(user_id)
+    stored = await recommendations_collection.find_one({"_id": user_id})
+    if is_fresh(stored, profile):
+        stored.pop("_id", None)
+        return stored
+
+    # Counters are only needed when recomputing
+    if isinstance(user, dict):
+        user = {**user, **await get_user_stats(user_id)}
+    else:
+        user = await with_stats(user)
+    recommendation = compute_recommendations(user, profile)
+    await store_recommendations(user_id, recommendation)
+    return recommendation
+
+async def get_recommendations_batch(user_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Get recommendations for many users at once
+
+    Fresh stored results come from a single $in query; only missing or stale
+    users are loaded and recomputed.
+
+    Args:
+        user_ids: User IDs
+
+    Returns:
+        Mapping of user_id to recommendations (unknown users are omitted)
+    """
+    recommendations_collection = get_collection("user_recommendations")
+    users_collection = get_collection("users")
+
+    results: Dict[str, Dict] = {}
+    async for stored in recommendations_collection.find({"_id": {"$in": user_ids}}):
+        if is_fresh(stored):
+            results[stored.pop("_id")] = stored
+
+    missing = [
+        ObjectId(user_id) for user_id in user_ids
+        if user_id not in results and ObjectId.is_valid(user_id)
+    ]
+    if missing:
+        users = [user_doc async for user_doc in users_collection.find({"_id": {"$in": missing}})]
+        computed = await _compute_for_users(await _merge_stats(users))
+        results.update(computed)
+
+    return results
+
+async def _merge_stats(users: List[dict]) -> List[dict]:
+    """Add each user's counters from user_stats to their identity document"""
+    stats = await get_stats_for_users([str(user_doc["_id"]) for user_doc in users])
+    return [{**user_doc, **stats[str(user_doc["_id"])]} for user_doc in users]
+
+async def _compute_for_users(users: List[dict], concurrency: int = RECOMMENDATION_WORKERS) -> Dict[str, Dict]:
+    """
+    Compute and store recommendations for a list of user documents
+    Runs at most `concurrency` users at a time and writes results in bulk
+
+    Args:
+        users: Raw user documents
+        concurrency: Maximum number of users processed concurrently
+
+    Returns:
+        Mapping of user_id to computed recommendations
+    """
+    recommendations_collection = get_collection("user_recommendations")
+    queue: asyncio.Queue = asyncio.Queue()
+    for user_doc in users:
+        queue.put_nowait(user_doc)
+
+    results: Dict[str, Dict] = {}
+    pending_writes: List[ReplaceOne] = []
+
+    async def flush():
+        if pending_writes:
+            batch = pending_writes[:]
+            pending_writes.clear()
+            await recommendations_collection.bulk_write(batch, ordered=False)
+
+    async def worker():
+        while True:
+            try:
+                user_doc = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            user_id = str(user_doc["_id"])
+            try:
+                profile = await get_performance_profile(user_id)
+                recommendation = compute_recommendations(user_doc, profile)
+            except Exception as e:
+                print(f"[{datetime.utcnow()}] ⚠️ Recommendation failed for user {user_id}: {e}")
+                continue
+            results[user_id] = recommendation
+            pending_writes.append(ReplaceOne({"_id": user_id}, recommendation, upsert=True))
+            if len(pending_writes) >= RECOMMENDATION_WRITE_BATCH:
+                await flush()
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    await flush()
+    return results
+
+async def precompute_all_recommendations(concurrency: int = RECOMMENDATION_WORKERS) -> int:
+    """
+    Refresh stored recommendations for every recently active user
+    Called by the background scheduler (e.g. before the nightly digest)
+
+    Args:
+        concurrency: Maximum number of users processed concurrently
+
+    Returns:
+        Number of users whose recommendations were refreshed
+    """
+    stats_collection = get_collection("user_stats")
+    users_collection = get_collection("users")
+    active_since = datetime.utcnow() - timedelta(days=RECOMMENDATION_ACTIVE_DAYS)
+
+    async def compute_batch(stats_batch: List[dict]) -> int:
+        # Identity fields for the batch, then the counters on top
+        stats_by_id = {stats["_id"]: stats for stats in stats_batch}
+        cursor = users_collection.find(
+            {"_id": {"$in": [ObjectId(user_id) for user_id in stats_by_id]}},
+            {"hashed_password": 0}
+        )
+        users = [{**user_doc, **stats_by_id[str(user_doc["_id"])], "_id": user_doc["_id"]} async for user_doc in cursor]
+        return len(await _compute_for_users(users, concurrency))
+
+    total = 0
+    batch: List[dict] = []
+    cursor = stats_collection.find(
+        {"last_active_date": {"$gte": active_since}},
+        {"recent_event_ids": 0}
+    )
+    async for stats in cursor:
+        batch.append(stats)
+        # Process in chunks so memory stays bounded on large user bases
+        if len(batch) >= RECOMMENDATION_WRITE_BATCH:
+            total += await compute_batch(batch)
+            batch = []
+    if batch:
+        total += await compute_batch(batch)
+
+    return total
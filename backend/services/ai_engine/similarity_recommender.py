@@ -0,0 +1,368 @@
+"""
+Similarity Recommender - NumPy
+Recommends task titles that similar users reliably complete
+
+Each user is described by a feature vector built from tasks and task_logs:
+
+    category mix       share of logged actions per task category
+    time of day        share of completions per hour of the user's local day
+    title tokens       completion rate of the user's tasks, spread over
+                       hashed title tokens
+
+Rows are L2-normalized so cosine similarity is a plain dot product. The
+model is rebuilt periodically in a worker process: similarities are computed
+in row blocks (one matrix multiply per block), and each user's top
+recommendations are stored in a dict so a lookup is a single dictionary get.
+
+Only the leader worker builds the model. It persists the recommendations to
+task_title_recommendations and then records the build in recommender_builds;
+every worker polls that document and loads a newer build into its dict.
+"""
+import asyncio
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from decouple import config
+from pymongo import ReplaceOne
+
+from core.database import get_collection
+from schemas.task_schema import TaskStatus
+from services.streak_manager import DEFAULT_TIMEZONE
+
+# Number of hashed buckets for title tokens
+TOKEN_DIM = 128
+CATEGORIES = ["daily", "weekly", "weekend", "monthly"]
+HOURS = 24
+# Relative weight of each feature block in the similarity
+CATEGORY_WEIGHT = 0.5
+HOUR_WEIGHT = 0.5
+TOKEN_WEIGHT = 1.0
+
+# Neighbours considered per user and rows per similarity block
+RECOMMENDER_NEIGHBORS = config("RECOMMENDER_NEIGHBORS", default=20, cast=int)
+RECOMMENDER_BLOCK_SIZE = config("RECOMMENDER_BLOCK_SIZE", default=512, cast=int)
+# How often the background job rebuilds the model
+RECOMMENDER_REBUILD_SECONDS = config("RECOMMENDER_REBUILD_SECONDS", default=21600, cast=int)
+# How often every worker checks for a newer persisted build
+RECOMMENDER_SYNC_SECONDS = config("RECOMMENDER_SYNC_SECONDS", default=300, cast=int)
+RECOMMENDER_WRITE_BATCH = 1000
+BUILD_ID = "similarity"
+# A neighbour's task qualifies once completed this often at this rate
+MIN_TITLE_COMPLETIONS = 2
+MIN_TITLE_RATE = 0.6
+# Titles recommended per user
+RECOMMENDATIONS_PER_USER = 3
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+@dataclass
+class UserHistory:
+    """Raw per-user activity fed into the model build"""
+    category_counts: List[float] = field(default_factory=lambda: [0.0] * len(CATEGORIES))
+    hour_counts: List[float] = field(default_factory=lambda: [0.0] * HOURS)
+    # normalized title -> (display title, completed, skipped)
+    titles: Dict[str, Tuple[str, int, int]] = field(default_factory=dict)
+
+@dataclass
+class RecommenderModel:
+    """Built model: precomputed recommendations keyed by user_id"""
+    recommendations: Dict[str, List[str]]
+    user_count: int
+    built_at: datetime
+
+def normalize_title(title: str) -> str:
+    """Lowercase a title and collapse it to its word tokens"""
+    return " ".join(_TOKEN_PATTERN.findall(title.lower()))
+
+def _token_bucket(token: str) -> int:
+    """Stable hash bucket for a title token (same across processes)"""
+    return zlib.crc32(token.encode("utf-8")) % TOKEN_DIM
+
+def _l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    """Row-wise L2 normalization (all-zero rows stay zero)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def build_feature_matrix(user_ids: List[str], histories: Dict[str, UserHistory]) -> np.ndarray:
+    """
+    Build the L2-normalized user feature matrix
+
+    Args:
+        user_ids: Row order of the matrix
+        histories: Activity per user
+
+    Returns:
+        float32 matrix of shape (len(user_ids), len(CATEGORIES) + HOURS + TOKEN_DIM)
+    """
+    n_users = len(user_ids)
+    categories = np.zeros((n_users, len(CATEGORIES)), dtype=np.float32)
+    hours = np.zeros((n_users, HOURS), dtype=np.float32)
+    tokens = np.zeros((n_users, TOKEN_DIM), dtype=np.float32)
+
+    for row, user_id in enumerate(user_ids):
+        history = histories[user_id]
+        categories[row] = history.category_counts
+        hours[row] = history.hour_counts
+        for normalized, (_, completed, skipped) in history.titles.items():
+            rate = completed / (completed + skipped) if completed + skipped else 0.0
+            for token in normalized.split():
+                tokens[row, _token_bucket(token)] += rate
+
+    features = np.hstack([
+        CATEGORY_WEIGHT * _l2_normalize(categories),
+        HOUR_WEIGHT * _l2_normalize(hours),
+        TOKEN_WEIGHT * _l2_normalize(tokens)
+    ])
+    return _l2_normalize(features).astype(np.float32)
+
+def top_neighbors(features: np.ndarray, k: int, block_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find each row's k most similar other rows with batched cosine similarity
+
+    Args:
+        features: L2-normalized feature matrix
+        k: Neighbours per row
+        block_size: Rows per matrix multiply
+
+    Returns:
+        (indices, similarities), both of shape (n_rows, k), best first
+    """
+    n_rows = features.shape[0]
+    k = min(k, max(n_rows - 1, 0))
+    indices = np.zeros((n_rows, k), dtype=np.int32)
+    similarities = np.zeros((n_rows, k), dtype=np.float32)
+    if k == 0:
+        return indices, similarities
+
+    for start in range(0, n_rows, block_size):
+        stop = min(start + block_size, n_rows)
+        block = features[start:stop] @ features.T
+        # Never recommend a user to themselves
+        block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+
+        candidates = np.argpartition(block, -k, axis=1)[:, -k:]
+        candidate_sims = np.take_along_axis(block, candidates, axis=1)
+        order = np.argsort(-candidate_sims, axis=1)
+        indices[start:stop] = np.take_along_axis(candidates, order, axis=1)
+        similarities[start:stop] = np.take_along_axis(candidate_sims, order, axis=1)
+
+    return indices, similarities
+
+def build_model(
+    histories: Dict[str, UserHistory],
+    neighbors: int = RECOMMENDER_NEIGHBORS,
+    block_size: int = RECOMMENDER_BLOCK_SIZE
+) -> RecommenderModel:
+    """
+    Build the recommender from raw histories
+    CPU-bound and picklable, so it runs in a worker process
+
+    Args:
+        histories: Activity per user
+        neighbors: Neighbours considered per user
+        block_size: Rows per similarity block
+
+    Returns:
+        RecommenderModel with each user's recommended titles
+    """
+    user_ids = list(histories.keys())
+    features = build_feature_matrix(user_ids, histories)
+    neighbor_indices, neighbor_sims = top_neighbors(features, neighbors, block_size)
+
+    # Each user's reliably completed titles, best first
+    reliable_titles: List[List[Tuple[str, str, float]]] = []
+    for user_id in user_ids:
+        titles = []
+        for normalized, (display, completed, skipped) in histories[user_id].titles.items():
+            rate = completed / (completed + skipped) if completed + skipped else 0.0
+            if completed >= MIN_TITLE_COMPLETIONS and rate >= MIN_TITLE_RATE:
+                titles.append((normalized, display, rate))
+        titles.sort(key=lambda t: t[2], reverse=True)
+        reliable_titles.append(titles[:10])
+
+    recommendations: Dict[str, List[str]] = {}
+    for row, user_id in enumerate(user_ids):
+        own_titles = histories[user_id].titles
+        scores: Dict[str, float] = {}
+        display_names: Dict[str, str] = {}
+        for neighbor, similarity in zip(neighbor_indices[row], neighbor_sims[row]):
+            if similarity <= 0:
+                continue
+            for normalized, display, rate in reliable_titles[neighbor]:
+                if normalized in own_titles:
+                    continue
+                scores[normalized] = scores.get(normalized, 0.0) + float(similarity) * rate
+                display_names.setdefault(normalized, display)
+        if scores:
+            best = sorted(scores, key=scores.get, reverse=True)[:RECOMMENDATIONS_PER_USER]
+            recommendations[user_id] = [display_names[title] for title in best]
+
+    return RecommenderModel(
+        recommendations=recommendations,
+        user_count=len(user_ids),
+        built_at=datetime.utcnow()
+    )
+
+async def load_histories() -> Dict[str, UserHistory]:
+    """
+    Load per-user activity from tasks and task_logs
+
+    Returns:
+        Mapping of user_id to UserHistory
+    """
+    tasks_collection = get_collection("tasks")
+    task_logs_collection = get_collection("task_logs")
+
+    histories: Dict[str, UserHistory] = {}
+    task_titles: Dict[str, Tuple[str, str]] = {}
+
+    async for task in tasks_collection.find({}, {"user_id": 1, "title": 1}):
+        task_titles[str(task["_id"])] = (task.get("user_id", ""), task.get("title", ""))
+
+    # Completed/skipped counts per (user, task), plus category for the mix
+    pipeline = [
+        {"$match": {"status": {"$in": [TaskStatus.COMPLETED.value, TaskStatus.SKIPPED.value]}}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "task_id": "$task_id"},
+            "category": {"$first": "$category"},
+            "completed": {"$sum": {"$cond": [{"$eq": ["$status", TaskStatus.COMPLETED.value]}, 1, 0]}},
+            "skipped": {"$sum": {"$cond": [{"$eq": ["$status", TaskStatus.SKIPPED.value]}, 1, 0]}}
+        }}
+    ]
+    async for row in task_logs_collection.aggregate(pipeline, allowDiskUse=True):
+        user_id = row["_id"]["user_id"]
+        history = histories.setdefault(user_id, UserHistory())
+        category = row.get("category")
+        if category in CATEGORIES:
+            history.category_counts[CATEGORIES.index(category)] += row["completed"] + row["skipped"]
+
+        owner, title = task_titles.get(row["_id"]["task_id"], (None, ""))
+        normalized = normalize_title(title)
+        if owner == user_id and normalized:
+            _, completed, skipped = history.titles.get(normalized, (title, 0, 0))
+            history.titles[normalized] = (title, completed + row["completed"], skipped + row["skipped"])
+
+    # Completions per (user, local hour of day), in the timezone stored on user_stats
+    pipeline = [
+        {"$match": {"status": TaskStatus.COMPLETED.value}},
+        {"$lookup": {"from": "user_stats", "localField": "user_id", "foreignField": "_id", "as": "stats"}},
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "hour": {"$hour": {
+                    "date": "$timestamp",
+                    "timezone": {"$ifNull": [{"$arrayElemAt": ["$stats.timezone", 0]}, DEFAULT_TIMEZONE]}
+                }}
+            },
+            "count": {"$sum": 1}
+        }}
+    ]
+    async for row in task_logs_collection.aggregate(pipeline, allowDiskUse=True):
+        history = histories.setdefault(row["_id"]["user_id"], UserHistory())
+        history.hour_counts[row["_id"]["hour"]] += row["count"]
+
+    return histories
+
+_model: Optional[RecommenderModel] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def recommend_titles(user_id: str) -> List[str]:
+    """
+    Get the titles recommended for a user by the in-memory model
+
+    Args:
+        user_id: User ID
+
+    Returns:
+        Recommended task titles (empty until the model is built or if none qualify)
+    """
+    if _model is None:
+        return []
+    return _model.recommendations.get(user_id, [])
+
+async def persist_model(model: RecommenderModel):
+    """
+    Store a built model for the other workers
+    The build document is written last, so readers never see a partial build
+
+    Args:
+        model: Freshly built model (built_at is truncated to MongoDB's precision)
+    """
+    recommendations_collection = get_collection("task_title_recommendations")
+    builds_collection = get_collection("recommender_builds")
+    model.built_at = model.built_at.replace(microsecond=model.built_at.microsecond // 1000 * 1000)
+
+    operations = [
+        ReplaceOne({"_id": user_id}, {"titles": titles, "built_at": model.built_at}, upsert=True)
+        for user_id, titles in model.recommendations.items()
+    ]
+    for start in range(0, len(operations), RECOMMENDER_WRITE_BATCH):
+        await recommendations_collection.bulk_write(operations[start:start + RECOMMENDER_WRITE_BATCH], ordered=False)
+
+    await builds_collection.replace_one(
+        {"_id": BUILD_ID},
+        {"built_at": model.built_at, "user_count": model.user_count},
+        upsert=True
+    )
+    # Users who no longer get recommendations
+    await recommendations_collection.delete_many({"built_at": {"$lt": model.built_at}})
+
+async def get_persisted_build() -> Optional[dict]:
+    """Latest persisted build document ({built_at, user_count}) or None"""
+    builds_collection = get_collection("recommender_builds")
+    return await builds_collection.find_one({"_id": BUILD_ID})
+
+async def load_persisted_model() -> bool:
+    """
+    Load the latest persisted build if it is newer than the in-memory model
+
+    Returns:
+        True if a newer model was loaded
+    """
+    global _model
+
+    build = await get_persisted_build()
+    if build is None or (_model is not None and _model.built_at >= build["built_at"]):
+        return False
+
+    recommendations_collection = get_collection("task_title_recommendations")
+    cursor = recommendations_collection.find({"built_at": build["built_at"]}, {"titles": 1})
+    _model = RecommenderModel(
+        recommendations={doc["_id"]: doc["titles"] async for doc in cursor},
+        user_count=build.get("user_count", 0),
+        built_at=build["built_at"]
+    )
+    return True
+
+async def rebuild_model() -> RecommenderModel:
+    """
+    Rebuild the model in a worker process, swap it in and persist it
+    Run by the leader worker only
+
+    Returns:
+        The new RecommenderModel
+    """
+    global _model, _process_pool
+
+    histories = await load_histories()
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=1)
+
+    loop = asyncio.get_running_loop()
+    model = await loop.run_in_executor(_process_pool, build_model, histories)
+    await persist_model(model)
+    _model = model
+    return _model
+
+def shutdown_process_pool():
+    """Stop the worker process used for model builds"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
@@ -2,22 +2,31 @@
 Task Suggester - MongoDB Async
 Suggests new tasks based on user performance patterns
 """
-from typing import Dict, Union
+from typing import Dict, List, Optional, Union
+from schemas.performance_profile_schema import UserPerformanceProfile
 from schemas.user_schema import UserOut, UserInDB
 from services.ai_engine.performance_analyzer import analyze_performance
 
-def suggest_new_task(user: Union[UserOut, UserInDB, dict]) -> Dict[str, str]:
+def suggest_new_task(
+    user: Union[UserOut, UserInDB, dict],
+    profile: Optional[UserPerformanceProfile] = None,
+    similar_titles: Optional[List[str]] = None
+) -> Dict[str, str]:
     """
     Suggests a new task based on user performance patterns.
     
     Args:
         user: UserOut, UserInDB, or dict with user data
+        profile: Optional precomputed performance profile with rolling stats
+        similar_titles: Optional task titles that similar users reliably complete
     
     Returns:
         Dictionary with task suggestion
     """
-    stats = analyze_performance(user)
+    stats = analyze_performance(user, profile)
     suggestion = ""
+    category = "daily"
+    title = None
     
     # Low completion ratio - suggest easier tasks
     if stats["completion_ratio"] < 0.4 and stats["total_tasks"] > 5:
@@ -28,6 +37,16 @@ def suggest_new_task(user: Union[UserOut, UserInDB, dict]) -> Dict[str, str]:
         ]
         suggestion = suggestions[stats["total_tasks"] % len(suggestions)]
     
+    # One category is clearly lagging - suggest a lighter task there
+    elif stats["weakest_category"] and stats["category_rates"][stats["weakest_category"]] < 0.5:
+        category = stats["weakest_category"]
+        suggestion = f"Your {category} tasks are getting skipped more than others. Try a smaller {category} task you can finish in 10 minutes to rebuild the habit."
+    
+    # Users with similar habits reliably complete a task this user doesn't have yet
+    elif similar_titles:
+        title = similar_titles[0]
+        suggestion = f"People with habits like yours regularly finish '{title}'. Want to give it a try?"
+    
     # On a streak - suggest bonus tasks
     elif stats["is_on_streak"] and stats["current_streak"] >= 3:
         suggestions = [
@@ -73,5 +92,9 @@ def suggest_new_task(user: Union[UserOut, UserInDB, dict]) -> Dict[str, str]:
         ]
         suggestion = suggestions[stats["completed_tasks"] % len(suggestions)]
     
-    return {"suggestion": suggestion, "category": "daily", "priority": 5, "value": 10}
+    # Point users at the hour they usually get things done
+    if stats["peak_time"] is not None:
+        suggestion += f" You usually complete tasks around {stats['peak_time']} - schedule it then."
+    
+    return {"suggestion": suggestion, "title": title, "category": category, "priority": 5, "value": 10}
 
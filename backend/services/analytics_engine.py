@@ -6,8 +6,13 @@ from datetime import datetime, timedelta
 from bson import ObjectId
 from typing import Dict, Optional
 
-from core.database import get_collection
+from core.database import causal_read_session, get_causal_fence, get_collection
 from schemas.task_schema import TaskStatus
+from utils.single_flight import single_flight
+
+def _fence_key(fence: Optional[dict]):
+    """Coalescing key part for a fence: calls only share reads made after the same fence"""
+    return fence["operation_time"] if fence else None
 
 async def get_user_analytics(user_id: str) -> Dict:
     """
@@ -19,33 +24,47 @@ async def get_user_analytics(user_id: str) -> Dict:
     Returns:
         Dictionary containing analytics data
     """
-    users_collection = get_collection("users")
-    task_logs_collection = get_collection("task_logs")
-    
-    # Get user data
-    user = await users_collection.find_one({"_id": ObjectId(user_id)})
-    if not user:
-        return {"error": "User not found"}
-    
-    # 1. Get stats from User model (already calculated)
-    streak = user.get("current_streak", 0)
-    total_points = user.get("total_points", 0)
-    completed_tasks = user.get("completed_tasks", 0)
-    failed_tasks = user.get("failed_tasks", 0)
+    return await _get_user_analytics(user_id, await get_causal_fence(user_id))
+
+@single_flight(key=lambda user_id, fence: (user_id, _fence_key(fence)))
+async def _get_user_analytics(user_id: str, fence: Optional[dict]) -> Dict:
+    """Analytics dashboard read, after the user's write fence (if any)"""
+    # Staleness-tolerant: may read from a secondary, but sees the user's own recorded writes
+    users_collection = get_collection("users", workload="analytics")
+    stats_collection = get_collection("user_stats", workload="analytics")
+    task_logs_collection = get_collection("task_logs", workload="analytics")
     
-    # 2. Calculate stats from TaskLog (last 7 days)
     seven_days_ago = datetime.utcnow() - timedelta(days=7)
+    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
     
-    # Query logs from last 7 days
-    query = {
-        "user_id": user_id,
-        "timestamp": {"$gte": seven_days_ago}
-    }
-    
-    logs = []
-    async for log in task_logs_collection.find(query):
-        logs.append(log)
+    async with causal_read_session(fence) as session:
+        # Get user data and counters
+        user = await users_collection.find_one({"_id": ObjectId(user_id)}, {"username": 1, "email": 1}, session=session)
+        if not user:
+            return {"error": "User not found"}
+        stats = await stats_collection.find_one({"_id": user_id}, session=session) or {}
+        
+        # Query logs from last 7 days
+        query = {
+            "user_id": user_id,
+            "timestamp": {"$gte": seven_days_ago}
+        }
+        logs = [log async for log in task_logs_collection.find(query, session=session)]
+        
+        # And from the last 30 days
+        query_30d = {
+            "user_id": user_id,
+            "timestamp": {"$gte": thirty_days_ago}
+        }
+        logs_30d = [log async for log in task_logs_collection.find(query_30d, session=session)]
+    
+    # 1. Get stats from user_stats (already calculated)
+    streak = stats.get("current_streak", 0)
+    total_points = stats.get("total_points", 0)
+    completed_tasks = stats.get("completed_tasks", 0)
+    failed_tasks = stats.get("failed_tasks", 0)
     
+    # 2. Calculate stats from TaskLog (last 7 days)
     # Count by status
     completed_count = len([log for log in logs if log.get("status") == TaskStatus.COMPLETED.value])
     skipped_count = len([log for log in logs if log.get("status") == TaskStatus.SKIPPED.value])
@@ -57,16 +76,6 @@ async def get_user_analytics(user_id: str) -> Dict:
         completion_rate = (completed_count / total_logs) * 100
     
     # Calculate stats for last 30 days
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    query_30d = {
-        "user_id": user_id,
-        "timestamp": {"$gte": thirty_days_ago}
-    }
-    
-    logs_30d = []
-    async for log in task_logs_collection.find(query_30d):
-        logs_30d.append(log)
-    
     completed_30d = len([log for log in logs_30d if log.get("status") == TaskStatus.COMPLETED.value])
     
     # Calculate category breakdown for last 7 days
@@ -105,26 +114,30 @@ async def get_user_analytics_by_date_range(user_id: str, days: int = 7) -> Dict:
     Returns:
         Dictionary containing analytics data for the date range
     """
-    users_collection = get_collection("users")
-    task_logs_collection = get_collection("task_logs")
-    
-    # Get user data
-    user = await users_collection.find_one({"_id": ObjectId(user_id)})
-    if not user:
-        return {"error": "User not found"}
+    return await _get_user_analytics_by_date_range(user_id, days, await get_causal_fence(user_id))
+
+@single_flight(key=lambda user_id, days, fence: (user_id, days, _fence_key(fence)))
+async def _get_user_analytics_by_date_range(user_id: str, days: int, fence: Optional[dict]) -> Dict:
+    """Date range analytics read, after the user's write fence (if any)"""
+    # Staleness-tolerant: may read from a secondary, but sees the user's own recorded writes
+    users_collection = get_collection("users", workload="analytics")
+    task_logs_collection = get_collection("task_logs", workload="analytics")
     
     # Calculate date range
     start_date = datetime.utcnow() - timedelta(days=days)
     
-    # Query logs within date range
-    query = {
-        "user_id": user_id,
-        "timestamp": {"$gte": start_date}
-    }
-    
-    logs = []
-    async for log in task_logs_collection.find(query).sort("timestamp", 1):
-        logs.append(log)
+    async with causal_read_session(fence) as session:
+        # Get user data
+        user = await users_collection.find_one({"_id": ObjectId(user_id)}, {"username": 1}, session=session)
+        if not user:
+            return {"error": "User not found"}
+        
+        # Query logs within date range
+        query = {
+            "user_id": user_id,
+            "timestamp": {"$gte": start_date}
+        }
+        logs = [log async for log in task_logs_collection.find(query, session=session).sort("timestamp", 1)]
     
     # Count by status
     completed_count = len([log for log in logs if log.get("status") == TaskStatus.COMPLETED.value])
@@ -0,0 +1,85 @@
+"""
+Dashboard Service - MongoDB Async
+Composes the data the frontend needs on page load into one response
+
+The user is already resolved by the auth dependency; the independent reads
+(user stats, tasks, analytics, AI recommendations) run concurrently, and the
+priority queue is derived from the fetched task list instead of queried again.
+"""
+import asyncio
+from typing import Dict, Iterable, Set
+from fastapi import HTTPException, status
+
+from schemas.user_schema import UserInDB
+from services.analytics_engine import get_user_analytics
+from services.priority_manager import get_sorted_tasks_from_db, priority_queue_from_tasks
+from services.stats_service import with_stats
+
+DASHBOARD_SECTIONS = ["user", "tasks", "priority_queue", "analytics", "motivation", "suggestion"]
+
+def parse_sections(raw: str) -> Set[str]:
+    """
+    Parse a comma-separated sections parameter
+
+    Args:
+        raw: e.g. "tasks,analytics" (empty means every section)
+
+    Returns:
+        Set of requested section names
+    """
+    sections = {section.strip() for section in raw.split(",") if section.strip()}
+    if not sections:
+        return set(DASHBOARD_SECTIONS)
+
+    unknown = sections - set(DASHBOARD_SECTIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown sections: {', '.join(sorted(unknown))}. Valid: {', '.join(DASHBOARD_SECTIONS)}"
+        )
+    return sections
+
+async def _get_recommendations(user: UserInDB) -> Dict:
+    # Imported on first use so the AI engine stays out of cold start
+    from services.ai_engine.recommendation_service import get_recommendations
+    return await get_recommendations(user)
+
+async def _no_result():
+    return None
+
+async def build_dashboard(user: UserInDB, sections: Iterable[str]) -> Dict:
+    """
+    Build the dashboard payload for a user
+
+    Args:
+        user: The authenticated user
+        sections: Section names to include (see DASHBOARD_SECTIONS)
+
+    Returns:
+        Dictionary with one key per requested section
+    """
+    sections = set(sections)
+    need_tasks = bool(sections & {"tasks", "priority_queue"})
+    need_recommendations = bool(sections & {"motivation", "suggestion"})
+
+    profile, tasks, analytics, recommendations = await asyncio.gather(
+        with_stats(user) if "user" in sections else _no_result(),
+        get_sorted_tasks_from_db(user.id) if need_tasks else _no_result(),
+        get_user_analytics(user.id) if "analytics" in sections else _no_result(),
+        _get_recommendations(user) if need_recommendations else _no_result()
+    )
+
+    dashboard = {}
+    if "user" in sections:
+        dashboard["user"] = profile
+    if "tasks" in sections:
+        dashboard["tasks"] = tasks
+    if "priority_queue" in sections:
+        dashboard["priority_queue"] = priority_queue_from_tasks(tasks)
+    if "analytics" in sections:
+        dashboard["analytics"] = analytics
+    if "motivation" in sections:
+        dashboard["motivation"] = recommendations["motivation"]
+    if "suggestion" in sections:
+        dashboard["suggestion"] = recommendations["suggestion"]
+    return dashboard
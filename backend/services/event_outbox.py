@@ -0,0 +1,292 @@
+"""
+Event Outbox Service - MongoDB Async
+Records task state changes as events and applies their gamification side
+effects (task log, AI profile, points, streak, group snapshots) off the
+request path
+
+complete_task / skip_task insert one document into the task_events
+collection. A pool of background consumers claims pending events in
+batches with a lease, applies them and marks them done. Delivery is
+at-least-once, so every step is idempotent:
+
+    task log        inserted with _id = event id (duplicates are ignored)
+    points          guarded by the event id in users.recent_event_ids
+    streak          same-day updates leave the streak unchanged
+    AI profile      recorded once via the event's steps_applied marker
+
+Events whose lease expires (crashed worker) are picked up again; events
+that keep failing are parked with status "failed".
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List
+from decouple import config
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from core.database import get_collection, record_causal_fence, routes_to_secondaries
+from schemas.task_schema import TaskStatus
+from services.ai_engine.performance_profile import record_task_event
+from services.points_manager import update_points_for_task
+from services.streak_manager import update_user_streak
+
+# Disable to apply side effects inline in the request (pre-outbox behaviour)
+EVENT_OUTBOX_ENABLED = config("EVENT_OUTBOX_ENABLED", default=True, cast=bool)
+EVENT_CONSUMER_WORKERS = config("EVENT_CONSUMER_WORKERS", default=2, cast=int)
+EVENT_BATCH_SIZE = config("EVENT_BATCH_SIZE", default=50, cast=int)
+EVENT_LEASE_SECONDS = config("EVENT_LEASE_SECONDS", default=60, cast=int)
+EVENT_MAX_ATTEMPTS = config("EVENT_MAX_ATTEMPTS", default=5, cast=int)
+# Idle consumers poll for new events this often
+EVENT_POLL_INTERVAL_SECONDS = config("EVENT_POLL_INTERVAL_SECONDS", default=0.5, cast=float)
+
+EVENT_TASK_COMPLETED = "task_completed"
+EVENT_TASK_SKIPPED = "task_skipped"
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# In-process consumer counters, exposed through get_outbox_metrics
+_metrics = {"processed_total": 0, "failed_total": 0, "retried_total": 0}
+
+def build_task_event(event_type: str, task: dict, current_time: datetime) -> Dict:
+    """
+    Build an outbox event for a task state change
+
+    Args:
+        event_type: EVENT_TASK_COMPLETED or EVENT_TASK_SKIPPED
+        task: Task document after the state change
+        current_time: When the change happened
+
+    Returns:
+        Event document ready to insert
+    """
+    return {
+        "type": event_type,
+        "user_id": task["user_id"],
+        "task_id": str(task["_id"]),
+        "category": task.get("category", "daily"),
+        "value": task.get("value", 10),
+        "has_proof": bool(task.get("proof_url")),
+        "created_at": current_time,
+        "status": STATUS_PENDING,
+        "attempts": 0,
+        "steps_applied": []
+    }
+
+async def publish_task_event(event_type: str, task: dict, current_time: datetime, session=None) -> Dict:
+    """
+    Write a task event to the outbox
+    When the outbox is disabled the caller applies it with process_event
+
+    Args:
+        event_type: EVENT_TASK_COMPLETED or EVENT_TASK_SKIPPED
+        task: Task document after the state change
+        current_time: When the change happened
+        session: Optional transaction session shared with the state change
+
+    Returns:
+        The event document
+    """
+    event = build_task_event(event_type, task, current_time)
+    events_collection = get_collection("task_events")
+    result = await events_collection.insert_one(event, session=session)
+    event["_id"] = result.inserted_id
+    return event
+
+async def _mark_step(event_id, step: str):
+    """Record that a non-idempotent step of an event has been applied"""
+    events_collection = get_collection("task_events")
+    await events_collection.update_one({"_id": event_id}, {"$addToSet": {"steps_applied": step}})
+
+async def apply_task_event(event: dict):
+    """
+    Apply all side effects of a task event (safe to call more than once)
+
+    Args:
+        event: Event document from task_events
+    """
+    task_logs_collection = get_collection("task_logs")
+    event_id = event["_id"]
+    user_id = event["user_id"]
+    completed = event["type"] == EVENT_TASK_COMPLETED
+    log_status = TaskStatus.COMPLETED.value if completed else TaskStatus.SKIPPED.value
+    steps_applied = set(event.get("steps_applied", []))
+
+    # 1. Task log (the event id doubles as the log id)
+    try:
+        await task_logs_collection.insert_one({
+            "_id": event_id,
+            "user_id": user_id,
+            "task_id": event["task_id"],
+            "status": log_status,
+            "category": event["category"],
+            "timestamp": event["created_at"]
+        })
+    except DuplicateKeyError:
+        pass
+
+    # 2. Cached AI performance profile
+    if "profile" not in steps_applied:
+        await record_task_event(user_id, log_status, event["category"], event["created_at"])
+        await _mark_step(event_id, "profile")
+
+    # 3. Points (guarded by the event id) and group snapshots
+    await update_points_for_task(
+        user_id=user_id,
+        task_value=event["value"],
+        task_category=event["category"],
+        has_proof=event["has_proof"] if completed else False,
+        completed=completed,
+        event_id=str(event_id)
+    )
+
+    # 4. Daily streak (completions only)
+    if completed:
+        await update_user_streak(user_id=user_id, activity_time=event["created_at"])
+
+async def process_event(event: dict) -> bool:
+    """
+    Apply an event and record the outcome on the event document
+
+    Args:
+        event: Event document from task_events
+
+    Returns:
+        True if the event was applied
+    """
+    events_collection = get_collection("task_events")
+    try:
+        await apply_task_event(event)
+    except Exception as e:
+        attempts = event.get("attempts", 0) + 1
+        failed = attempts >= EVENT_MAX_ATTEMPTS
+        await events_collection.update_one(
+            {"_id": event["_id"]},
+            {"$set": {
+                "status": STATUS_FAILED if failed else STATUS_PENDING,
+                "attempts": attempts,
+                "last_error": str(e)
+            }, "$unset": {"lease_expires_at": ""}}
+        )
+        _metrics["failed_total" if failed else "retried_total"] += 1
+        print(f"[{datetime.utcnow()}] ⚠️ Task event {event['_id']} failed (attempt {attempts}): {e}")
+        return False
+
+    await events_collection.update_one(
+        {"_id": event["_id"]},
+        {"$set": {"status": STATUS_DONE, "processed_at": datetime.utcnow()}, "$unset": {"lease_expires_at": ""}}
+    )
+    _metrics["processed_total"] += 1
+    
+    # Let the user's next analytics read from a secondary include these writes
+    if routes_to_secondaries():
+        try:
+            await record_causal_fence(event["user_id"])
+        except Exception as e:
+            print(f"[{datetime.utcnow()}] ⚠️ Could not record causal fence for {event['user_id']}: {e}")
+    return True
+
+async def claim_events(batch_size: int = EVENT_BATCH_SIZE) -> List[dict]:
+    """
+    Claim up to batch_size events for this consumer, oldest first
+    Pending events and events whose lease expired are both claimable
+
+    Args:
+        batch_size: Maximum number of events to claim
+
+    Returns:
+        Claimed event documents
+    """
+    events_collection = get_collection("task_events")
+    claimed = []
+    for _ in range(batch_size):
+        now = datetime.utcnow()
+        event = await events_collection.find_one_and_update(
+            {"$or": [
+                {"status": STATUS_PENDING},
+                {"status": STATUS_PROCESSING, "lease_expires_at": {"$lt": now}}
+            ]},
+            {"$set": {"status": STATUS_PROCESSING, "lease_expires_at": now + timedelta(seconds=EVENT_LEASE_SECONDS)}},
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+        if event is None:
+            break
+        claimed.append(event)
+    return claimed
+
+async def process_batch(events: List[dict]):
+    """
+    Apply a batch of events
+    Events of the same user run in order; different users run concurrently
+
+    Args:
+        events: Claimed event documents
+    """
+    by_user: Dict[str, List[dict]] = {}
+    for event in events:
+        by_user.setdefault(event["user_id"], []).append(event)
+
+    async def process_user_events(user_events: List[dict]):
+        for event in user_events:
+            await process_event(event)
+
+    await asyncio.gather(*(process_user_events(user_events) for user_events in by_user.values()))
+
+async def run_event_consumer():
+    """
+    Single consumer loop: claim a batch, apply it, repeat
+    Sleeps for EVENT_POLL_INTERVAL_SECONDS when there is nothing to do
+    """
+    while True:
+        try:
+            events = await claim_events()
+            if events:
+                await process_batch(events)
+                continue
+        except Exception as e:
+            # Log and keep consuming (non-critical background task)
+            print(f"[{datetime.utcnow()}] ⚠️ Error in task event consumer: {e}")
+        await asyncio.sleep(EVENT_POLL_INTERVAL_SECONDS)
+
+def start_event_consumers() -> List[asyncio.Task]:
+    """
+    Start the background consumer pool
+    Call this from main.py on startup
+
+    Returns:
+        The consumer tasks
+    """
+    if not EVENT_OUTBOX_ENABLED:
+        return []
+    return [asyncio.create_task(run_event_consumer()) for _ in range(max(1, EVENT_CONSUMER_WORKERS))]
+
+async def get_outbox_metrics() -> Dict:
+    """
+    Get consumer lag and throughput metrics
+
+    Returns:
+        Dictionary with queue depth, lag of the oldest pending event and counters
+    """
+    events_collection = get_collection("task_events")
+    pending = await events_collection.count_documents({"status": {"$in": [STATUS_PENDING, STATUS_PROCESSING]}})
+    failed = await events_collection.count_documents({"status": STATUS_FAILED})
+
+    lag_seconds = 0.0
+    oldest = await events_collection.find_one(
+        {"status": {"$in": [STATUS_PENDING, STATUS_PROCESSING]}},
+        {"created_at": 1},
+        sort=[("created_at", ASCENDING)]
+    )
+    if oldest:
+        lag_seconds = (datetime.utcnow() - oldest["created_at"]).total_seconds()
+
+    return {
+        "enabled": EVENT_OUTBOX_ENABLED,
+        "pending": pending,
+        "failed": failed,
+        "consumer_lag_seconds": lag_seconds,
+        **_metrics
+    }
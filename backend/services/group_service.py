@@ -0,0 +1,388 @@
+"""
+Group Service - Business logic for group membership
+Handles group creation, joining, leaving and member listing with a constant
+number of round trips
+
+Small groups keep their members embedded in the group document. Once a group
+reaches GROUP_EMBEDDED_MEMBER_LIMIT members it is promoted to the
+group_memberships collection (one document per (group_id, user_id)), so very
+large groups stay well under the document size limit.
+"""
+from datetime import datetime
+from typing import Dict, List
+from bson import ObjectId
+from decouple import config
+from fastapi import HTTPException, status
+from pymongo import DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from core.database import get_collection, start_transaction
+from schemas.group_schema import GroupCreate, GroupOut
+from schemas.user_schema import UserOut
+from services.group_snapshot import (
+    GROUP_MEMBERSHIP_COLLECTION,
+    STORAGE_COLLECTION,
+    STORAGE_EMBEDDED,
+    build_member_entry,
+    snapshot_members,
+    uses_membership_collection
+)
+from utils.single_flight import single_flight
+
+# Embedded groups are promoted to the membership collection at this size
+GROUP_EMBEDDED_MEMBER_LIMIT = config("GROUP_EMBEDDED_MEMBER_LIMIT", default=200, cast=int)
+# Hard cap on members per group (0 = unlimited)
+GROUP_MAX_MEMBERS = config("GROUP_MAX_MEMBERS", default=0, cast=int)
+
+def group_doc_to_out(group: dict) -> GroupOut:
+    """Convert a group document to GroupOut"""
+    group["id"] = str(group["_id"])
+    del group["_id"]
+    group.setdefault("member_count", len(group.get("members", [])))
+    return GroupOut(**group)
+
+def group_full_exception() -> HTTPException:
+    """Error raised when a group has reached GROUP_MAX_MEMBERS"""
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Group is full"
+    )
+
+def already_member_exception() -> HTTPException:
+    """Error raised when the user is already in the group"""
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="User is already a member of this group"
+    )
+
+def embedded_capacity() -> int:
+    """Member count below which a join may still go into the embedded array"""
+    if not GROUP_MEMBERSHIP_COLLECTION:
+        # Without the membership collection, embedded groups are the only option
+        return GROUP_MAX_MEMBERS or 2 ** 31 - 1
+    if GROUP_MAX_MEMBERS:
+        return min(GROUP_MAX_MEMBERS, GROUP_EMBEDDED_MEMBER_LIMIT)
+    return GROUP_EMBEDDED_MEMBER_LIMIT
+
+async def create_group(group: GroupCreate, user: UserOut) -> GroupOut:
+    """
+    Create a new group with the user as admin and first member
+
+    Args:
+        group: Group creation payload
+        user: Creating user
+
+    Returns:
+        Created GroupOut object
+    """
+    groups_collection = get_collection("groups")
+    users_collection = get_collection("users")
+
+    # Create group document (snapshot starts with the creator)
+    group_doc = {
+        "group_name": group.group_name,
+        "pool_amount": group.pool_amount,
+        "admin_id": user.id,
+        "members": [user.id],
+        "member_count": 1,
+        "membership_storage": STORAGE_EMBEDDED,
+        "monthly_goal": "",
+        "member_snapshot": {user.id: build_member_entry(user.model_dump())},
+        "snapshot_refreshed_at": datetime.utcnow()
+    }
+
+    async with start_transaction() as session:
+        result = await groups_collection.insert_one(group_doc, session=session)
+        group_id = str(result.inserted_id)
+
+        # Add group_id to user's group_ids list
+        await users_collection.update_one(
+            {"_id": ObjectId(user.id)},
+            {"$addToSet": {"group_ids": group_id}},
+            session=session
+        )
+
+    return group_doc_to_out(group_doc)
+
+async def promote_group_to_collection(group_id: str, session=None):
+    """
+    Move an embedded group's members into the group_memberships collection
+
+    The storage flag is flipped in the same operation that reads the member
+    list, so no further joins can land in the embedded array afterwards.
+
+    Args:
+        group_id: Group ID
+        session: Optional transaction session
+    """
+    groups_collection = get_collection("groups")
+    memberships_collection = get_collection("group_memberships")
+
+    group = await groups_collection.find_one_and_update(
+        {"_id": ObjectId(group_id), "membership_storage": {"$ne": STORAGE_COLLECTION}},
+        {"$set": {"membership_storage": STORAGE_COLLECTION}},
+        projection={"members": 1, "member_snapshot": 1},
+        return_document=ReturnDocument.BEFORE,
+        session=session
+    )
+    if group is None:
+        # Already promoted by a concurrent join
+        return
+
+    snapshot = group.get("member_snapshot") or {}
+    joined_at = datetime.utcnow()
+    # Upserts, so memberships left over from an interrupted promotion don't
+    # raise duplicate key errors (which would abort an enclosing transaction)
+    membership_writes = [
+        UpdateOne(
+            {"group_id": group_id, "user_id": member_id},
+            {"$setOnInsert": {"joined_at": joined_at, **snapshot.get(member_id, build_member_entry({}))}},
+            upsert=True
+        )
+        for member_id in group.get("members", [])
+    ]
+
+    if membership_writes:
+        await memberships_collection.bulk_write(membership_writes, ordered=False, session=session)
+
+    await groups_collection.update_one(
+        {"_id": ObjectId(group_id)},
+        {"$unset": {"members": "", "member_snapshot": "", "snapshot_missing_members": "", "snapshot_refreshed_at": ""}},
+        session=session
+    )
+
+async def join_membership_collection(group_id: str, user: UserOut, session=None) -> dict:
+    """
+    Add the user to a group stored in the group_memberships collection
+
+    Args:
+        group_id: Group ID
+        user: Joining user
+        session: Optional transaction session
+
+    Returns:
+        Updated group document
+    """
+    groups_collection = get_collection("groups")
+    memberships_collection = get_collection("group_memberships")
+
+    # Reserve a seat first; the filter enforces the member limit atomically
+    seat_filter = {"_id": ObjectId(group_id)}
+    if GROUP_MAX_MEMBERS:
+        seat_filter["member_count"] = {"$lt": GROUP_MAX_MEMBERS}
+
+    updated_group = await groups_collection.find_one_and_update(
+        seat_filter,
+        {"$inc": {"member_count": 1}},
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+    if updated_group is None:
+        raise group_full_exception()
+
+    try:
+        await memberships_collection.insert_one(
+            {
+                "group_id": group_id,
+                "user_id": user.id,
+                "joined_at": datetime.utcnow(),
+                **build_member_entry(user.model_dump())
+            },
+            session=session
+        )
+    except DuplicateKeyError:
+        # Give the seat back; the unique index caught a concurrent or repeated join
+        await groups_collection.update_one(
+            {"_id": ObjectId(group_id)},
+            {"$inc": {"member_count": -1}},
+            session=session
+        )
+        raise already_member_exception()
+
+    return updated_group
+
+async def join_group(group_id: str, user: UserOut) -> GroupOut:
+    """
+    Add the user to a group
+
+    The membership check and the insert happen in one conditional
+    find_one_and_update, so concurrent joins can't double-add a member.
+
+    Args:
+        group_id: Group ID
+        user: Joining user
+
+    Returns:
+        Updated GroupOut object
+    """
+    groups_collection = get_collection("groups")
+    users_collection = get_collection("users")
+
+    async with start_transaction() as session:
+        # Fast path: embedded group with room left and the user not yet a member
+        updated_group = await groups_collection.find_one_and_update(
+            {
+                "_id": ObjectId(group_id),
+                "membership_storage": {"$ne": STORAGE_COLLECTION},
+                "members": {"$ne": user.id},
+                "member_count": {"$lt": embedded_capacity()}
+            },
+            {
+                "$addToSet": {"members": user.id},
+                "$inc": {"member_count": 1},
+                "$set": {f"member_snapshot.{user.id}": build_member_entry(user.model_dump())}
+            },
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+
+        if updated_group is None:
+            # Slow path: find out why the fast path didn't match
+            group = await groups_collection.find_one(
+                {"_id": ObjectId(group_id)},
+                {"membership_storage": 1, "member_count": 1},
+                session=session
+            )
+            if not group:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Group not found"
+                )
+            if not uses_membership_collection(group):
+                is_member = await groups_collection.count_documents(
+                    {"_id": ObjectId(group_id), "members": user.id}, limit=1, session=session
+                )
+                if is_member:
+                    raise already_member_exception()
+            if GROUP_MAX_MEMBERS and group.get("member_count", 0) >= GROUP_MAX_MEMBERS:
+                raise group_full_exception()
+            if not uses_membership_collection(group):
+                if not GROUP_MEMBERSHIP_COLLECTION:
+                    raise group_full_exception()
+                await promote_group_to_collection(group_id, session=session)
+            updated_group = await join_membership_collection(group_id, user, session=session)
+
+        # Add group_id to user's group_ids list
+        await users_collection.update_one(
+            {"_id": ObjectId(user.id)},
+            {"$addToSet": {"group_ids": group_id}},
+            session=session
+        )
+
+    return group_doc_to_out(updated_group)
+
+async def leave_all_groups(user_id: str):
+    """
+    Remove the user from every group they belong to
+    Groups left without members are deleted
+
+    Uses a fixed number of round trips regardless of how many groups the
+    user is in or how large those groups are.
+
+    Args:
+        user_id: User ID
+    """
+    groups_collection = get_collection("groups")
+    users_collection = get_collection("users")
+    memberships_collection = get_collection("group_memberships")
+
+    async with start_transaction() as session:
+        # Clear group_ids and get the previous list back in one operation
+        user_doc = await users_collection.find_one_and_update(
+            {"_id": ObjectId(user_id), "group_ids.0": {"$exists": True}},
+            {"$set": {"group_ids": []}},
+            projection={"group_ids": 1},
+            return_document=ReturnDocument.BEFORE,
+            session=session
+        )
+        if user_doc is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User is not in any group"
+            )
+
+        group_object_ids = [ObjectId(group_id) for group_id in user_doc.get("group_ids", [])]
+
+        # Embedded groups: pull the user from members and the member snapshot
+        await groups_collection.update_many(
+            {"_id": {"$in": group_object_ids}, "members": user_id},
+            {
+                "$pull": {"members": user_id},
+                "$unset": {f"member_snapshot.{user_id}": ""},
+                "$inc": {"member_count": -1}
+            },
+            session=session
+        )
+
+        if GROUP_MEMBERSHIP_COLLECTION:
+            # Large groups: drop the membership documents and release the seats
+            membership_group_ids = [
+                ObjectId(membership["group_id"])
+                async for membership in memberships_collection.find(
+                    {"user_id": user_id}, {"group_id": 1}, session=session
+                )
+            ]
+            if membership_group_ids:
+                await memberships_collection.delete_many({"user_id": user_id}, session=session)
+                await groups_collection.update_many(
+                    {"_id": {"$in": membership_group_ids}},
+                    {"$inc": {"member_count": -1}},
+                    session=session
+                )
+
+        # Delete the groups that are now empty
+        await groups_collection.delete_many(
+            {"_id": {"$in": group_object_ids}, "member_count": {"$lte": 0}},
+            session=session
+        )
+
+@single_flight(key=lambda group, page=1, page_size=50: (str(group["_id"]), page, page_size))
+async def get_group_members_page(group: dict, page: int = 1, page_size: int = 50) -> List[Dict]:
+    """
+    Get one page of a group's members sorted by total_points descending
+
+    Args:
+        group: Group document (with a fresh snapshot for embedded groups)
+        page: 1-based page number
+        page_size: Members per page
+
+    Returns:
+        List of member entries including user_id
+    """
+    skip = (page - 1) * page_size
+
+    if not uses_membership_collection(group):
+        return snapshot_members(group)[skip:skip + page_size]
+
+    memberships_collection = get_collection("group_memberships")
+    cursor = memberships_collection.find(
+        {"group_id": str(group["_id"])},
+        {"_id": 0, "group_id": 0, "joined_at": 0}
+    ).sort("total_points", DESCENDING).skip(skip).limit(page_size)
+
+    return [membership async for membership in cursor]
+
+async def get_group_total_points(group: dict) -> int:
+    """
+    Sum the total_points of every member of a group
+
+    Args:
+        group: Group document (with a fresh snapshot for embedded groups)
+
+    Returns:
+        Total points across members
+    """
+    if not uses_membership_collection(group):
+        return sum(
+            int(member.get("total_points", 0))
+            for member in (group.get("member_snapshot") or {}).values()
+        )
+
+    memberships_collection = get_collection("group_memberships")
+    cursor = memberships_collection.aggregate([
+        {"$match": {"group_id": str(group["_id"])}},
+        {"$group": {"_id": None, "total_points": {"$sum": "$total_points"}}}
+    ])
+    async for result in cursor:
+        return int(result["total_points"])
+    return 0
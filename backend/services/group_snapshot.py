@@ -0,0 +1,232 @@
+"""
+Group Snapshot Service - MongoDB Async
+Maintains a compact, denormalized member snapshot on each group document
+so group views and group leaderboards can be served with a single find_one
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from bson import ObjectId
+from decouple import config
+from pymongo import UpdateMany
+
+from core.database import get_collection
+from services.stats_service import get_stats_for_users
+from utils.single_flight import single_flight
+
+# Snapshots older than this are rebuilt from the users collection on read
+GROUP_SNAPSHOT_MAX_AGE_SECONDS = config("GROUP_SNAPSHOT_MAX_AGE_SECONDS", default=300, cast=int)
+# Allow large groups to move their members into the group_memberships collection
+GROUP_MEMBERSHIP_COLLECTION = config("GROUP_MEMBERSHIP_COLLECTION", default=True, cast=bool)
+
+# Values of a group's membership_storage field
+STORAGE_EMBEDDED = "embedded"
+STORAGE_COLLECTION = "collection"
+
+def build_member_entry(user: dict) -> Dict:
+    """
+    Build the compact snapshot entry stored for a single member
+
+    Args:
+        user: User document (or dict with the same fields)
+
+    Returns:
+        Dictionary with the member fields group views need
+    """
+    return {
+        "username": user.get("username", ""),
+        "email": user.get("email", ""),
+        "total_points": user.get("total_points", 0),
+        "current_streak": user.get("current_streak", 0)
+    }
+
+def uses_membership_collection(group: dict) -> bool:
+    """Check whether a group keeps its members in the group_memberships collection"""
+    return group.get("membership_storage", STORAGE_EMBEDDED) == STORAGE_COLLECTION
+
+def is_snapshot_fresh(group: dict) -> bool:
+    """
+    Check whether a group's snapshot can be served as-is
+
+    Args:
+        group: Group document
+
+    Returns:
+        True if the snapshot covers every member and is within the staleness window
+        (members whose user document was gone at the last refresh count as covered)
+    """
+    # Membership documents are kept current by sync_member_stats, nothing to rebuild
+    if uses_membership_collection(group):
+        return True
+    refreshed_at = group.get("snapshot_refreshed_at")
+    if refreshed_at is None:
+        return False
+    if datetime.utcnow() - refreshed_at > timedelta(seconds=GROUP_SNAPSHOT_MAX_AGE_SECONDS):
+        return False
+    snapshot = group.get("member_snapshot") or {}
+    resolved = set(snapshot.keys()) | set(group.get("snapshot_missing_members") or [])
+    return resolved == set(group.get("members", []))
+
+async def refresh_group_snapshot(group: dict) -> dict:
+    """
+    Rebuild a group's member snapshot from the users and user_stats collections
+
+    Args:
+        group: Group document to refresh (updated in place)
+
+    Returns:
+        The group document with a fresh snapshot
+    """
+    groups_collection = get_collection("groups")
+    users_collection = get_collection("users")
+
+    snapshot = {}
+    members = group.get("members", [])
+    if members:
+        member_object_ids = [ObjectId(member_id) for member_id in members]
+        cursor = users_collection.find(
+            {"_id": {"$in": member_object_ids}},
+            {"username": 1, "email": 1}
+        )
+        users = [user_doc async for user_doc in cursor]
+        member_stats = await get_stats_for_users([str(user_doc["_id"]) for user_doc in users])
+        for user_doc in users:
+            user_id = str(user_doc["_id"])
+            snapshot[user_id] = build_member_entry({**user_doc, **member_stats[user_id]})
+
+    # Members without a user document (deleted accounts) can't be resolved;
+    # remembering them keeps the snapshot fresh instead of rebuilding on every read
+    missing_members = [member_id for member_id in members if member_id not in snapshot]
+
+    refreshed_at = datetime.utcnow()
+    await groups_collection.update_one(
+        {"_id": group["_id"]},
+        {"$set": {
+            "member_snapshot": snapshot,
+            "snapshot_missing_members": missing_members,
+            "snapshot_refreshed_at": refreshed_at
+        }}
+    )
+
+    group["member_snapshot"] = snapshot
+    group["snapshot_missing_members"] = missing_members
+    group["snapshot_refreshed_at"] = refreshed_at
+    return group
+
+@single_flight()
+async def get_group_with_snapshot(group_id: str) -> Optional[dict]:
+    """
+    Fetch a group with an up-to-date member snapshot
+
+    A fresh snapshot is served straight from the group document; only stale
+    or incomplete snapshots fall back to the users collection. Concurrent
+    reads of the same group share one query (the result is shared: don't
+    mutate it).
+
+    Args:
+        group_id: Group ID
+
+    Returns:
+        Group document or None if not found
+    """
+    groups_collection = get_collection("groups")
+    group = await groups_collection.find_one({"_id": ObjectId(group_id)})
+    if not group:
+        return None
+
+    if not is_snapshot_fresh(group):
+        group = await refresh_group_snapshot(group)
+
+    return group
+
+def snapshot_members(group: dict) -> List[Dict]:
+    """
+    List a group's snapshot entries sorted by total_points descending
+
+    Args:
+        group: Group document with a member snapshot
+
+    Returns:
+        List of member entries including user_id
+    """
+    snapshot = group.get("member_snapshot") or {}
+    members = [{"user_id": user_id, **entry} for user_id, entry in snapshot.items()]
+    members.sort(key=lambda x: x["total_points"], reverse=True)
+    return members
+
+async def sync_member_stats(user_id: str, **fields):
+    """
+    Push changed member stats into every group snapshot containing the user
+    (and into the user's group_memberships documents for large groups)
+
+    Args:
+        user_id: User ID
+        **fields: Snapshot fields to overwrite (e.g. total_points, current_streak)
+    """
+    if not fields:
+        return
+
+    groups_collection = get_collection("groups")
+    update_data = {f"member_snapshot.{user_id}.{key}": value for key, value in fields.items()}
+
+    await groups_collection.update_many(
+        {"members": user_id, f"member_snapshot.{user_id}": {"$exists": True}},
+        {"$set": update_data}
+    )
+
+    if GROUP_MEMBERSHIP_COLLECTION:
+        memberships_collection = get_collection("group_memberships")
+        await memberships_collection.update_many({"user_id": user_id}, {"$set": fields})
+
+async def sync_grouped_member_stats(user_id: str, **fields):
+    """
+    sync_member_stats for callers that don't know the user's groups
+    Skips the group writes for users who aren't in any group
+
+    Args:
+        user_id: User ID
+        **fields: Snapshot fields to overwrite
+    """
+    users_collection = get_collection("users")
+    user = await users_collection.find_one({"_id": ObjectId(user_id)}, {"group_ids": 1})
+    if user and user.get("group_ids"):
+        await sync_member_stats(user_id, **fields)
+
+async def reset_member_streaks(user_ids: List[str]):
+    """
+    Zero the snapshot streak of many users at once (after streak decay)
+    Uses one bulk write for group snapshots and one update for memberships
+
+    Args:
+        user_ids: IDs of users whose streak was reset
+    """
+    if not user_ids:
+        return
+
+    # Only users who are in a group have snapshot entries
+    users_collection = get_collection("users")
+    cursor = users_collection.find(
+        {"_id": {"$in": [ObjectId(user_id) for user_id in user_ids]}, "group_ids.0": {"$exists": True}},
+        {"_id": 1}
+    )
+    grouped_ids = [str(user_doc["_id"]) async for user_doc in cursor]
+    if not grouped_ids:
+        return
+
+    groups_collection = get_collection("groups")
+    await groups_collection.bulk_write(
+        [
+            UpdateMany(
+                {"members": user_id, f"member_snapshot.{user_id}": {"$exists": True}},
+                {"$set": {f"member_snapshot.{user_id}.current_streak": 0}}
+            )
+            for user_id in grouped_ids
+        ],
+        ordered=False
+    )
+
+    if GROUP_MEMBERSHIP_COLLECTION:
+        memberships_collection = get_collection("group_memberships")
+        await memberships_collection.update_many(
+            {"user_id": {"$in": grouped_ids}},
+            {"$set": {"current_streak": 0}}
+        )
@@ -0,0 +1,76 @@
+"""
+Leaderboard Service - MongoDB Async
+Global and group-ranking reads shared by the leaderboard endpoints
+
+Many clients poll the same boards at the same moment, so the reads are
+single-flight: concurrent identical calls share one query. They tolerate
+staleness and follow the "leaderboard" read preference (see core.database).
+"""
+from typing import Dict, List
+from bson import ObjectId
+
+from core.database import get_collection
+from services.group_service import get_group_total_points
+from services.group_snapshot import is_snapshot_fresh, refresh_group_snapshot
+from utils.single_flight import single_flight
+
+@single_flight()
+async def get_top_users(limit: int) -> List[Dict]:
+    """
+    Get the users with the most total_points
+
+    Args:
+        limit: Maximum number of users to return
+
+    Returns:
+        List of {user_id, username, email, total_points}, highest first
+    """
+    stats_collection = get_collection("user_stats", workload="leaderboard")
+    users_collection = get_collection("users", workload="leaderboard")
+
+    cursor = stats_collection.find({}, {"total_points": 1}).sort("total_points", -1).limit(limit)
+    top_stats = [stats async for stats in cursor]
+
+    # Names for the page in one $in read
+    users = {}
+    if top_stats:
+        user_cursor = users_collection.find(
+            {"_id": {"$in": [ObjectId(stats["_id"]) for stats in top_stats]}},
+            {"username": 1, "email": 1}
+        )
+        users = {str(user_doc["_id"]): user_doc async for user_doc in user_cursor}
+
+    return [
+        {
+            "user_id": stats["_id"],
+            "username": users.get(stats["_id"], {}).get("username", ""),
+            "email": users.get(stats["_id"], {}).get("email", ""),
+            "total_points": stats.get("total_points", 0)
+        }
+        for stats in top_stats
+        if stats["_id"] in users
+    ]
+
+@single_flight()
+async def get_group_rankings() -> List[Dict]:
+    """
+    Rank all groups by the total points of their members
+
+    Returns:
+        List of {group_id, group_name, total_points}, highest first
+    """
+    groups_collection = get_collection("groups", workload="leaderboard")
+
+    entries = []
+    async for group in groups_collection.find():
+        # Only stale snapshots need a round trip to the users collection
+        if not is_snapshot_fresh(group):
+            group = await refresh_group_snapshot(group)
+        entries.append({
+            "group_id": str(group["_id"]),
+            "group_name": group.get("group_name", ""),
+            "total_points": await get_group_total_points(group)
+        })
+
+    entries.sort(key=lambda entry: entry["total_points"], reverse=True)
+    return entries
@@ -0,0 +1,87 @@
+"""
+Leaderboard Stream Service
+Pushes leaderboard deltas to connected clients instead of having them poll
+
+Clients subscribe to a channel ("global" or a group ID) and get a bounded
+queue of (event, payload) items, drained by the /leaderboard/stream SSE
+endpoint. The change feed calls the handlers below whenever a user's points
+or a group changes, from this worker or any other.
+"""
+import asyncio
+from typing import Dict, Set
+from bson import ObjectId
+from decouple import config
+
+from core.database import get_collection
+from utils.sse import put_nowait_dropping_oldest
+
+GLOBAL_CHANNEL = "global"
+# Per-connection queue size; slow clients lose the oldest deltas first
+LEADERBOARD_STREAM_QUEUE_SIZE = config("LEADERBOARD_STREAM_QUEUE_SIZE", default=100, cast=int)
+
+_subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+def subscribe(channel: str) -> asyncio.Queue:
+    """
+    Register a new listener on a channel
+
+    Args:
+        channel: GLOBAL_CHANNEL or a group ID
+
+    Returns:
+        The listener's queue of (event, payload) tuples
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=LEADERBOARD_STREAM_QUEUE_SIZE)
+    _subscribers.setdefault(channel, set()).add(queue)
+    return queue
+
+def unsubscribe(channel: str, queue: asyncio.Queue):
+    """Remove a listener (called when its connection closes)"""
+    listeners = _subscribers.get(channel)
+    if listeners is not None:
+        listeners.discard(queue)
+        if not listeners:
+            del _subscribers[channel]
+
+def publish(channel: str, event: str, payload: Dict):
+    """Send an event to every listener on a channel"""
+    for queue in list(_subscribers.get(channel, ())):
+        put_nowait_dropping_oldest(queue, (event, payload))
+
+def subscriber_count() -> int:
+    """Number of open leaderboard streams in this process"""
+    return sum(len(listeners) for listeners in _subscribers.values())
+
+async def handle_stats_change(change: Dict):
+    """
+    Change feed handler for user_stats: push the user's new totals
+    to the global board and every group board they appear on
+    """
+    stats = change.get("document")
+    if not stats or not _subscribers:
+        return
+    if change["updated_fields"] and not {"total_points", "current_streak"} & set(change["updated_fields"]):
+        return
+
+    # Name and groups come from the identity document
+    users_collection = get_collection("users")
+    user = await users_collection.find_one({"_id": ObjectId(stats["_id"])}, {"username": 1, "group_ids": 1})
+    if not user:
+        return
+
+    delta = {
+        "user_id": stats["_id"],
+        "username": user.get("username", ""),
+        "total_points": stats.get("total_points", 0),
+        "current_streak": stats.get("current_streak", 0)
+    }
+    publish(GLOBAL_CHANNEL, "points", delta)
+    for group_id in user.get("group_ids") or []:
+        publish(str(group_id), "points", delta)
+
+async def handle_group_change(change: Dict):
+    """Change feed handler for groups: tell group boards to refetch membership"""
+    if change["document_id"] is None:
+        return
+    group_id = str(change["document_id"])
+    publish(group_id, "group_changed", {"group_id": group_id, "operation": change["operation"]})
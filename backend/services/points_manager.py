@@ -1,16 +1,67 @@
 """
 Points Manager Service - MongoDB Async
 Handles point calculations and updates for task completion
+Counters live in user_stats (see services.stats_service)
 """
-from bson import ObjectId
+from datetime import datetime
+from typing import Optional
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
 from core.database import get_collection
+from services.group_snapshot import sync_grouped_member_stats
+from services.stats_service import upserting
+
+# Event IDs remembered per user to make outbox redelivery a no-op
+RECENT_EVENT_IDS = 100
+
+def _stats_filter(user_id: str, event_id: Optional[str]) -> dict:
+    """Match the user's stats, skipping them if this event was already applied"""
+    stats_filter = {"_id": user_id}
+    if event_id is not None:
+        stats_filter["recent_event_ids"] = {"$ne": event_id}
+    return stats_filter
+
+def _with_event_id(update: dict, event_id: Optional[str]) -> dict:
+    """Record the applied event ID alongside the points update"""
+    if event_id is not None:
+        update["$push"] = {"recent_event_ids": {"$each": [event_id], "$slice": -RECENT_EVENT_IDS}}
+    return update
+
+async def _apply_stats_update(user_id: str, event_id: Optional[str], update: dict) -> Optional[dict]:
+    """
+    Apply a counter update once per event, creating the stats document if missing
+
+    Returns:
+        Stats after the update (total_points only), or None if the event was already applied
+    """
+    stats_collection = get_collection("user_stats")
+    update = upserting(_with_event_id(update, event_id))
+    try:
+        return await stats_collection.find_one_and_update(
+            _stats_filter(user_id, event_id),
+            update,
+            projection={"total_points": 1},
+            return_document=ReturnDocument.AFTER,
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # The document exists: either it already has this event, or it was
+        # created concurrently and a plain update applies the event
+        return await stats_collection.find_one_and_update(
+            _stats_filter(user_id, event_id),
+            update,
+            projection={"total_points": 1},
+            return_document=ReturnDocument.AFTER
+        )
 
 async def update_points_for_task(
     user_id: str,
     task_value: int,
     task_category: str,
     has_proof: bool = False,
-    completed: bool = True
+    completed: bool = True,
+    event_id: Optional[str] = None
 ):
     """
     Update user points based on task completion
@@ -21,12 +72,11 @@ async def update_points_for_task(
         task_category: Task category (daily, weekly, weekend, monthly)
         has_proof: Whether task has proof URL
         completed: Whether task was completed (True) or failed (False)
+        event_id: Outbox event ID; a repeated event ID is applied only once
     
     Returns:
         Updated points value
     """
-    users_collection = get_collection("users")
-    
     if completed:
         # Calculate points with multipliers
         points = task_value
@@ -41,31 +91,35 @@ async def update_points_for_task(
         if has_proof:
             points += 2
         
-        # Update user: add points and increment completed_tasks
-        await users_collection.update_one(
-            {"_id": ObjectId(user_id)},
-            {
-                "$inc": {
-                    "total_points": points,
-                    "completed_tasks": 1
-                }
-            }
-        )
+        # Update stats: add points and increment completed_tasks
+        updated_stats = await _apply_stats_update(user_id, event_id, {
+            "$inc": {
+                "total_points": points,
+                "completed_tasks": 1
+            },
+            "$set": {"stats_updated_at": datetime.utcnow()}
+        })
+        
+        # Keep group member snapshots in step with the new total
+        if updated_stats:
+            await sync_grouped_member_stats(user_id, total_points=updated_stats.get("total_points", 0))
         
         return points
     else:
         # Task failed: deduct points and increment failed_tasks
         penalty = 5
         
-        await users_collection.update_one(
-            {"_id": ObjectId(user_id)},
-            {
-                "$inc": {
-                    "total_points": -penalty,
-                    "failed_tasks": 1
-                }
-            }
-        )
+        updated_stats = await _apply_stats_update(user_id, event_id, {
+            "$inc": {
+                "total_points": -penalty,
+                "failed_tasks": 1
+            },
+            "$set": {"stats_updated_at": datetime.utcnow()}
+        })
+        
+        # Keep group member snapshots in step with the new total
+        if updated_stats:
+            await sync_grouped_member_stats(user_id, total_points=updated_stats.get("total_points", 0))
         
         return -penalty
 
@@ -39,10 +39,11 @@ async def get_sorted_tasks_from_db(
         query["category"] = category
     
     # Fetch tasks and sort by priority (ascending - lower number = higher priority)
-    # Secondary sort by created_at for consistent ordering
+    # Then by rank (manual order) and created_at for consistent ordering
     cursor = tasks_collection.find(query).sort([
         ("priority", 1),  # Primary sort: priority ascending
-        ("created_at", 1)  # Secondary sort: created_at ascending
+        ("rank", 1),  # Manual order within a priority (see services.ranking)
+        ("created_at", 1)  # Tiebreak: created_at ascending
     ])
     
     tasks = []
@@ -53,6 +54,20 @@ async def get_sorted_tasks_from_db(
     
     return tasks
 
+def priority_queue_from_tasks(tasks: List[TaskOut]) -> List[TaskOut]:
+    """
+    Derive the priority queue from an already-fetched, priority-sorted task list
+    Same result as get_priority_queue without another query
+    
+    Args:
+        tasks: Tasks as returned by get_sorted_tasks_from_db (no filters)
+    
+    Returns:
+        Pending and in_progress tasks, in the same order
+    """
+    open_statuses = {TaskStatus.PENDING.value, TaskStatus.IN_PROGRESS.value}
+    return [task for task in tasks if task.status in open_statuses]
+
 async def get_priority_queue(user_id: str) -> List[TaskOut]:
     """
     Get priority queue - only incomplete tasks sorted by priority
@@ -72,10 +87,11 @@ async def get_priority_queue(user_id: str) -> List[TaskOut]:
     }
     
     # Fetch tasks and sort by priority (ascending - lower number = higher priority)
-    # Secondary sort by created_at for consistent ordering
+    # Then by rank (manual order) and created_at for consistent ordering
     cursor = tasks_collection.find(query).sort([
         ("priority", 1),  # Primary sort: priority ascending
-        ("created_at", 1)  # Secondary sort: created_at ascending
+        ("rank", 1),  # Manual order within a priority (see services.ranking)
+        ("created_at", 1)  # Tiebreak: created_at ascending
     ])
     
     tasks = []
@@ -0,0 +1,177 @@
+"""
+Task Ranking Service
+Fractional (lexicographic) rank keys for manual task ordering
+
+Tasks sort by (priority, rank, created_at). A rank is a base-62 string
+compared character by character (MongoDB's default binary string order), so
+a key can always be generated between any two neighbours: moving a task
+rewrites only that task. Repeated inserts at the same spot make keys grow,
+so a periodic job re-spaces the ranks of users whose keys got too long.
+
+Keys never end in "0", which guarantees there is room below every key.
+Concurrent inserts at the same spot can produce equal keys; a move between
+two tied tasks re-spaces the user's ranks first (ties keep their
+created_at, _id order).
+"""
+from datetime import datetime
+from typing import List, Optional
+from decouple import config
+from pymongo import UpdateOne
+
+from core.database import get_collection
+from services.stats_service import bump_tasks_version
+
+# ASCII-ordered, so string comparison matches digit order
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+# Users with a rank longer than this are re-spaced by the rebalance job
+RANK_MAX_LENGTH = config("RANK_MAX_LENGTH", default=16, cast=int)
+
+def rank_between(low: Optional[str], high: Optional[str]) -> str:
+    """
+    Generate a rank key strictly between two keys
+
+    Args:
+        low: Key to sort after (None: no lower bound)
+        high: Key to sort before (None: no upper bound)
+
+    Returns:
+        A new key with low < key < high
+    """
+    if low is not None and high is not None and low >= high:
+        raise ValueError(f"Rank bounds out of order: {low!r} >= {high!r}")
+
+    low = low or ""
+    result = []
+    i = 0
+    while True:
+        low_digit = DIGITS.index(low[i]) if i < len(low) else 0
+        high_digit = DIGITS.index(high[i]) if high is not None and i < len(high) else BASE
+        if high_digit - low_digit > 1:
+            result.append(DIGITS[(low_digit + high_digit) // 2])
+            return "".join(result)
+        # No room at this position: copy the lower digit and look further right
+        result.append(DIGITS[low_digit])
+        if high_digit > low_digit:
+            # We are now below high at this position, so it no longer constrains us
+            high = None
+        i += 1
+
+def spaced_ranks(count: int) -> List[str]:
+    """
+    Generate count evenly spaced, short rank keys in ascending order
+
+    Args:
+        count: Number of keys
+
+    Returns:
+        List of keys
+    """
+    width = 1
+    while BASE ** width <= count * 4:
+        width += 1
+    step = BASE ** width // (count + 1)
+
+    ranks = []
+    for position in range(1, count + 1):
+        value = position * step
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        ranks.append("".join(reversed(digits)).rstrip("0"))
+    return ranks
+
+async def rank_for_new_task(user_id: str, priority: int) -> str:
+    """
+    Rank that places a new task last among the user's tasks of the same priority
+
+    Args:
+        user_id: Owner of the task
+        priority: The new task's priority
+
+    Returns:
+        Rank key
+    """
+    tasks_collection = get_collection("tasks")
+    last = await tasks_collection.find_one(
+        {"user_id": user_id, "priority": priority, "rank": {"$ne": None}},
+        {"rank": 1},
+        sort=[("rank", -1)]
+    )
+    return rank_between(last["rank"] if last else None, None)
+
+async def rebalance_user_ranks(user_id: str, attempts: int = 3) -> int:
+    """
+    Re-space all of a user's rank keys, keeping the current order
+
+    Each rewrite is guarded by the version that was read, so a task moved,
+    created or edited concurrently is not overwritten; the pass is then
+    repeated from the new order (up to attempts times).
+
+    Args:
+        user_id: User ID
+        attempts: Passes to try before leaving the rest to the next run
+
+    Returns:
+        Number of tasks rewritten
+    """
+    tasks_collection = get_collection("tasks")
+    rewritten = 0
+    for _ in range(attempts):
+        cursor = tasks_collection.find(
+            {"user_id": user_id},
+            {"_id": 1, "version": 1}
+        ).sort([("priority", 1), ("rank", 1), ("created_at", 1), ("_id", 1)])
+        tasks = [task async for task in cursor]
+        if not tasks:
+            break
+
+        # Order is preserved; the rewrite still counts as a change for sync, ETags and If-Match
+        current_time = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"_id": task["_id"], "version": task.get("version", 1)},
+                {"$set": {"rank": rank, "updated_at": current_time}, "$inc": {"version": 1}}
+            )
+            for task, rank in zip(tasks, spaced_ranks(len(tasks)))
+        ]
+        result = await tasks_collection.bulk_write(operations, ordered=False)
+        rewritten += result.modified_count
+        if result.matched_count == len(operations):
+            break
+
+    if rewritten:
+        await bump_tasks_version(user_id)
+    return rewritten
+
+async def rebalance_long_ranks() -> int:
+    """
+    Re-space the ranks of every user with a key over RANK_MAX_LENGTH
+    Called by the background scheduler
+
+    Returns:
+        Number of users rebalanced
+    """
+    tasks_collection = get_collection("tasks")
+    user_ids = await tasks_collection.distinct(
+        "user_id",
+        {"$expr": {"$gt": [{"$strLenCP": {"$ifNull": ["$rank", ""]}}, RANK_MAX_LENGTH]}}
+    )
+    for user_id in user_ids:
+        await rebalance_user_ranks(user_id)
+    return len(user_ids)
+
+async def backfill_missing_ranks() -> int:
+    """
+    Give tasks created before rank keys existed a rank that keeps their old order
+    (priority, then created_at). Used by the startup migration.
+
+    Returns:
+        Number of users backfilled
+    """
+    tasks_collection = get_collection("tasks")
+    user_ids = await tasks_collection.distinct("user_id", {"rank": {"$exists": False}})
+    for user_id in user_ids:
+        await rebalance_user_ranks(user_id)
+    return len(user_ids)
@@ -0,0 +1,123 @@
+"""
+Refresh Token Service - MongoDB Async
+Issues and rotates long-lived refresh tokens so clients renew access
+tokens without re-sending credentials (and without a bcrypt check)
+
+Tokens are random strings; only their SHA-256 is stored, in the
+refresh_tokens collection (a TTL index drops expired documents). Every
+refresh consumes the presented token and issues a new one in the same
+family. Presenting an already-consumed token means it was copied, so the
+whole family is revoked and the user has to log in again.
+"""
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from bson import ObjectId
+from decouple import config
+from fastapi import HTTPException, status
+
+from core.database import get_collection
+
+REFRESH_TOKEN_EXPIRE_DAYS = config("REFRESH_TOKEN_EXPIRE_DAYS", default=30, cast=int)
+
+def hash_refresh_token(token: str) -> str:
+    """SHA-256 hex digest stored in place of the token"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _invalid_refresh_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+async def issue_refresh_token(user_id: str, family_id: Optional[str] = None) -> str:
+    """
+    Create and store a new refresh token
+
+    Args:
+        user_id: Owner of the token
+        family_id: Rotation family (a new family starts at login)
+
+    Returns:
+        The raw refresh token (only ever returned to the client)
+    """
+    refresh_tokens_collection = get_collection("refresh_tokens")
+    token = secrets.token_urlsafe(32)
+    current_time = datetime.utcnow()
+
+    await refresh_tokens_collection.insert_one({
+        "token_hash": hash_refresh_token(token),
+        "user_id": user_id,
+        "family_id": family_id or str(ObjectId()),
+        "created_at": current_time,
+        "expires_at": current_time + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        "used_at": None,
+        "revoked": False
+    })
+    return token
+
+async def rotate_refresh_token(token: str) -> Tuple[str, str]:
+    """
+    Consume a refresh token and issue its replacement
+
+    Args:
+        token: Raw refresh token presented by the client
+
+    Returns:
+        Tuple of (user_id, new refresh token)
+
+    Raises:
+        HTTPException: 401 if the token is unknown, expired, revoked or reused
+    """
+    refresh_tokens_collection = get_collection("refresh_tokens")
+    token_hash = hash_refresh_token(token)
+    current_time = datetime.utcnow()
+
+    # Consume the token in one conditional write, so two concurrent refreshes can't both succeed
+    consumed = await refresh_tokens_collection.find_one_and_update(
+        {
+            "token_hash": token_hash,
+            "used_at": None,
+            "revoked": False,
+            "expires_at": {"$gt": current_time}
+        },
+        {"$set": {"used_at": current_time}},
+        projection={"user_id": 1, "family_id": 1}
+    )
+    if consumed is None:
+        existing = await refresh_tokens_collection.find_one(
+            {"token_hash": token_hash},
+            {"family_id": 1, "used_at": 1}
+        )
+        if existing and existing.get("used_at") is not None:
+            # Reuse of a rotated token: assume it leaked and end the whole session
+            await revoke_token_family(existing["family_id"])
+        raise _invalid_refresh_token()
+
+    new_token = await issue_refresh_token(consumed["user_id"], consumed["family_id"])
+    return consumed["user_id"], new_token
+
+async def revoke_token_family(family_id: str):
+    """Revoke every refresh token descended from the same login"""
+    refresh_tokens_collection = get_collection("refresh_tokens")
+    await refresh_tokens_collection.update_many(
+        {"family_id": family_id},
+        {"$set": {"revoked": True}}
+    )
+
+async def revoke_refresh_token(token: str):
+    """
+    Log out: revoke the presented token's family (unknown tokens are ignored)
+
+    Args:
+        token: Raw refresh token
+    """
+    refresh_tokens_collection = get_collection("refresh_tokens")
+    existing = await refresh_tokens_collection.find_one(
+        {"token_hash": hash_refresh_token(token)},
+        {"family_id": 1}
+    )
+    if existing:
+        await revoke_token_family(existing["family_id"])
@@ -0,0 +1,160 @@
+"""
+User Stats Service - MongoDB Async
+Gamification counters, kept apart from the user's identity document
+
+The users document is read by every authenticated request, while points,
+streaks and the task list version change on every completion or task edit.
+They live in the user_stats collection instead (one document per user,
+_id = the user's id string), so auth reads touch a small document that
+rarely changes and counter writes don't contend with them.
+
+    total_points, completed_tasks, failed_tasks    points_manager
+    current_streak, last_active_date, timezone     streak_manager
+    recent_event_ids                               outbox redelivery guard
+    tasks_version                                  task list ETags
+    stats_updated_at                               change feed watermark
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+from pymongo import UpdateOne
+
+from core.database import get_collection
+from schemas.user_schema import UserInDB, UserOut
+
+# Public counters and their values for a new user
+STATS_DEFAULTS = {
+    "total_points": 0,
+    "current_streak": 0,
+    "last_active_date": None,
+    "completed_tasks": 0,
+    "failed_tasks": 0
+}
+
+def new_user_stats(user_id: str, timezone: str = "UTC") -> Dict:
+    """
+    Build the stats document for a new user
+
+    Args:
+        user_id: User ID
+        timezone: The user's IANA timezone (streak days follow it)
+
+    Returns:
+        user_stats document
+    """
+    return {
+        "_id": user_id,
+        **STATS_DEFAULTS,
+        "timezone": timezone,
+        "tasks_version": 0,
+        "recent_event_ids": [],
+        "stats_updated_at": datetime.utcnow()
+    }
+
+def upserting(update: Dict) -> Dict:
+    """
+    Make a user_stats update safe to run with upsert=True
+
+    Counter writes never assume the stats document exists (a signup can fail
+    between its two inserts): a missing document is created with the new-user
+    defaults for every field the update doesn't set itself.
+
+    Args:
+        update: Update document with operators ($inc, $set, $push, ...)
+
+    Returns:
+        The update with a matching $setOnInsert
+    """
+    touched = {field for fields in update.values() for field in fields}
+    defaults = new_user_stats("")
+    del defaults["_id"]
+    return {**update, "$setOnInsert": {field: value for field, value in defaults.items() if field not in touched}}
+
+async def create_user_stats(user_id: str, timezone: str = "UTC", session=None):
+    """Insert the stats document for a newly signed-up user"""
+    stats_collection = get_collection("user_stats")
+    await stats_collection.insert_one(new_user_stats(user_id, timezone), session=session)
+
+async def get_user_stats(user_id: str) -> Dict:
+    """
+    Get a user's public counters
+
+    Args:
+        user_id: User ID
+
+    Returns:
+        Dictionary with the STATS_DEFAULTS fields
+    """
+    stats_collection = get_collection("user_stats")
+    stats = await stats_collection.find_one({"_id": user_id}, {field: 1 for field in STATS_DEFAULTS})
+    return {field: (stats or {}).get(field, default) for field, default in STATS_DEFAULTS.items()}
+
+async def get_stats_for_users(user_ids: List[str], workload: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Get the public counters of many users with one query
+
+    Args:
+        user_ids: User IDs
+        workload: Read workload for read routing (see core.database)
+
+    Returns:
+        Mapping of user_id to counters (users without stats get the defaults)
+    """
+    stats_collection = get_collection("user_stats", workload=workload)
+    found = {}
+    async for stats in stats_collection.find({"_id": {"$in": user_ids}}, {field: 1 for field in STATS_DEFAULTS}):
+        found[stats["_id"]] = stats
+    return {
+        user_id: {field: found.get(user_id, {}).get(field, default) for field, default in STATS_DEFAULTS.items()}
+        for user_id in user_ids
+    }
+
+async def with_stats(user: Union[UserInDB, UserOut]) -> UserOut:
+    """
+    Combine an identity model with the user's counters
+
+    Args:
+        user: User from the auth dependency
+
+    Returns:
+        UserOut including points and streak
+    """
+    return UserOut(**{**user.model_dump(), **await get_user_stats(user.id)})
+
+async def get_tasks_version(user_id: str) -> int:
+    """
+    Get the version of a user's task list (bumped by every task mutation)
+
+    Args:
+        user_id: User ID
+
+    Returns:
+        Current version
+    """
+    stats_collection = get_collection("user_stats")
+    stats = await stats_collection.find_one({"_id": user_id}, {"tasks_version": 1})
+    return (stats or {}).get("tasks_version", 0)
+
+async def bump_tasks_version(user_ids: Union[str, List[str]], session=None):
+    """
+    Invalidate the task list ETags of one or more users
+
+    Args:
+        user_ids: User ID or list of user IDs
+        session: Optional transaction session
+    """
+    stats_collection = get_collection("user_stats")
+    update = upserting({"$inc": {"tasks_version": 1}})
+    if isinstance(user_ids, str):
+        await stats_collection.update_one({"_id": user_ids}, update, upsert=True, session=session)
+    elif user_ids:
+        # One upsert per user (update_many would create at most one missing document)
+        await stats_collection.bulk_write(
+            [UpdateOne({"_id": user_id}, update, upsert=True) for user_id in user_ids],
+            ordered=False,
+            session=session
+        )
+
+async def set_stats_timezone(user_id: str, timezone: str):
+    """Copy a user's new timezone to their stats (streak updates read it there)"""
+    stats_collection = get_collection("user_stats")
+    await stats_collection.update_one({"_id": user_id}, upserting({"$set": {"timezone": timezone}}), upsert=True)
@@ -1,75 +1,193 @@
 """
 Streak Manager Service - MongoDB Async
 Handles user streak calculations and updates
+
+Streaks follow each user's own calendar day (the timezone copied to
+user_stats, an IANA name, defaulting to UTC). last_active_date stores the user's local day as a
+midnight datetime. Completions update the streak with one atomic
+aggregation-pipeline update, and broken streaks are zeroed in bulk with one
+update_many per timezone (then copied to group snapshots and memberships).
 """
 from datetime import date, datetime, timedelta
-from bson import ObjectId
+from typing import Optional
+from zoneinfo import ZoneInfo
+from pymongo import ReturnDocument
+
 from core.database import get_collection
+from services.group_snapshot import reset_member_streaks, sync_grouped_member_stats
+
+DEFAULT_TIMEZONE = "UTC"
+
+def get_local_today(timezone: Optional[str] = None, current_time: Optional[datetime] = None) -> date:
+    """
+    Get today's date in the given timezone
+
+    Args:
+        timezone: IANA timezone name (defaults to UTC)
+        current_time: Current UTC datetime (defaults to now)
+
+    Returns:
+        The local calendar date
+    """
+    if current_time is None:
+        current_time = datetime.utcnow()
+    utc_time = current_time.replace(tzinfo=ZoneInfo("UTC"))
+    return utc_time.astimezone(ZoneInfo(timezone or DEFAULT_TIMEZONE)).date()
+
+def to_local_time(utc_time: datetime, timezone: Optional[str] = None) -> datetime:
+    """
+    Convert a naive UTC datetime to the user's local (naive) wall-clock time
 
-async def update_user_streak(user_id: str):
+    Args:
+        utc_time: Naive UTC datetime
+        timezone: IANA timezone name (defaults to UTC)
+
+    Returns:
+        Naive local datetime
+    """
+    local_time = utc_time.replace(tzinfo=ZoneInfo("UTC")).astimezone(ZoneInfo(timezone or DEFAULT_TIMEZONE))
+    return local_time.replace(tzinfo=None)
+
+def _local_day_expression(activity_time: Optional[datetime] = None) -> dict:
+    """
+    Aggregation expression for the user's local day as a midnight datetime
+
+    Args:
+        activity_time: UTC time of the activity (defaults to the server's $$NOW)
+    """
+    return {
+        "$dateFromString": {
+            "dateString": {
+                "$dateToString": {
+                    "format": "%Y-%m-%d",
+                    "date": {"$literal": activity_time} if activity_time else "$$NOW",
+                    "timezone": {"$ifNull": ["$timezone", DEFAULT_TIMEZONE]}
+                }
+            },
+            "format": "%Y-%m-%d"
+        }
+    }
+
+async def update_user_streak(user_id: str, activity_time: Optional[datetime] = None):
     """
     Update user's daily streak based on last active date
-    
+
+    Runs as a single pipeline update, so concurrent completions can't
+    read-modify-write over each other. The day is the local day of the
+    activity itself, so an event applied late (consumer lag, retries)
+    still counts for the day it happened:
+    - active the day before (local day): streak + 1
+    - already active that day or later: streak unchanged
+    - otherwise: streak restarts at 1
+
     Args:
         user_id: User ID
-    
+        activity_time: UTC time of the completion (defaults to now)
+
     Returns:
         Updated streak count
     """
-    users_collection = get_collection("users")
-    
-    # Get current user
-    user = await users_collection.find_one({"_id": ObjectId(user_id)})
-    if not user:
+    stats_collection = get_collection("user_stats")
+    one_day_ms = 24 * 60 * 60 * 1000
+
+    updated_stats = await stats_collection.find_one_and_update(
+        {"_id": user_id},
+        [
+            {"$set": {"_activity_day": _local_day_expression(activity_time)}},
+            {"$set": {
+                "current_streak": {
+                    "$switch": {
+                        "branches": [
+                            {
+                                # Same day, or a late event for a day before the last credited one
+                                "case": {"$gte": ["$last_active_date", "$_activity_day"]},
+                                "then": {"$max": [{"$ifNull": ["$current_streak", 0]}, 1]}
+                            },
+                            {
+                                "case": {"$eq": ["$last_active_date", {"$subtract": ["$_activity_day", one_day_ms]}]},
+                                "then": {"$add": [{"$ifNull": ["$current_streak", 0]}, 1]}
+                            }
+                        ],
+                        "default": 1
+                    }
+                },
+                "last_active_date": {"$max": ["$last_active_date", "$_activity_day"]},
+                "stats_updated_at": "$$NOW"
+            }},
+            {"$unset": "_activity_day"}
+        ],
+        projection={"current_streak": 1},
+        return_document=ReturnDocument.AFTER,
+        # A missing stats document starts here (readers default the other counters)
+        upsert=True
+    )
+    if not updated_stats:
         return 0
-    
-    today = date.today()
-    last_active = user.get("last_active_date")
-    
-    # Convert datetime to date if needed
-    if last_active is None:
-        last_active_date = None
-    elif isinstance(last_active, date):
-        last_active_date = last_active
-    elif isinstance(last_active, datetime):
-        last_active_date = last_active.date()
-    else:
-        # Handle string or other formats
+
+    new_streak = updated_stats.get("current_streak", 0)
+
+    # Group snapshots only exist for users who are in a group
+    await sync_grouped_member_stats(user_id, current_streak=new_streak)
+
+    return new_streak
+
+async def decay_broken_streaks(current_time: Optional[datetime] = None) -> int:
+    """
+    Zero the streak of every user who missed a full local day
+    One update_many per timezone bucket; safe to run repeatedly
+
+    Args:
+        current_time: Current UTC datetime (defaults to now)
+
+    Returns:
+        Number of streaks reset
+    """
+    stats_collection = get_collection("user_stats")
+    if current_time is None:
+        current_time = datetime.utcnow()
+
+    timezones = await stats_collection.distinct("timezone", {"current_streak": {"$gt": 0}})
+    timezones = {timezone or DEFAULT_TIMEZONE for timezone in timezones} | {DEFAULT_TIMEZONE}
+
+    total_reset = 0
+    for timezone in timezones:
         try:
-            if isinstance(last_active, str):
-                last_active_date = datetime.fromisoformat(last_active).date()
-            else:
-                last_active_date = None
-        except:
-            last_active_date = None
-    
-    # Calculate new streak
-    if last_active_date:
-        if last_active_date == today - timedelta(days=1):
-            # Consecutive day: increment streak
-            new_streak = user.get("current_streak", 0) + 1
-        elif last_active_date == today:
-            # Already updated today: keep current streak
-            new_streak = user.get("current_streak", 0)
+            local_today = get_local_today(timezone, current_time)
+        except Exception:
+            # Skip unknown timezone names rather than failing the whole run
+            continue
+        # A streak survives only if the user was active yesterday or today (local)
+        local_yesterday = datetime.combine(local_today - timedelta(days=1), datetime.min.time())
+
+        if timezone == DEFAULT_TIMEZONE:
+            timezone_filter = {"$in": [DEFAULT_TIMEZONE, None]}
         else:
-            # Gap detected: reset streak to 1
-            new_streak = 1
-    else:
-        # First time: start streak at 1
-        new_streak = 1
-    
-    # Update user with new streak and last_active_date (store as datetime for MongoDB)
-    today_datetime = datetime.combine(today, datetime.min.time())
-    
-    await users_collection.update_one(
-        {"_id": ObjectId(user_id)},
-        {
-            "$set": {
-                "current_streak": new_streak,
-                "last_active_date": today_datetime
-            }
+            timezone_filter = timezone
+
+        broken_filter = {
+            "timezone": timezone_filter,
+            "current_streak": {"$gt": 0},
+            "$or": [
+                {"last_active_date": {"$lt": local_yesterday}},
+                {"last_active_date": None}
+            ]
         }
-    )
-    
-    return new_streak
+        # Collect the IDs first so the reset can be propagated to groups
+        broken_ids = [stats["_id"] async for stats in stats_collection.find(broken_filter, {"_id": 1})]
+        if not broken_ids:
+            continue
+
+        result = await stats_collection.update_many(
+            {**broken_filter, "_id": {"$in": broken_ids}},
+            {"$set": {"current_streak": 0, "stats_updated_at": current_time}}
+        )
+        total_reset += result.modified_count
+
+        # Skip anyone who completed a task in between (their streak is live again)
+        reset_ids = [
+            stats["_id"]
+            async for stats in stats_collection.find({"_id": {"$in": broken_ids}, "current_streak": 0}, {"_id": 1})
+        ]
+        await reset_member_streaks(reset_ids)
 
+    return total_reset
@@ -2,16 +2,39 @@
 Task Service - Business logic for task operations
 Handles CRUD operations and task management
 """
-from typing import Optional
+import os
+from typing import Dict, List, Optional, Tuple
+from decouple import config
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
 from fastapi import HTTPException, status
+from pymongo import ReturnDocument, UpdateOne
 
-from core.database import get_collection
+from core.database import get_collection, start_transaction
+from core.indexes import TASK_TOMBSTONE_RETENTION_DAYS
 from core.task_reset import calculate_next_reset
-from schemas.task_schema import TaskOut, TaskStatus
+from schemas.task_schema import TaskChangesOut, TaskMove, TaskOut, TaskStatus
+from services.event_outbox import (
+    EVENT_OUTBOX_ENABLED,
+    EVENT_TASK_COMPLETED,
+    EVENT_TASK_SKIPPED,
+    process_event,
+    publish_task_event
+)
+from services.ranking import rank_between, rank_for_new_task, rebalance_user_ranks
+from services.stats_service import bump_tasks_version
 
 VALID_CATEGORIES = ["daily", "weekly", "weekend", "monthly"]
+# Statuses a task can be completed or skipped from
+OPEN_TASK_STATUSES = [TaskStatus.PENDING.value, TaskStatus.IN_PROGRESS.value]
+UPLOADS_DIR = "uploads"
+# Maximum tasks returned per /tasks/changes page
+TASK_CHANGES_PAGE_SIZE = config("TASK_CHANGES_PAGE_SIZE", default=500, cast=int)
+# Writes can land slightly after their updated_at (and worker clocks drift),
+# so sync tokens never move past now minus this window
+TASK_CHANGES_SAFETY_SECONDS = config("TASK_CHANGES_SAFETY_SECONDS", default=5, cast=int)
+# Lowest possible ObjectId, used for tokens that start at a timestamp boundary
+_MIN_OBJECT_ID = "0" * 24
 
 def validate_category(category: str):
     """Validate task category"""
@@ -61,10 +84,14 @@ async def create_task(
         "created_at": current_time,
         "updated_at": current_time,
         "next_reset": next_reset,
-        "proof_url": None
+        "proof_url": None,
+        "version": 1,
+        # Last among the user's tasks with the same priority
+        "rank": await rank_for_new_task(user_id, priority)
     }
     
     result = await tasks_collection.insert_one(task_doc)
+    await bump_tasks_version(user_id)
     task_doc["id"] = str(result.inserted_id)
     del task_doc["_id"]
     
@@ -88,17 +115,111 @@ async def get_task_by_id(task_id: str, user_id: str) -> Optional[dict]:
     })
     return task
 
+def task_doc_to_out(task: dict) -> TaskOut:
+    """Convert a task document to TaskOut"""
+    task["id"] = str(task["_id"])
+    del task["_id"]
+    return TaskOut(**task)
+
+async def transition_task_status(
+    task_id: str,
+    user_id: str,
+    new_status: str,
+    current_time: datetime,
+    session=None
+) -> Tuple[dict, bool]:
+    """
+    Atomically move an open (pending or in-progress) task into a closed status
+    
+    The ownership check and the source-status guard are part of one
+    conditional find_one_and_update: a retried request finds the task already
+    in new_status and short-circuits instead of repeating side effects, and a
+    closed task can't be moved to another closed status (only the reset
+    engine reopens it), so completion points are awarded once per cycle.
+    
+    Args:
+        task_id: Task ID
+        user_id: User ID for verification
+        new_status: Target status value
+        current_time: Timestamp for updated_at
+        session: Optional transaction session
+    
+    Returns:
+        Tuple of (task document after the call, whether this call changed it)
+    
+    Raises:
+        HTTPException: 404 if the task doesn't exist, 409 if it is already
+            closed with a different status
+    """
+    tasks_collection = get_collection("tasks")
+    updated_task = await tasks_collection.find_one_and_update(
+        {"_id": ObjectId(task_id), "user_id": user_id, "status": {"$in": OPEN_TASK_STATUSES}},
+        {"$set": {"status": new_status, "updated_at": current_time}, "$inc": {"version": 1}},
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+    if updated_task is not None:
+        return updated_task, True
+    
+    # Either the task doesn't exist / isn't ours, or it's already closed
+    task = await tasks_collection.find_one({"_id": ObjectId(task_id), "user_id": user_id}, session=session)
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found or access denied"
+        )
+    if task.get("status") != new_status:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Task is already {task.get('status')} until its next reset"
+        )
+    return task, False
+
+async def _transition_and_publish(
+    task_id: str,
+    user_id: str,
+    new_status: str,
+    event_type: str
+) -> dict:
+    """
+    Change a task's status and record the matching outbox event
+    
+    Both writes share a transaction when MONGODB_TRANSACTIONS is on. The
+    gamification side effects are applied by the outbox consumers, or
+    inline when EVENT_OUTBOX_ENABLED is off.
+    
+    Returns:
+        Tuple of (task document after the call, whether this call changed it)
+    """
+    current_time = datetime.utcnow()
+    event = None
+    async with start_transaction() as session:
+        task, changed = await transition_task_status(task_id, user_id, new_status, current_time, session)
+        if changed:
+            event = await publish_task_event(event_type, task, current_time, session)
+            await bump_tasks_version(user_id, session)
+    
+    if event is not None and not EVENT_OUTBOX_ENABLED:
+        await process_event(event)
+    return task, event is not None
+
 async def update_task(
     task_id: str,
     user_id: str,
     title: Optional[str] = None,
     description: Optional[str] = None,
     category: Optional[str] = None,
-    priority: Optional[int] = None
+    priority: Optional[int] = None,
+    expected_version: Optional[int] = None
 ) -> TaskOut:
     """
     Update a task
     
+    Ownership check, optional version check and update are one
+    find_one_and_update returning the updated task. Every update bumps the
+    task's version. A priority change also looks up the last rank of the
+    new priority group, so the task moves to its end.
+    
     Args:
         task_id: Task ID
         user_id: User ID for verification
@@ -106,18 +227,14 @@ async def update_task(
         description: Optional new description
         category: Optional new category
         priority: Optional new priority
+        expected_version: Only update if the task is still at this version (If-Match)
     
     Returns:
         Updated TaskOut object
-    """
-    # Verify task exists and belongs to user
-    task = await get_task_by_id(task_id, user_id)
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found or access denied"
-        )
     
+    Raises:
+        HTTPException: 404 if the task doesn't exist, 409 if its version moved on
+    """
     # Validate category if provided
     if category is not None:
         validate_category(category)
@@ -134,25 +251,54 @@ async def update_task(
         update_data["category"] = category
         # Recalculate next_reset if category changed
         update_data["next_reset"] = calculate_next_reset(category)
-    if priority is not None:
-        update_data["priority"] = priority
     
-    if update_data:
-        await tasks_collection.update_one(
-            {"_id": ObjectId(task_id)},
-            {"$set": update_data}
+    task_filter = {"_id": ObjectId(task_id), "user_id": user_id}
+    if expected_version is not None:
+        task_filter["version"] = expected_version
+    
+    if priority is None:
+        update = {"$set": update_data, "$inc": {"version": 1}}
+    else:
+        # Pipeline update, so the task isn't read first: moving to another
+        # priority group puts it last there, keeping its priority keeps its rank
+        new_rank = await rank_for_new_task(user_id, priority)
+        fields = {key: {"$literal": value} for key, value in update_data.items()}
+        fields["priority"] = {"$literal": priority}
+        fields["rank"] = {"$cond": [{"$eq": ["$priority", priority]}, "$rank", new_rank]}
+        fields["version"] = {"$add": [{"$ifNull": ["$version", 0]}, 1]}
+        update = [{"$set": fields}]
+    
+    updated_task = await tasks_collection.find_one_and_update(
+        task_filter,
+        update,
+        return_document=ReturnDocument.AFTER
+    )
+    if updated_task is None:
+        # Only the failure path pays for a second lookup, to tell 404 from 409
+        current = await get_task_by_id(task_id, user_id)
+        if not current:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Task not found or access denied"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Task was modified (current version {current.get('version', 1)}), reload and retry"
         )
+    await bump_tasks_version(user_id)
     
-    # Return updated task
-    updated_task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
-    updated_task["id"] = str(updated_task["_id"])
-    del updated_task["_id"]
-    
-    return TaskOut(**updated_task)
+    return task_doc_to_out(updated_task)
 
 async def complete_task(task_id: str, user_id: str) -> TaskOut:
     """
-    Mark a task as completed and update gamification metrics
+    Mark a task as completed and queue its gamification updates
+    
+    Logging, the AI profile, points and the streak are applied from the
+    task_events outbox (see services.event_outbox), so the request only
+    pays for the status change and the event write.
+    
+    Idempotent: completing an already-completed task (e.g. a client retry
+    after a timeout) returns it unchanged without awarding points again.
     
     Args:
         task_id: Task ID
@@ -161,130 +307,212 @@ async def complete_task(task_id: str, user_id: str) -> TaskOut:
     Returns:
         Updated TaskOut object
     """
-    # Verify task exists and belongs to user
-    task = await get_task_by_id(task_id, user_id)
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found or access denied"
-        )
-    
-    tasks_collection = get_collection("tasks")
-    task_logs_collection = get_collection("task_logs")
-    current_time = datetime.utcnow()
+    task, _ = await _transition_and_publish(task_id, user_id, TaskStatus.COMPLETED.value, EVENT_TASK_COMPLETED)
+    return task_doc_to_out(task)
+
+async def skip_task(task_id: str, user_id: str) -> TaskOut:
+    """
+    Mark a task as skipped and queue its log entry and penalty
     
-    # Get task category before update
-    task_category = task.get("category", "daily")
+    Idempotent: skipping an already-skipped task returns it unchanged
+    without applying the penalty again.
     
-    # Mark as completed and update timestamp
-    await tasks_collection.update_one(
-        {"_id": ObjectId(task_id)},
-        {"$set": {"status": TaskStatus.COMPLETED.value, "updated_at": current_time}}
-    )
+    Args:
+        task_id: Task ID
+        user_id: User ID for verification
     
-    # --- NEW LOGGING LOGIC ---
-    # Create a log entry for this completion
-    log_entry = {
-        "user_id": user_id,
-        "task_id": task_id,
-        "status": TaskStatus.COMPLETED.value,
-        "category": task_category,
-        "timestamp": current_time
-    }
-    await task_logs_collection.insert_one(log_entry)
-    # --- END NEW LOGGING LOGIC ---
-    
-    # --- GAMIFICATION LOGIC ---
-    from services.points_manager import update_points_for_task
-    from services.streak_manager import update_user_streak
-    
-    # Get task value (default to 10 if not set)
-    task_value = task.get("value", 10)
-    has_proof = bool(task.get("proof_url"))
-    
-    # 1. Update points based on the task
-    await update_points_for_task(
-        user_id=user_id,
-        task_value=task_value,
-        task_category=task_category,
-        has_proof=has_proof,
-        completed=True
+    Returns:
+        Updated TaskOut object
+    """
+    task, _ = await _transition_and_publish(task_id, user_id, TaskStatus.SKIPPED.value, EVENT_TASK_SKIPPED)
+    return task_doc_to_out(task)
+
+def _is_rank_tie(before: Optional[dict], after: Optional[dict]) -> bool:
+    """Whether two neighbours share a rank key, leaving no room between them"""
+    return (
+        before is not None
+        and after is not None
+        and before["priority"] == after["priority"]
+        and before.get("rank") == after.get("rank")
     )
+
+async def _adjacent_task(
+    user_id: str,
+    neighbour: dict,
+    below: bool,
+    tasks: Dict[str, dict],
+    moved_ids: List[str],
+    task_id: str
+) -> Optional[dict]:
+    """
+    Nearest task directly below (or above) a neighbour in its priority group
     
-    # 2. Update the user's daily streak
-    await update_user_streak(user_id=user_id)
-    # --- END GAMIFICATION LOGIC ---
+    Tasks already moved in this batch are taken from their in-memory
+    position rather than the database; the task being moved is skipped.
     
-    # Return updated task
-    updated_task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
-    updated_task["id"] = str(updated_task["_id"])
-    del updated_task["_id"]
+    Args:
+        user_id: User ID
+        neighbour: Task whose adjacent task to find
+        below: Look below the neighbour (higher ranks) instead of above
+        tasks: Loaded tasks by ID, with positions from earlier moves
+        moved_ids: IDs of tasks already moved in this batch
+        task_id: ID of the task being moved
     
-    return TaskOut(**updated_task)
+    Returns:
+        Dict with the adjacent task's priority and rank, or None at the group's edge
+    """
+    rank = neighbour.get("rank")
+    if rank is None:
+        return None
+    operator, direction = ("$gt", 1) if below else ("$lt", -1)
+    
+    skipped_ids = set(moved_ids) | {task_id}
+    stored = await get_collection("tasks").find_one(
+        {
+            "user_id": user_id,
+            "priority": neighbour["priority"],
+            "rank": {operator: rank},
+            "_id": {"$nin": [ObjectId(skipped_id) for skipped_id in skipped_ids]}
+        },
+        {"priority": 1, "rank": 1},
+        sort=[("rank", direction)]
+    )
+    candidates = [stored] if stored else []
+    candidates.extend(
+        tasks[moved_id] for moved_id in moved_ids
+        if moved_id != task_id
+        and tasks[moved_id]["priority"] == neighbour["priority"]
+        and (tasks[moved_id]["rank"] > rank if below else tasks[moved_id]["rank"] < rank)
+    )
+    if not candidates:
+        return None
+    nearest = (min if below else max)(candidates, key=lambda task: task["rank"])
+    return {"priority": nearest["priority"], "rank": nearest["rank"]}
 
-async def skip_task(task_id: str, user_id: str) -> TaskOut:
+def _position_between(before: Optional[dict], after: Optional[dict]) -> Tuple[int, str]:
     """
-    Mark a task as skipped and log it
+    Priority and rank that place a task between two neighbours
     
     Args:
-        task_id: Task ID
-        user_id: User ID for verification
+        before: Task directly above the new position (None: top)
+        after: Task directly below the new position (None: bottom)
     
     Returns:
-        Updated TaskOut object
+        Tuple of (priority, rank)
     """
-    # Verify task exists and belongs to user
-    task = await get_task_by_id(task_id, user_id)
-    if not task:
+    if before is None and after is None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found or access denied"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A move needs before_id and/or after_id"
         )
+    if before is None:
+        return after["priority"], rank_between(None, after.get("rank"))
+    if after is None or after["priority"] != before["priority"]:
+        # before is the last task of its priority: go right after it
+        return before["priority"], rank_between(before.get("rank"), None)
+    try:
+        return before["priority"], rank_between(before.get("rank"), after.get("rank"))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="before_id must come before after_id"
+        )
+
+async def reorder_tasks(user_id: str, moves: List[TaskMove]) -> List[TaskOut]:
+    """
+    Move tasks to new positions in the user's list
     
-    tasks_collection = get_collection("tasks")
-    task_logs_collection = get_collection("task_logs")
-    current_time = datetime.utcnow()
+    Each move rewrites only the moved task (its rank, and its priority if it
+    crossed into another priority group). All referenced tasks are loaded with
+    one query and the moves are written with one bulk_write; later moves in
+    the batch see the positions produced by earlier ones.
     
-    # Get task category before update
-    task_category = task.get("category", "daily")
+    Args:
+        user_id: User ID
+        moves: Moves to apply, in order
     
-    # Mark as skipped and update timestamp
-    await tasks_collection.update_one(
-        {"_id": ObjectId(task_id)},
-        {"$set": {"status": TaskStatus.SKIPPED.value, "updated_at": current_time}}
-    )
+    Returns:
+        The moved tasks after the update
     
-    # --- LOGGING LOGIC ---
-    # Create a log entry for this skip
-    log_entry = {
-        "user_id": user_id,
-        "task_id": task_id,
-        "status": TaskStatus.SKIPPED.value,
-        "category": task_category,
-        "timestamp": current_time
-    }
-    await task_logs_collection.insert_one(log_entry)
-    # --- END LOGGING LOGIC ---
-    
-    # Optional: Apply penalty for skipping (from points_manager)
-    from services.points_manager import update_points_for_task
-    task_value = task.get("value", 10)
-    
-    # Apply penalty by marking as not completed
-    await update_points_for_task(
-        user_id=user_id,
-        task_value=task_value,
-        task_category=task_category,
-        has_proof=False,
-        completed=False  # This will apply penalty
-    )
+    Raises:
+        HTTPException: 400 for invalid moves, 404 for unknown tasks, 409 if
+            a moved task changed while the moves were applied
+    """
+    tasks_collection = get_collection("tasks")
     
-    # Return updated task
-    updated_task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
-    updated_task["id"] = str(updated_task["_id"])
-    del updated_task["_id"]
+    referenced_ids = set()
+    for move in moves:
+        referenced_ids.update(task_id for task_id in (move.task_id, move.before_id, move.after_id) if task_id)
+    if not all(ObjectId.is_valid(task_id) for task_id in referenced_ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid task ID")
+    
+    for attempt in range(2):
+        cursor = tasks_collection.find({
+            "_id": {"$in": [ObjectId(task_id) for task_id in referenced_ids]},
+            "user_id": user_id
+        })
+        tasks = {str(task["_id"]): task async for task in cursor}
+        missing = referenced_ids - tasks.keys()
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Task not found or access denied"
+            )
+        tied = any(
+            _is_rank_tie(tasks.get(move.before_id), tasks.get(move.after_id))
+            for move in moves
+        )
+        if not tied or attempt:
+            break
+        # Concurrent inserts left equal keys: re-space them, then reload the neighbours
+        await rebalance_user_ranks(user_id)
+    
+    current_time = datetime.utcnow()
+    moved_ids = []
+    for move in moves:
+        before = tasks[move.before_id] if move.before_id else None
+        after = tasks[move.after_id] if move.after_id else None
+        if move.task_id in (move.before_id, move.after_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="A task cannot be its own neighbour"
+            )
+        # With a single neighbour, the task on its other side bounds the new rank
+        if before is not None and (after is None or after["priority"] != before["priority"]):
+            after = await _adjacent_task(user_id, before, True, tasks, moved_ids, move.task_id)
+        elif before is None and after is not None:
+            before = await _adjacent_task(user_id, after, False, tasks, moved_ids, move.task_id)
+        priority, rank = _position_between(before, after)
+        tasks[move.task_id].update({"priority": priority, "rank": rank, "updated_at": current_time})
+        if move.task_id not in moved_ids:
+            moved_ids.append(move.task_id)
+    
+    # One write per moved task, however many times it moved in the batch,
+    # guarded by the version read (a concurrent rebalance rewrites every key)
+    result = await tasks_collection.bulk_write([
+        UpdateOne(
+            {"_id": tasks[task_id]["_id"], "user_id": user_id, "version": tasks[task_id].get("version", 1)},
+            {
+                "$set": {
+                    "priority": tasks[task_id]["priority"],
+                    "rank": tasks[task_id]["rank"],
+                    "updated_at": current_time
+                },
+                "$inc": {"version": 1}
+            }
+        )
+        for task_id in moved_ids
+    ], ordered=False)
+    await bump_tasks_version(user_id)
+    if result.matched_count < len(moved_ids):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Tasks were modified concurrently, reload and retry"
+        )
+    for task_id in moved_ids:
+        tasks[task_id]["version"] = tasks[task_id].get("version", 1) + 1
     
-    return TaskOut(**updated_task)
+    return [task_doc_to_out(tasks[task_id]) for task_id in moved_ids]
 
 async def delete_task(task_id: str, user_id: str):
     """
@@ -306,14 +534,18 @@ async def delete_task(task_id: str, user_id: str):
     
     # Delete proof file if exists
     if task.get("proof_url"):
-        import os
-        UPLOADS_DIR = "uploads"
         proof_path = task["proof_url"].replace("/uploads/", UPLOADS_DIR + "/")
         if os.path.exists(proof_path):
             os.remove(proof_path)
     
-    # Delete task
+    # Delete task, leaving a tombstone for delta sync clients
     await tasks_collection.delete_one({"_id": ObjectId(task_id)})
+    await get_collection("task_tombstones").insert_one({
+        "task_id": task_id,
+        "user_id": user_id,
+        "deleted_at": datetime.utcnow()
+    })
+    await bump_tasks_version(user_id)
 
 async def upload_task_proof(
     task_id: str,
@@ -341,10 +573,6 @@ async def upload_task_proof(
             detail="Task not found or access denied"
         )
     
-    import os
-    import shutil
-    UPLOADS_DIR = "uploads"
-    
     # Save file
     file_path = f"{UPLOADS_DIR}/{task_id}_{filename}"
     with open(file_path, "wb") as buffer:
@@ -356,13 +584,88 @@ async def upload_task_proof(
     tasks_collection = get_collection("tasks")
     await tasks_collection.update_one(
         {"_id": ObjectId(task_id)},
-        {"$set": {"proof_url": proof_url}}
+        {"$set": {"proof_url": proof_url, "updated_at": datetime.utcnow()}, "$inc": {"version": 1}}
     )
+    await bump_tasks_version(user_id)
     
     # Return updated task
     updated_task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
-    updated_task["id"] = str(updated_task["_id"])
-    del updated_task["_id"]
-    
-    return TaskOut(**updated_task)
+    return task_doc_to_out(updated_task)
 
+def encode_sync_token(timestamp: datetime, last_id: str = _MIN_OBJECT_ID) -> str:
+    """Encode a delta sync position: milliseconds since the epoch plus a tiebreak task ID"""
+    epoch_ms = int((timestamp - datetime(1970, 1, 1)).total_seconds() * 1000)
+    return f"{epoch_ms}_{last_id}"
+
+def decode_sync_token(token: str) -> Tuple[datetime, ObjectId]:
+    """Decode a token from encode_sync_token (400 if malformed)"""
+    try:
+        epoch_ms, last_id = token.split("_", 1)
+        timestamp = datetime(1970, 1, 1) + timedelta(milliseconds=int(epoch_ms))
+        return timestamp, ObjectId(last_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token"
+        )
+
+async def get_task_changes(user_id: str, since: Optional[str] = None) -> TaskChangesOut:
+    """
+    Get the tasks changed and deleted since a sync token
+    
+    Tasks are read in (updated_at, _id) order from the position in the token,
+    so a page costs O(changes) through the (user_id, updated_at, _id) index.
+    Deletes come from task_tombstones. Clients apply results as upserts by
+    ID; a task near the token boundary can be sent twice.
+    
+    Args:
+        user_id: User ID
+        since: Token from a previous call's next_since (None: everything)
+    
+    Returns:
+        TaskChangesOut with changed tasks, deleted task IDs, the next token
+        and whether more changes are waiting
+    """
+    tasks_collection = get_collection("tasks")
+    tombstones_collection = get_collection("task_tombstones")
+    current_time = datetime.utcnow()
+    
+    query = {"user_id": user_id}
+    deleted = []
+    if since is not None:
+        since_time, since_id = decode_sync_token(since)
+        if since_time < current_time - timedelta(days=TASK_TOMBSTONE_RETENTION_DAYS):
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Sync token expired, refetch GET /tasks/"
+            )
+        query["$or"] = [
+            {"updated_at": {"$gt": since_time}},
+            {"updated_at": since_time, "_id": {"$gt": since_id}}
+        ]
+        cursor = tombstones_collection.find(
+            {"user_id": user_id, "deleted_at": {"$gte": since_time}},
+            {"task_id": 1}
+        )
+        deleted = [tombstone["task_id"] async for tombstone in cursor]
+    
+    cursor = tasks_collection.find(query).sort([("updated_at", 1), ("_id", 1)]).limit(TASK_CHANGES_PAGE_SIZE + 1)
+    task_docs = [task_doc async for task_doc in cursor]
+    has_more = len(task_docs) > TASK_CHANGES_PAGE_SIZE
+    task_docs = task_docs[:TASK_CHANGES_PAGE_SIZE]
+    
+    # Resume after the last task returned, but never past the safety window
+    horizon = current_time - timedelta(seconds=TASK_CHANGES_SAFETY_SECONDS)
+    if task_docs and (has_more or task_docs[-1]["updated_at"] <= horizon):
+        next_since = encode_sync_token(task_docs[-1]["updated_at"], str(task_docs[-1]["_id"]))
+    elif since is not None and decode_sync_token(since)[0] > horizon:
+        next_since = since
+    else:
+        next_since = encode_sync_token(horizon)
+    
+    return TaskChangesOut(
+        changed=[task_doc_to_out(task_doc) for task_doc in task_docs],
+        deleted=deleted,
+        next_since=next_since,
+        has_more=has_more
+    )
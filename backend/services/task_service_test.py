@@ -0,0 +1,85 @@
+"""
+Tests for the task lifecycle: status transitions, resets and ordering
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from core.database import Database, get_collection
+from core.task_reset import reset_tasks_for_category
+from schemas.task_schema import TaskMove
+from services.task_service import complete_task, create_task, reorder_tasks, skip_task
+
+@pytest.fixture(autouse=True)
+def mock_database():
+    Database.client = mongomock_motor.AsyncMongoMockClient()
+    yield
+    Database.client = None
+
+async def _make_due(task_id: str):
+    """Move a task's next reset into the past"""
+    from bson import ObjectId
+    await get_collection("tasks").update_one(
+        {"_id": ObjectId(task_id)},
+        {"$set": {"next_reset": datetime.utcnow() - timedelta(minutes=1)}}
+    )
+
+def test_skipped_task_is_reopened_and_can_be_completed():
+    async def scenario():
+        task = await create_task("user-1", "Read", "daily", 1)
+        skipped = await skip_task(task.id, "user-1")
+        assert skipped.status == "skipped"
+
+        await _make_due(task.id)
+        assert await reset_tasks_for_category("daily") == [task.id]
+
+        completed = await complete_task(task.id, "user-1")
+        assert completed.status == "completed"
+
+    asyncio.run(scenario())
+
+def test_tasks_not_yet_due_are_left_closed():
+    async def scenario():
+        task = await create_task("user-1", "Read", "daily", 1)
+        await skip_task(task.id, "user-1")
+
+        assert await reset_tasks_for_category("daily") == []
+
+    asyncio.run(scenario())
+
+async def _ordered_titles(user_id: str):
+    """The user's task titles in list order"""
+    cursor = get_collection("tasks").find({"user_id": user_id}).sort([("priority", 1), ("rank", 1)])
+    return [task["title"] async for task in cursor]
+
+def test_move_after_a_task_lands_before_its_next_neighbour():
+    async def scenario():
+        a = await create_task("user-1", "a", "daily", 1)
+        b = await create_task("user-1", "b", "daily", 1)
+        await create_task("user-1", "c", "daily", 1)
+        d = await create_task("user-1", "d", "daily", 1)
+
+        await reorder_tasks("user-1", [TaskMove(task_id=d.id, before_id=a.id)])
+        assert await _ordered_titles("user-1") == ["a", "d", "b", "c"]
+
+        await reorder_tasks("user-1", [TaskMove(task_id=a.id, after_id=b.id)])
+        assert await _ordered_titles("user-1") == ["d", "a", "b", "c"]
+
+    asyncio.run(scenario())
+
+def test_later_moves_see_earlier_moves_in_the_batch():
+    async def scenario():
+        a = await create_task("user-1", "a", "daily", 1)
+        b = await create_task("user-1", "b", "daily", 1)
+        c = await create_task("user-1", "c", "daily", 1)
+
+        await reorder_tasks("user-1", [
+            TaskMove(task_id=c.id, before_id=a.id),
+            TaskMove(task_id=b.id, before_id=a.id)
+        ])
+        assert await _ordered_titles("user-1") == ["a", "b", "c"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,81 @@
+"""
+Task Stream Service
+Pushes a user's task changes to their open /tasks/stream connections
+
+Each connection gets a bounded queue of (event, payload) items:
+
+    created / updated   full task (TaskOut fields); completions, skips and
+                        resets arrive as "updated" with the new status
+    deleted             {id}
+
+The items come from the change feed (core.change_feed) on tasks and
+task_tombstones, which every worker tails, so a stream sees changes made by
+any worker, the outbox consumers and the reset scheduler alike.
+"""
+import asyncio
+from typing import Dict, Optional, Set
+from decouple import config
+
+from schemas.task_schema import TaskOut
+from utils.sse import put_nowait_dropping_oldest
+
+TASK_STREAM_QUEUE_SIZE = config("TASK_STREAM_QUEUE_SIZE", default=100, cast=int)
+TASK_STREAM_MAX_CONNECTIONS_PER_USER = config("TASK_STREAM_MAX_CONNECTIONS_PER_USER", default=5, cast=int)
+
+_subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+def subscribe(user_id: str) -> Optional[asyncio.Queue]:
+    """
+    Register a new task stream for a user
+
+    Args:
+        user_id: User ID
+
+    Returns:
+        The connection's queue, or None if the user has too many open streams
+    """
+    listeners = _subscribers.setdefault(user_id, set())
+    if len(listeners) >= TASK_STREAM_MAX_CONNECTIONS_PER_USER:
+        return None
+    queue: asyncio.Queue = asyncio.Queue(maxsize=TASK_STREAM_QUEUE_SIZE)
+    listeners.add(queue)
+    return queue
+
+def unsubscribe(user_id: str, queue: asyncio.Queue):
+    """Remove a connection's queue (called when it closes)"""
+    listeners = _subscribers.get(user_id)
+    if listeners is not None:
+        listeners.discard(queue)
+        if not listeners:
+            del _subscribers[user_id]
+
+def publish_task_change(user_id: str, event: str, payload: Dict):
+    """
+    Send a task change to every open stream of its owner
+    A no-op for users without open streams
+
+    Args:
+        user_id: Owner of the task
+        event: Change type (created, updated, deleted)
+        payload: JSON-serializable task diff
+    """
+    for queue in list(_subscribers.get(user_id, ())):
+        put_nowait_dropping_oldest(queue, (event, payload))
+
+async def handle_task_stream_change(change: Dict):
+    """Change feed handler for tasks: push the full task to its owner's streams"""
+    task = change.get("document")
+    if not task or task.get("user_id") not in _subscribers:
+        return
+    # The polling fallback reports every change as an update; new tasks have updated_at == created_at
+    created = change["operation"] == "insert" or task.get("updated_at") == task.get("created_at")
+    event = "created" if created else "updated"
+    task_out = TaskOut(**{**task, "id": str(task["_id"])})
+    publish_task_change(task["user_id"], event, task_out.model_dump(mode="json"))
+
+async def handle_tombstone_change(change: Dict):
+    """Change feed handler for task_tombstones: tell the owner's streams a task is gone"""
+    tombstone = change.get("document")
+    if not tombstone or tombstone.get("user_id") not in _subscribers:
+        return
+    publish_task_change(tombstone["user_id"], "deleted", {"id": tombstone["task_id"]})
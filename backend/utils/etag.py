@@ -0,0 +1,57 @@
+"""
+Conditional GET helpers
+Weak ETags built from cheap version stamps, so an unchanged resource can be
+answered with 304 Not Modified before running its query
+"""
+import hashlib
+from typing import Any, Optional
+from fastapi import Response
+
+# Tells clients (and us, when debugging) whether the full query was skipped
+QUERY_SKIPPED_HEADER = "X-Query-Skipped"
+
+def make_etag(*parts: Any) -> str:
+    """
+    Build a weak ETag from version parts (resource name, version, query params)
+
+    Returns:
+        e.g. W/"3f2a9c0d1b7e4a56"
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+def set_etag_headers(response: Response, etag: str, query_skipped: bool):
+    """Attach the ETag and revalidation headers to a response"""
+    response.headers["ETag"] = etag
+    # Private per-user data: browsers may store it but must revalidate each time
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.headers[QUERY_SKIPPED_HEADER] = "true" if query_skipped else "false"
+
+def parse_version_etag(if_match: Optional[str]) -> Optional[int]:
+    """
+    Parse an If-Match header carrying a resource version ("3", W/"3" or 3)
+
+    Returns:
+        The version, or None if the header is absent or "*"
+    
+    Raises:
+        ValueError: If the header isn't a version number
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    return int(if_match.strip().removeprefix("W/").strip('"'))
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response for a matching If-None-Match"""
+    response = Response(status_code=304)
+    set_etag_headers(response, etag, query_skipped=True)
+    return response
@@ -2,7 +2,8 @@
 Common helper functions
 """
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from bson import ObjectId
 
 def convert_objectid_to_str(doc: Dict[str, Any]) -> Dict[str, Any]:
@@ -47,3 +48,57 @@ def validate_object_id(obj_id: str) -> ObjectId:
     except Exception:
         raise ValueError(f"Invalid ObjectId: {obj_id}")
 
+def validate_timezone(timezone: str) -> str:
+    """
+    Validate an IANA timezone name
+    
+    Args:
+        timezone: Timezone name (e.g. "Europe/Berlin")
+    
+    Returns:
+        The timezone name
+    
+    Raises:
+        ValueError: If the timezone is unknown
+    """
+    try:
+        ZoneInfo(timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Invalid timezone: {timezone}")
+    return timezone
+
+def parse_route_settings(raw: str, cast: Callable[[str], Any] = int) -> List[Tuple[str, Any]]:
+    """
+    Parse a per-route setting such as ADMISSION_ROUTE_LIMITS
+
+    Args:
+        raw: Comma-separated prefix=value pairs
+        cast: Converts each value
+
+    Returns:
+        (prefix, value) pairs, longest prefix first
+    """
+    limits = []
+    for entry in raw.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        prefix, limit = entry.rsplit("=", 1)
+        limits.append((prefix.strip().rstrip("/") or "/", cast(limit)))
+    return sorted(limits, key=lambda item: len(item[0]), reverse=True)
+
+def match_route(path: str, limits: List[Tuple[str, Any]]) -> Optional[str]:
+    """
+    Find the configured prefix covering a path
+
+    Args:
+        path: Request path
+        limits: Output of parse_route_settings
+
+    Returns:
+        The longest matching prefix, or None
+    """
+    for prefix, _ in limits:
+        if path == prefix or path.startswith(prefix + "/"):
+            return prefix
+    return None
@@ -0,0 +1,95 @@
+"""
+Single-flight request coalescing
+
+Concurrent calls to a decorated coroutine with the same arguments share one
+execution: the first caller runs it, later callers await the same result
+(or exception). Nothing is cached once the call finishes, so reads are
+never staler than the in-flight query they joined.
+
+Callers share the returned object and must treat it as read-only.
+
+The shared execution runs without any caller's request deadline (the first
+caller's short budget must not fail everyone else), under its own
+REQUEST_DEADLINE_MAX_SECONDS scope instead, so its MongoDB calls still carry
+a timeout. Each caller stops waiting when its own deadline runs out
+(asyncio.TimeoutError, 504), and the execution is cancelled once every
+caller has stopped waiting.
+"""
+import asyncio
+import contextvars
+import functools
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from core.deadline import REQUEST_DEADLINE_MAX_SECONDS, deadline_scope, remaining
+
+# function name -> {"calls", "executions", "coalesced"}
+_counters: Dict[str, Dict[str, int]] = {}
+
+def single_flight(key: Optional[Callable[..., Hashable]] = None):
+    """
+    Decorate an async function so identical concurrent calls share one execution
+
+    Args:
+        key: Builds the coalescing key from the call's arguments
+             (default: the positional and keyword arguments themselves,
+             which must be hashable)
+
+    Returns:
+        Decorator
+    """
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+        counters = _counters.setdefault(name, {"calls": 0, "executions": 0, "coalesced": 0})
+        in_flight: Dict[Hashable, asyncio.Future] = {}
+        # shared execution -> callers still waiting for it
+        waiters: Dict[asyncio.Future, int] = {}
+
+        async def run_shared(*args, **kwargs) -> Any:
+            # Longest budget any caller can have
+            with deadline_scope(REQUEST_DEADLINE_MAX_SECONDS):
+                return await func(*args, **kwargs)
+
+        def forget(call_key: Hashable, task: asyncio.Future):
+            """Stop handing out a finished or abandoned execution"""
+            if in_flight.get(call_key) is task:
+                del in_flight[call_key]
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> Any:
+            call_key = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            counters["calls"] += 1
+
+            task = in_flight.get(call_key)
+            if task is not None:
+                counters["coalesced"] += 1
+            else:
+                counters["executions"] += 1
+                # Run as its own task so one caller disconnecting doesn't cancel it for the rest,
+                # in an empty context so it doesn't inherit this caller's deadline
+                task = contextvars.Context().run(asyncio.ensure_future, run_shared(*args, **kwargs))
+                in_flight[call_key] = task
+                task.add_done_callback(functools.partial(forget, call_key))
+            waiters[task] = waiters.get(task, 0) + 1
+            try:
+                # Each caller waits at most its own remaining budget
+                return await asyncio.wait_for(asyncio.shield(task), remaining())
+            finally:
+                waiters[task] -= 1
+                if not waiters[task]:
+                    del waiters[task]
+                    if not task.done():
+                        # Nobody is left to read the result
+                        forget(call_key, task)
+                        task.cancel()
+
+        return wrapper
+    return decorator
+
+def get_single_flight_metrics() -> Dict[str, Dict[str, int]]:
+    """
+    Per-function coalescing counters for this worker
+
+    Returns:
+        {function: {"calls", "executions", "coalesced"}}
+    """
+    return {name: dict(counters) for name, counters in _counters.items()}
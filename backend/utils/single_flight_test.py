@@ -0,0 +1,70 @@
+"""
+Tests for single-flight request coalescing
+"""
+import asyncio
+
+import pymongo
+
+from core.deadline import REQUEST_DEADLINE_MAX_SECONDS, deadline_scope
+from utils.single_flight import single_flight
+
+def test_coalesced_call_runs_under_a_bounded_timeout():
+    seen_timeouts = []
+
+    @single_flight()
+    async def load(user_id: str):
+        # What pymongo would send as maxTimeMS for a query issued here
+        seen_timeouts.append(pymongo._csot.get_timeout())
+        await asyncio.sleep(0.05)
+        return user_id
+
+    async def scenario():
+        with deadline_scope(1):
+            return await asyncio.gather(load("user-1"), load("user-1"))
+
+    assert asyncio.run(scenario()) == ["user-1", "user-1"]
+    assert len(seen_timeouts) == 1
+    assert seen_timeouts[0] is not None
+    assert 0 < seen_timeouts[0] <= REQUEST_DEADLINE_MAX_SECONDS
+
+def test_execution_is_cancelled_when_every_caller_gives_up():
+    @single_flight()
+    async def load(user_id: str):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    state = {"cancelled": False}
+
+    async def caller():
+        with deadline_scope(0.05):
+            await load("user-1")
+
+    async def scenario():
+        results = await asyncio.gather(caller(), caller(), return_exceptions=True)
+        assert all(isinstance(result, asyncio.TimeoutError) for result in results)
+        # Let the cancellation reach the shared execution
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert state["cancelled"]
+
+    asyncio.run(scenario())
+
+def test_one_caller_leaving_does_not_cancel_the_others():
+    @single_flight()
+    async def load(user_id: str):
+        await asyncio.sleep(0.1)
+        return user_id
+
+    async def impatient():
+        with deadline_scope(0.01):
+            await load("user-1")
+
+    async def scenario():
+        return await asyncio.gather(impatient(), load("user-1"), return_exceptions=True)
+
+    impatient_result, patient_result = asyncio.run(scenario())
+    assert isinstance(impatient_result, asyncio.TimeoutError)
+    assert patient_result == "user-1"
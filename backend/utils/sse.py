@@ -0,0 +1,74 @@
+"""
+Server-Sent Events helpers
+Shared by the streaming endpoints (leaderboard and task updates)
+"""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Optional
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    # Stop reverse proxies (nginx) from buffering the stream
+    "X-Accel-Buffering": "no"
+}
+
+def format_sse_event(data: Any, event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    """
+    Format one SSE message
+
+    Args:
+        data: JSON-serializable payload
+        event: Optional event name
+        event_id: Optional event ID (sent back by clients as Last-Event-ID)
+
+    Returns:
+        The encoded message, terminated by a blank line
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+def put_nowait_dropping_oldest(queue: asyncio.Queue, item: Any):
+    """Enqueue without blocking; a full queue drops its oldest item for a slow client"""
+    if queue.full():
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    queue.put_nowait(item)
+
+async def stream_queue(
+    request: Request,
+    queue: asyncio.Queue,
+    heartbeat_seconds: float
+) -> AsyncIterator[str]:
+    """
+    Yield queued (event, data) pairs as SSE messages until the client disconnects
+    Sends a comment heartbeat when idle so proxies keep the connection open
+
+    Args:
+        request: The streaming request (polled for disconnects)
+        queue: Queue of (event name, payload) tuples
+        heartbeat_seconds: Idle time before a heartbeat is sent
+    """
+    yield ": connected\n\n"
+    while True:
+        if await request.is_disconnected():
+            return
+        try:
+            event, data = await asyncio.wait_for(queue.get(), timeout=heartbeat_seconds)
+        except asyncio.TimeoutError:
+            yield ": heartbeat\n\n"
+            continue
+        yield format_sse_event(data, event=event)
+
+def sse_response(body: AsyncIterator[str]) -> StreamingResponse:
+    """Wrap an SSE message iterator in a streaming response"""
+    return StreamingResponse(body, media_type="text/event-stream", headers=SSE_HEADERS)